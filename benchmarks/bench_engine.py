@@ -0,0 +1,181 @@
+"""匹配引擎基准
+
+在合成屏幕上无界面地驱动 MatchEngine（与 ImageMatchThread.run 的循环相同），
+报告每轮耗时及截图、颜色转换、模板匹配、minMaxLoc 各阶段的耗时和峰值内存，
+结果以 JSON 输出，便于在版本之间比较。
+
+用法: python benchmarks/bench_engine.py [--screens 1080p 4k] [--templates 32 96]
+                                       [--repeat 5] [--grayscale] [--output result.json]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import matcher
+from src.capture import FakeCapture, synthetic_screen
+from src.config import AppConfig
+from src.engine import MatchEngine
+
+# 屏幕名称: (宽, 高, 显示器数)，显示器水平排列
+SCREENS = {
+    "1080p": (1920, 1080, 1),
+    "4k": (3840, 2160, 1),
+    "2x4k": (7680, 2160, 2),
+}
+
+
+def make_capture(width, height, monitors):
+    """每次截图都生成新画面，避免变化检测命中缓存"""
+    screens = [synthetic_screen(width, height, seed=seed) for seed in range(2)]
+    w = width // monitors
+    layout = [
+        {"left": i * w, "top": 0, "width": w, "height": height} for i in range(monitors)
+    ]
+    return FakeCapture(
+        monitors=layout, generator=lambda index: screens[index % 2]
+    )
+
+
+def make_config(args, monitors):
+    data = AppConfig()
+    data.match.grayscale = args.grayscale
+    data.match.mode = args.mode
+    # 测量最坏情况：每轮都做全屏搜索
+    data.match.tracking = False
+    data.match.skip_unchanged = False
+    data.capture.per_monitor = monitors > 1
+    return SimpleNamespace(data=data)
+
+
+def median_ms(samples):
+    return round(float(np.median(samples)) * 1000, 2)
+
+
+def bench_stages(capture, config, template, repeat):
+    """分别测量截图、颜色转换、模板匹配和 minMaxLoc 的耗时"""
+    grab, convert, match, peak = [], [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = capture.grab_frames(config.data.capture)
+        grab.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        images = [f.gray if config.data.match.grayscale else f.bgr for f in frames]
+        convert.append(time.perf_counter() - start)
+
+        match_time = peak_time = 0.0
+        for image in images:
+            start = time.perf_counter()
+            result = cv2.matchTemplate(image, template, matcher.MATCH_METHOD)
+            match_time += time.perf_counter() - start
+            start = time.perf_counter()
+            cv2.minMaxLoc(result)
+            peak_time += time.perf_counter() - start
+        match.append(match_time)
+        peak.append(peak_time)
+
+    return {
+        "grab_ms": median_ms(grab),
+        "convert_ms": median_ms(convert),
+        "match_ms": median_ms(match),
+        "min_max_loc_ms": median_ms(peak),
+    }
+
+
+def bench_cycle(capture, config, image, repeat):
+    """测量 MatchEngine.step 的每轮耗时和峰值内存"""
+    engine = MatchEngine(capture, config)
+    engine.set_target(image)
+    engine.step()  # 预热：分配复用的缓冲区
+
+    cycles = []
+    tracemalloc.start()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            engine.step()
+            cycles.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        resident = sum(engine.memory_stats().values())
+        stages = engine.timing_stats()
+    finally:
+        tracemalloc.stop()
+        engine.close()
+    return {
+        "cycle_ms": median_ms(cycles),
+        "peak_mb": round(peak / 1024 / 1024, 2),  # 每轮新分配的峰值
+        "resident_buffers_mb": round(resident / 1024 / 1024, 2),  # 常驻复用缓冲区
+        "engine_stages": stages,  # 引擎自身记录的各阶段 p50/p95/p99
+    }
+
+
+def run_case(screen_name, size, args):
+    width, height, monitors = SCREENS[screen_name]
+    capture = make_capture(width, height, monitors)
+    config = make_config(args, monitors)
+
+    x, y = width // 3, height // 3
+    image = np.ascontiguousarray(capture.desktop[y:y + size, x:x + size, :3])
+    template = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if args.grayscale else image
+
+    result = {"screen": screen_name, "width": width, "height": height,
+              "monitors": monitors, "template": size}
+    result.update(bench_cycle(capture, config, image, args.repeat))
+    result.update(bench_stages(capture, config, template, args.repeat))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--screens", nargs="+", choices=list(SCREENS), default=list(SCREENS))
+    parser.add_argument("--templates", nargs="+", type=int, default=[32, 96, 256],
+                        help="模板边长")
+    parser.add_argument("--mode", default="full", choices=["full", "pyramid", "parallel"])
+    parser.add_argument("--grayscale", action="store_true", help="在灰度图上匹配")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="JSON 输出文件，默认输出到标准输出")
+    args = parser.parse_args()
+
+    cases = []
+    for screen_name in args.screens:
+        for size in args.templates:
+            case = run_case(screen_name, size, args)
+            print(
+                f"{screen_name:<6} 模板 {size:>4}  每轮 {case['cycle_ms']:8.1f} ms  "
+                f"峰值内存 {case['peak_mb']:7.1f} MB",
+                file=sys.stderr,
+            )
+            cases.append(case)
+
+    report = {
+        "benchmark": "engine",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "mode": args.mode,
+        "grayscale": args.grayscale,
+        "repeat": args.repeat,
+        "cases": cases,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""灰度匹配与彩色匹配的速度对比
+
+用法: python benchmarks/bench_grayscale.py [--width 3840] [--height 2160] [--repeat 5]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.capture import Frame, synthetic_screen
+from src.config import MatchConfig
+from src.watch_target import WatchTarget
+
+
+def bench(target, screen, config, repeat):
+    """返回每轮耗时的中位数（毫秒），每轮都包含颜色转换"""
+    times = []
+    for _ in range(repeat):
+        frame = Frame(0, screen)
+        start = time.perf_counter()
+        max_val, max_loc = target.match_frames([frame], config)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), max_val, max_loc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--template", type=int, default=96, help="模板边长")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    screen = synthetic_screen(args.width, args.height)
+    x, y = args.width // 3, args.height // 3
+    template = np.ascontiguousarray(screen[y:y + args.template, x:x + args.template, :3])
+    config = MatchConfig(tracking=False, skip_unchanged=False)
+
+    print(f"屏幕 {args.width}x{args.height}，模板 {args.template}x{args.template}")
+    baseline = None
+    for name, grayscale, color_check in [
+        ("bgr", False, False),
+        ("gray", True, False),
+        ("gray+color", True, True),
+    ]:
+        target = WatchTarget(name, template, grayscale=grayscale)
+        config.color_check = color_check
+        ms, max_val, max_loc = bench(target, screen, config, args.repeat)
+        baseline = baseline or ms
+        print(
+            f"{name:<12} {ms:8.1f} ms  加速 {baseline / ms:4.2f}x  "
+            f"匹配度 {max_val:.3f} 位置 {max_loc}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""启动基准：无界面命令行与图形界面
+
+在子进程中分别从启动到拿到第一个匹配结果：命令行模式运行 `watchcat watch --once`，
+图形界面模式创建 QApplication 和匹配框窗口后加载同一个模板。两者都回放同一张截图，
+报告从启动子进程到第一个匹配结果的耗时和进程的峰值内存（RSS），结果以 JSON 输出。
+
+用法: python benchmarks/bench_startup.py [--repeat 3] [--output result.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from src.capture import synthetic_screen
+
+# 子进程最后输出一行 JSON: {"seconds": 启动到第一个结果的耗时, "max_rss_mb": 峰值内存, "matched": bool}
+# Linux 上读取 VmHWM：ru_maxrss 在 exec 后保留 fork 时父进程的峰值，父进程较大时测不出差别
+REPORT = """
+import json, os, resource, sys
+if os.path.exists("/proc/self/status"):
+    with open("/proc/self/status") as f:
+        rss_mb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")) / 1024
+else:
+    # macOS 上 ru_maxrss 的单位为字节
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / 1024
+print(json.dumps({"seconds": elapsed, "max_rss_mb": round(rss_mb, 1), "matched": matched}))
+"""
+
+HEADLESS = """
+import os, time
+from src import cli
+code = cli.main(["watch", TEMPLATE, "--replay", SCREEN, "--once", "--max-cycles", "5", "--no-journal"])
+elapsed = time.time() - float(os.environ["WATCHCAT_BENCH_START"])
+matched = code == 0
+"""
+
+GUI = """
+import os, sys, time
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication
+from src.TransparentOverlay import TransparentOverlay
+app = QApplication(sys.argv)
+overlay = TransparentOverlay(app)
+found = []
+def on_found(rect):
+    if not found:
+        found.append(time.time() - float(os.environ["WATCHCAT_BENCH_START"]))
+    app.quit()
+overlay.match_thread.match_found.connect(on_found)
+overlay.image_manager.load_file(TEMPLATE)
+QTimer.singleShot(10000, app.quit)
+app.exec()
+overlay.cleanup()
+matched = bool(found)
+elapsed = found[0] if found else None
+"""
+
+
+def prepare(directory):
+    """在 directory 中写入回放截图、模板和配置（作为子进程的 HOME）"""
+    directory = Path(directory)
+    # 截图较小，匹配只占几毫秒，耗时主要是导入和初始化
+    screen = synthetic_screen(640, 360, seed=5)
+    screen_path = directory / "screen.png"
+    template_path = directory / "template.png"
+    cv2.imwrite(str(screen_path), screen)
+    cv2.imwrite(str(template_path), np.ascontiguousarray(screen[200:260, 300:400, :3]))
+    settings = {
+        "enable_sound": False,
+        "enable_notification": False,
+        "capture": {"backend": "replay", "replay_path": str(screen_path)},
+        "template_store": {"enabled": False},
+        "journal": {"enabled": False},
+    }
+    (directory / ".autogui.json").write_text(json.dumps(settings))
+    return screen_path, template_path
+
+
+def run(mode, directory):
+    """在子进程中运行一次，返回子进程报告的结果"""
+    screen_path, template_path = Path(directory) / "screen.png", Path(directory) / "template.png"
+    body = HEADLESS if mode == "headless" else GUI
+    code = (
+        f"TEMPLATE = {str(template_path)!r}\nSCREEN = {str(screen_path)!r}\n" + body + REPORT
+    )
+    env = dict(
+        os.environ,
+        HOME=str(directory),
+        QT_QPA_PLATFORM="offscreen",
+        WATCHCAT_BENCH_START=repr(time.time()),
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(directory, repeat=3):
+    """两种模式交替运行 repeat 次，各取中位数，返回 {模式: 结果}"""
+    runs = {"headless": [], "gui": []}
+    for _ in range(repeat):
+        for mode in runs:
+            runs[mode].append(run(mode, directory))
+    results = {}
+    for mode, mode_runs in runs.items():
+        if not all(r["matched"] for r in mode_runs):
+            raise RuntimeError(f"{mode} 模式没有拿到匹配结果: {mode_runs}")
+        results[mode] = {
+            "seconds": round(statistics.median(r["seconds"] for r in mode_runs), 3),
+            "max_rss_mb": statistics.median(r["max_rss_mb"] for r in mode_runs),
+            "runs": repeat,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="同时写入 JSON 文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        prepare(directory)
+        results = measure(directory, args.repeat)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,111 +4,252 @@ import subprocess
 import time
 from math import fabs
 
-import cv2
-import numpy as np
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import QThread, pyqtSignal, pyqtSlot
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QSystemTrayIcon  # 为了使用 MessageIcon 枚举
 
+from src.alerts import Alert, AlertDispatcher
+from src.config import touched
+from src.engine import MatchEngine
+from src.journal import create_journal
 from src.log import logger
-from src.sounds import SoundPlayer, SoundType
+from src.sound_types import SoundType
 
 
 class ImageMatchThread(QThread):
-    match_found = pyqtSignal(tuple)  # 发送匹配结果的信号 (x, y, w, h)
+    match_found = pyqtSignal(tuple)  # 发送主目标匹配结果的信号 (x, y, w, h)
+    target_match_found = pyqtSignal(str, tuple)  # 发送任一目标匹配结果的信号 (name, (x, y, w, h))
+    timings_updated = pyqtSignal(str)  # 定期发送各阶段耗时摘要，供托盘显示
+    notification_requested = pyqtSignal(str, str)  # 由提醒分发线程发出，在界面线程中显示托盘通知
 
-    def __init__(self, sct, config):
+    TIMINGS_INTERVAL = 5.0  # 发送耗时摘要的间隔（秒）
+
+    MAIN_TARGET = MatchEngine.MAIN_TARGET  # 主目标（托盘中选择的图片）的名称
+
+    def __init__(self, capture, config):
         super().__init__()
-        self.sct = sct
         self.config = config
-        self.target_image = None
+        self.engine = MatchEngine(capture, config)  # 截图和匹配流程，不依赖 Qt
+        # 匹配状态变化写入事件日志，每帧的结果只在 debug 级别输出
+        self.engine.journal = create_journal(config.data.journal)
         self.running = False
-        self.last_match = None  # 存储上次匹配位置
-        self.last_match_status = False  # 跟踪上一次的匹配状态
         self.tray_manager = None  # 将由外部设置
-
-    def set_target(self, image):
+        # 提醒在单独的线程中分发，匹配循环只负责入队
+        alert_config = config.data.alerts
+        self.alerts = AlertDispatcher(
+            {"notification": self.request_notification, "sound": self.play_alert_sound},
+            maxsize=alert_config.queue_size,
+        )
+        self.apply_alert_config()
+        # 本对象属于界面线程，分发线程发出的信号会排队到界面线程执行
+        self.notification_requested.connect(self.show_notification)
+        # 配置变化时只更新受影响的部分，不重启线程
+        self.sound_changed = False  # 提示音设置已变化，下一轮重新准备
+        self.emitted = {}  # 每个目标最近一次发送的匹配位置 {name: (x, y, w, h)}
+        self.schedule = None  # 最近一次输出日志的调度状态 (interval_ms, reason)
+        config.subscribe(self.config_changed)
+
+    @property
+    def target(self):
+        return self.engine.target
+
+    @property
+    def target_image(self):
+        return self.engine.target.image if self.engine.target is not None else None
+
+    def targets(self):
+        """返回当前所有监视目标，主目标在前"""
+        return self.engine.targets()
+
+    def load_template(self, path):
+        """加载模板图片，返回 (image, key)"""
+        return self.engine.load_template(path)
+
+    def set_target(self, image, key=None):
         """设置目标图片"""
-        h, w = image.shape[:2]
-        logger.info(f"设置目标图片: {w}x{h}")
-        self.target_image = image
-        self.last_match = None
+        self.engine.set_target(image, key)
+
+    def add_target(self, name, image, threshold=None, grayscale=None, key=None):
+        """向监视列表添加目标，同名目标会被替换"""
+        self.engine.add_target(name, image, threshold, grayscale, key)
+
+    def swap_target(self, image, key=None):
+        """运行中切换主目标，下一轮开始之前生效，不停止线程"""
+        self.engine.swap_target(image, key)
+
+    def pause(self):
+        """暂停匹配，不停止线程，缓存保持"""
+        logger.info("暂停图像匹配")
+        self.engine.pause()
+
+    def resume(self):
+        """恢复匹配"""
+        logger.info("恢复图像匹配")
+        self.engine.resume()
+
+    @property
+    def paused(self):
+        return self.engine.paused
+
+    def remove_target(self, name):
+        """从监视列表移除目标"""
+        self.engine.remove_target(name)
+
+    def scheduler_stats(self):
+        """返回轮询调度状态（当前间隔、休眠时间、耗时和延迟）"""
+        return self.engine.scheduler_stats()
+
+    def cache_stats(self):
+        """返回未变化帧缓存的命中统计（所有显示器合计）"""
+        return self.engine.cache_stats()
+
+    def last_appeared(self, name=MAIN_TARGET):
+        """返回目标最近一次出现的事件，没有事件日志或从未出现时返回 None"""
+        if self.engine.journal is None:
+            return None
+        return self.engine.journal.last_appeared(name)
+
+    def timing_stats(self):
+        """返回各阶段耗时的 p50/p95/p99（毫秒）"""
+        return self.engine.timing_stats()
+
+    def sync_watch_list(self):
+        """按配置的监视列表添加、替换或移除目标，返回新加载的目标数"""
+        return self.engine.sync_watch_list()
+
+    def config_changed(self, changes):
+        """配置变化回调，可能在界面线程或配置文件监视线程中调用"""
+        self.engine.config_changed(changes)
+        if touched(changes, "alerts"):
+            self.apply_alert_config()
+        if touched(changes, "enable_sound", "sound_type", "custom_sound"):
+            self.sound_changed = True
+
+    def apply_alert_config(self):
+        """更新提醒的合并窗口和各渠道的限流间隔，队列长度在创建后不再改变"""
+        alert_config = self.config.data.alerts
+        self.alerts.coalesce = alert_config.coalesce_ms / 1000
+        self.alerts.debounce = {
+            "notification": alert_config.notification_interval,
+            "sound": alert_config.sound_interval,
+        }
 
     def set_tray_manager(self, tray_manager):
         """设置托盘管理器"""
         self.tray_manager = tray_manager
 
-    def on_match(self, title, message):
-        """跨平台发送系统通知和提示音"""
-        # 检查是否启用通知
+    def on_match(self, title, message, target=None):
+        """把提醒交给分发线程，不阻塞匹配循环"""
+        if not self.alerts.submit(Alert(title, message, target)):
+            logger.warning(f"提醒队列已满，丢弃提醒: {title}")
+
+    def request_notification(self, alert):
+        """分发线程中调用：请求界面线程显示系统通知"""
         if self.config.data.enable_notification and self.tray_manager:
-            try:
-                # 使用托盘管理器的托盘图标发送通知
-                self.tray_manager.tray.showMessage(
-                    title,
-                    message,
-                    QSystemTrayIcon.MessageIcon.Information,
-                    3000  # 显示3秒
-                )
-                logger.info(f"发送通知: {title} - {message}")
-            except Exception as e:
-                logger.warning(f"通知发送失败: {e}")
-
-        # 检查是否启用声音
-        if self.config.data.enable_sound:
-            # 播放提示音
-            try:
-                sound_type = SoundType[self.config.data.sound_type]
-                SoundPlayer.play_sound(sound_type, self.config.data)
-            except Exception as e:
-                logger.warning(f"播放提示音失败: {e}")
+            self.notification_requested.emit(alert.title, alert.message)
+
+    @pyqtSlot(str, str)
+    def show_notification(self, title, message):
+        """在界面线程中通过托盘图标发送系统通知"""
+        try:
+            self.tray_manager.tray.showMessage(
+                title,
+                message,
+                QSystemTrayIcon.MessageIcon.Information,
+                3000  # 显示3秒
+            )
+            logger.info(f"发送通知: {title} - {message}")
+        except Exception as e:
+            logger.warning(f"通知发送失败: {e}")
+
+    def play_alert_sound(self, alert):
+        """分发线程中调用：播放提示音"""
+        if not self.config.data.enable_sound:
+            return
+        try:
+            # 声音模块（numpy / sounddevice / pydub）在首次提醒时才导入
+            from src.sounds import SoundPlayer
+            sound_type = SoundType[self.config.data.sound_type]
+            SoundPlayer.play_sound(sound_type, self.config.data)
+        except Exception as e:
+            logger.warning(f"播放提示音失败: {e}")
+
+    def prepare_sound(self):
+        """在匹配线程中预先合成或解码提示音并打开输出流，首次提醒时直接播放"""
+        if not self.config.data.enable_sound:
+            return
+        try:
+            from src.sounds import SoundPlayer
+            SoundPlayer.prepare(SoundType[self.config.data.sound_type], self.config.data)
+            # 提前打开常驻输出流，首次提醒不再等待设备初始化
+            SoundPlayer.mixer.ensure_stream()
+        except Exception as e:
+            logger.warning(f"加载提示音失败: {e}")
 
     def run(self):
         """线程主循环"""
         self.running = True
         logger.info("开始图像匹配线程")
-        while self.running and self.target_image is not None:
-            s_time = time.time()
-            # 获取屏幕截图
-            screen = self.sct.grab(self.sct.monitors[0])
-            screen_np = np.array(screen)
-            screen_bgr = cv2.cvtColor(screen_np, cv2.COLOR_BGRA2BGR)
-
-            # 模板匹配
-            result = cv2.matchTemplate(
-                screen_bgr, self.target_image, cv2.TM_CCOEFF_NORMED
-            )
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
-
-            t = time.time() - s_time
-            if max_val > 0.8:  # 匹配度阈值
-                h, w = self.target_image.shape[:2]
-                x, y = max_loc
-
-                # 如果是首次匹配，保存位置
-                if self.last_match is None:
-                    self.last_match = (x, y)
-
-                logger.info(
-                    f"[{t:.2f}s, {max_val*100:.2f}%] 找到匹配: "
-                    f"位置({x}, {y}), 大小({w}x{h})"
-                )
-
-                # 检查是否从未匹配状态转变为匹配状态
-                if not self.last_match_status:
-                    self.on_match("找到匹配", f"匹配度: {max_val*100:.1f}%")
-
-                self.last_match_status = True
-                self.match_found.emit((x, y, w, h))
-            else:
-                logger.warning(f"[{t:.2f}s, {max_val*100:.2f}%] 未找到匹配")
-
-                self.last_match_status = False
-
-            self.msleep(200)
+        self.prepare_sound()
+        last_report = time.monotonic()
+        while self.running and self.engine.has_targets():
+            if self.engine.paused:
+                self.engine.idle(None)
+                continue
+            if self.sound_changed:
+                self.sound_changed = False
+                self.prepare_sound()
+            results = self.engine.step()
+            if self.engine.paused:
+                # 暂停时正在进行的一轮不再发送结果
+                continue
+            for result in results:
+                self.handle_result(result)
+
+            if time.monotonic() - last_report >= self.TIMINGS_INTERVAL:
+                last_report = time.monotonic()
+                self.timings_updated.emit(self.engine.timings.format())
+
+            # 调度状态只在间隔或原因变化时输出，每轮的详细数据见 scheduler_stats()
+            scheduler = self.engine.scheduler
+            schedule = (scheduler.interval_ms, scheduler.reason)
+            if schedule != self.schedule:
+                self.schedule = schedule
+                logger.debug("调度: 间隔 {} ms（{}）", *schedule)
+            # 切换目标、恢复或停止时会被提前唤醒
+            self.engine.idle(self.engine.sleep_ms / 1000)
+
+    def handle_result(self, result):
+        """发送通知和信号，只在出现和消失时输出日志，每帧的匹配度由事件日志记录"""
+        target = result.target
+        if result.rect is not None:
+            x, y, w, h = result.rect
+            # 检查是否从未匹配状态转变为匹配状态
+            if result.became_matched:
+                logger.info(f"[{target.name}] 出现: 位置({x}, {y}), 匹配度 {result.score*100:.2f}%")
+                title = "找到匹配" if target is self.target else f"找到匹配: {target.name}"
+                with self.engine.timings.measure("alert"):
+                    self.on_match(title, f"匹配度: {result.score*100:.1f}%", target.name)
+
+            # 位置不变时不再发送信号，界面线程只在匹配框需要移动时被唤醒
+            if result.became_matched or self.emitted.get(target.name) != result.rect:
+                self.emitted[target.name] = result.rect
+                with self.engine.timings.measure("emit"):
+                    if target is self.target:
+                        self.match_found.emit(result.rect)
+                    self.target_match_found.emit(target.name, result.rect)
+        elif self.emitted.pop(target.name, None) is not None:
+            logger.info(f"[{target.name}] 消失: 匹配度 {result.score*100:.2f}%")
 
     def stop(self):
         """停止线程"""
         logger.info("停止图像匹配线程")
         self.running = False
+        self.engine.wake()
         self.wait()
+
+    def close(self):
+        """释放进程池等资源，线程停止后调用"""
+        self.config.unsubscribe(self.config_changed)
+        self.alerts.close()
+        self.engine.close()
@@ -1,10 +1,11 @@
 import sys
+import threading
 from pathlib import Path
 
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtWidgets import QFileDialog, QWidget
 
-from .config import Config
+from .config import Config, touched
 from .geometry_manager import GeometryManager
 from .signal_manager import SignalManager
 from .tray import TrayManager
@@ -12,22 +13,22 @@ from .window_painter import WindowPainter
 from .log import logger
 
 # Lazy imports
-_mss = None
+_capture = None
 _ImageMatchThread = None
 _ImageManager = None
 
-def get_mss():
-    global _mss
-    if _mss is None:
-        from mss import mss
-        _mss = mss()
-    return _mss
+def get_capture(config):
+    global _capture
+    if _capture is None:
+        from .capture import create_capture_backend
+        _capture = create_capture_backend(config.data.capture)
+    return _capture
 
-def get_image_match_thread(sct, config):
+def get_image_match_thread(capture, config):
     global _ImageMatchThread
     if _ImageMatchThread is None:
         from .ImageMatchThread import ImageMatchThread
-        _ImageMatchThread = ImageMatchThread(sct, config)
+        _ImageMatchThread = ImageMatchThread(capture, config)
     return _ImageMatchThread
 
 def get_image_manager(config, match_thread):
@@ -37,22 +38,39 @@ def get_image_manager(config, match_thread):
         _ImageManager = ImageManager(config, match_thread)
     return _ImageManager
 
+def warm_up():
+    """在后台线程中预先导入匹配和声音模块（cv2 / numpy / sounddevice / pydub），
+    托盘显示之后首次选择图片或首次提醒时不再卡顿"""
+    try:
+        from . import ImageMatchThread, image_manager  # noqa: F401
+        from . import sounds  # noqa: F401
+    except Exception as e:  # 没有音频设备时 sounddevice 会在导入时报错
+        logger.debug(f"预加载模块失败: {e}")
+
 class TransparentOverlay(QWidget):
+    # 配置变化，可能在配置文件监视线程中发出，在界面线程中处理
+    config_changed = pyqtSignal(object)
+
     def __init__(self, app):
         super().__init__()
         self.app = app
         self.scale_factor = app.primaryScreen().devicePixelRatio()
         self.last_match_info = None
-        self._sct = None
+        self.pending_match = None  # 尚未处理的最新匹配结果，多个结果只保留最后一个
+        self._capture = None
         self._match_thread = None
         self._image_manager = None
 
         # Initialize essential components first
         self.config = Config()
+        # 在应用外编辑配置文件时自动重新加载，运行中的匹配线程只更新受影响的部分
+        self.config.watch()
         self.window_painter = WindowPainter(self, self.config)
         self.geometry_manager = GeometryManager(self, self.config)
         self.signal_manager = SignalManager(app)
         self.tray_manager = TrayManager(self, self.config)
+        self.config_changed.connect(self.apply_config_changes)
+        self.config.subscribe(self.config_changed.emit)
 
         # Initialize UI
         self.init_ui()
@@ -64,29 +82,49 @@ class TransparentOverlay(QWidget):
         QTimer.singleShot(100, self.delayed_init)
 
     def delayed_init(self):
-        """延迟初始化较重的组件"""
+        """托盘显示之后再初始化较重的组件"""
+        if not (self.config.data.last_image or self.config.data.watch_list):
+            # 没有要立即监视的图片，在后台预加载，不阻塞界面线程
+            threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+            return
         if self.config.data.last_image:
             self.ensure_components_initialized()
             self.image_manager.load_last_image()
+        if self.config.data.watch_list:
+            self.image_manager.load_watch_list()
+
+    def apply_config_changes(self, changes):
+        """刷新托盘菜单；目标图片或监视列表变化时换上新目标或启动匹配线程"""
+        self.tray_manager.config_changed(changes)
+        if touched(changes, "last_image", "watch_list") and (
+            self._image_manager is not None
+            or self.config.data.last_image
+            or self.config.data.watch_list
+        ):
+            self.image_manager.config_changed(changes)
 
     def ensure_components_initialized(self):
         """确保组件已初始化"""
-        if self._sct is None:
-            self._sct = get_mss()
+        if self._capture is None:
+            self._capture = get_capture(self.config)
         if self._match_thread is None:
-            self._match_thread = get_image_match_thread(self._sct, self.config)
+            self._match_thread = get_image_match_thread(self._capture, self.config)
             self._match_thread.match_found.connect(self.on_match_found)
+            # 多尺度匹配需要知道屏幕缩放比例
+            self._match_thread.engine.device_pixel_ratio = self.scale_factor
             # 设置托盘管理器
             self._match_thread.set_tray_manager(self.tray_manager)
+            # 托盘中显示各阶段耗时（信号在界面线程中处理）
+            self._match_thread.timings_updated.connect(self.tray_manager.update_timings)
         if self._image_manager is None:
             self._image_manager = get_image_manager(self.config, self._match_thread)
             # 设置托盘管理器
             self._image_manager.set_tray_manager(self.tray_manager)
 
     @property
-    def sct(self):
+    def capture(self):
         self.ensure_components_initialized()
-        return self._sct
+        return self._capture
 
     @property
     def match_thread(self):
@@ -116,18 +154,26 @@ class TransparentOverlay(QWidget):
         from .platform_window import setup_platform_window
         setup_platform_window(self)
 
-        # 设置位置和大小
-        self.ensure_components_initialized()  # Ensure components are initialized first
-        if self.image_manager.target_image is None:
-            self.geometry_manager.center_window()
+        # 设置位置和大小；图片在 delayed_init 中才加载，这里不初始化匹配组件，
+        # 避免在托盘显示之前导入 cv2 / numpy
+        self.geometry_manager.center_window()
 
         self.show()
 
     def on_match_found(self, match_result):
-        """处理匹配结果"""
+        """处理匹配结果：只记录最新位置，积压的多个结果合并为一次更新"""
+        scheduled = self.pending_match is not None
+        self.pending_match = match_result
+        if not scheduled:
+            QTimer.singleShot(0, self.apply_pending_match)
+
+    def apply_pending_match(self):
+        """把匹配框移动到最新的匹配位置，位置不变时不触碰窗口"""
+        match_result, self.pending_match = self.pending_match, None
+        if match_result is None:
+            return
         # 转换逻辑像素
         x, y, w, h = [int(v / self.scale_factor) for v in match_result]
-        logger.debug(f"[on_match_found] 匹配结果: ({x}, {y}, {w}, {h})")
 
         # 增加边框
         x -= self.config.data.border.width
@@ -138,19 +184,18 @@ class TransparentOverlay(QWidget):
         # 更新匹配状态信息
         self.last_match_info = (x, y, w, h)
 
-        # 更新窗口位置和大小
-        self.setGeometry(x, y, w, h)
+        # 只在位置或大小变化时更新窗口，避免每帧都引起窗口管理器重排和重绘
+        moved = self.geometry().getRect() != (x, y, w, h)
+        if moved:
+            self.setGeometry(x, y, w, h)
 
         # 确保窗口可见并在最前面
-        if self.tray_manager.is_visible():
-            self.hide()
+        if self.tray_manager.is_visible() and (moved or not self.isVisible()):
             self.show()
+            self.raise_()
 
     def paintEvent(self, event):
         """绘制边框"""
-        logger.debug(
-            f"paintEvent 被调用: event={event}, visible={self.isVisible()}, geometry={self.geometry()}"
-        )
         self.window_painter.paint(event)
 
     def show_image_picker(self):
@@ -189,20 +234,18 @@ class TransparentOverlay(QWidget):
     def toggle_visibility(self):
         """切换可见性"""
         logger.info(f"切换可见性: {self.isVisible()}")
+        # 隐藏时暂停匹配（包括只有监视列表目标时），线程和缓存保持，显示时立即恢复
+        thread = self._match_thread
         if self.isVisible():
-            if self.image_manager.target_image is not None:
-                self.match_thread.stop()
-                self.match_thread.wait()
+            if thread is not None:
+                thread.pause()
             self.hide()
             self.tray_manager.toggle_action.setText("显示匹配框")
         else:
-            if self.image_manager.target_image is not None:
-                # 先确保线程停止
-                if self.match_thread.isRunning():
-                    self.match_thread.stop()
-                    self.match_thread.wait()
-                # 重新启动线程
-                self.match_thread.start()
+            if thread is not None:
+                thread.resume()
+                if not thread.isRunning() and thread.engine.has_targets():
+                    thread.start()
             self.show()
             self.raise_()
             self.tray_manager.toggle_action.setText("隐藏匹配框")
@@ -216,11 +259,15 @@ class TransparentOverlay(QWidget):
     def cleanup(self):
         """清理资源"""
         logger.info("正在清理资源...")
-        self.image_manager.cleanup()
+        if self._image_manager is not None:
+            self._image_manager.cleanup()
 
-        if hasattr(self, "sct"):
+        if self._capture is not None:
             logger.info("关闭屏幕捕获")
-            self.sct.close()
+            self._capture.close()
+
+        self.config.unsubscribe(self.config_changed.emit)
+        self.config.close()
 
     def reload_last_image(self):
         """Reload the last used image from config"""
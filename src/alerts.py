@@ -0,0 +1,128 @@
+"""提醒分发
+
+匹配线程只把提醒放进有界队列，由单独的线程分发到各个渠道（系统通知、提示音等），
+慢的通知或音频后端不会拖慢下一轮截图。
+短时间内的多个提醒合并为一个；每个渠道各自限流，限流期间的提醒合并后延迟发送。
+"""
+import queue
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from src.log import logger
+
+
+class Alert(NamedTuple):
+    """一次提醒"""
+    title: str
+    message: str
+    target: Optional[str] = None  # 目标名称，合并后的提醒为 None
+
+
+def merge_alerts(alerts):
+    """把多个提醒合并为一个"""
+    if len(alerts) == 1:
+        return alerts[0]
+    lines = [f"{alert.title} ({alert.message})" for alert in alerts]
+    return Alert(f"找到 {len(alerts)} 个匹配", "\n".join(lines))
+
+
+class AlertDispatcher:
+    """有界队列 + 后台线程的提醒分发器
+
+    channels 为 {渠道名: 回调(alert)}，回调在分发线程中执行；
+    需要在界面线程执行的渠道（例如托盘通知）应在回调中发送 Qt 信号。
+    """
+
+    def __init__(self, channels, maxsize=32, coalesce=0.2, debounce=None):
+        self.channels = channels
+        self.coalesce = coalesce  # 合并窗口（秒），窗口内到达的提醒合并为一个
+        self.debounce = debounce or {}  # 每个渠道两次发送的最小间隔（秒） {渠道名: 秒}
+        self.pending = {name: [] for name in channels}  # 限流中、尚未发送的提醒
+        self.last_sent = {}  # 每个渠道上次发送的时间 {渠道名: monotonic}
+        self.submitted = 0  # 放入队列的提醒数
+        self.dropped = 0  # 队列已满时丢弃的提醒数
+        self.delivered = {name: 0 for name in channels}  # 每个渠道实际发送的次数
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, alert):
+        """放入一个提醒，从不阻塞；队列已满时丢弃并返回 False"""
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "delivered": dict(self.delivered),
+            "queued": self._queue.qsize(),
+        }
+
+    def _next_due(self):
+        """返回最近一个限流到期的时间，没有待发送的提醒时返回 None"""
+        due = [
+            self.last_sent.get(name, 0) + self.debounce.get(name, 0)
+            for name, alerts in self.pending.items()
+            if alerts
+        ]
+        return min(due) if due else None
+
+    def _collect(self, timeout):
+        """等待下一个提醒，并收集合并窗口内到达的其他提醒"""
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.coalesce
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            due = self._next_due()
+            # 定期醒来检查停止标志
+            timeout = 0.5 if due is None else min(max(due - time.monotonic(), 0), 0.5)
+            batch = [alert for alert in self._collect(timeout) if alert is not None]
+            for alerts in self.pending.values():
+                alerts.extend(batch)
+            self._deliver_due()
+
+    def _deliver_due(self):
+        now = time.monotonic()
+        for name, alerts in self.pending.items():
+            if not alerts:
+                continue
+            if now - self.last_sent.get(name, float("-inf")) < self.debounce.get(name, 0):
+                continue
+            alert = merge_alerts(alerts)
+            self.pending[name] = []
+            self.last_sent[name] = now
+            self.delivered[name] += 1
+            try:
+                self.channels[name](alert)
+            except Exception as e:
+                logger.warning(f"提醒渠道 {name} 发送失败: {e}")
+
+    def close(self):
+        """停止分发线程，尚未到期的提醒被丢弃"""
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None)  # 唤醒分发线程
+        except queue.Full:
+            pass
+        self._thread.join()
@@ -0,0 +1,27 @@
+"""可复用的 numpy 缓冲区
+
+匹配循环每轮都需要同样尺寸的截图转换结果和匹配结果图，
+预先分配并反复写入，避免每轮上百 MB 的内存分配。
+"""
+import numpy as np
+
+
+class BufferPool:
+    """按名称复用的缓冲区，形状或类型变化时重新分配"""
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, key, shape, dtype=np.uint8):
+        buffer = self._buffers.get(key)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = self._buffers[key] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def clear(self):
+        self._buffers.clear()
+
+    @property
+    def nbytes(self):
+        """当前持有的缓冲区总字节数"""
+        return sum(buffer.nbytes for buffer in self._buffers.values())
@@ -0,0 +1,312 @@
+"""屏幕截图
+
+截图后端：MssCapture（真实屏幕）、FakeCapture（合成画面）和 ReplayCapture（图片回放）。
+支持截取整个虚拟屏幕（monitors[0]），或分别截取每个物理显示器。
+匹配坐标统一换算到整个虚拟屏幕截图的像素坐标系，
+与 TransparentOverlay.on_match_found 的换算方式保持一致。
+"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.log import logger
+
+
+class Frame:
+    """一次截图：整个虚拟屏幕或单个显示器"""
+
+    def __init__(self, key, image=None, offset=(0, 0), bgr=None):
+        self.key = key  # 显示器编号，0 表示整个虚拟屏幕
+        self.image = image  # mss 截图 (BGRA)
+        self.offset = offset  # 在虚拟屏幕截图中的左上角像素坐标
+        self.dirty = None  # 变化方块掩码，未做变化检测时为 None
+        self.buffers = None  # 颜色转换时复用的 BufferPool（可选）
+        self._bgr = bgr
+        self._gray = None
+
+    @property
+    def bgr(self):
+        """按需转换为 BGR，同一帧只转换一次"""
+        if self._bgr is None:
+            self._bgr = cv2.cvtColor(
+                self.image, cv2.COLOR_BGRA2BGR, dst=self._buffer("bgr", 3)
+            )
+        return self._bgr
+
+    @property
+    def gray(self):
+        """按需转换为灰度，同一帧只转换一次"""
+        if self._gray is None:
+            if self.image is not None:
+                src, code = self.image, cv2.COLOR_BGRA2GRAY
+            else:
+                src, code = self._bgr, cv2.COLOR_BGR2GRAY
+            self._gray = cv2.cvtColor(src, code, dst=self._buffer("gray"))
+        return self._gray
+
+    def converted(self, grayscale):
+        """返回匹配用的灰度或 BGR 图像"""
+        return self.gray if grayscale else self.bgr
+
+    def _buffer(self, name, channels=None):
+        if self.buffers is None:
+            return None
+        h, w = self.shape[:2]
+        shape = (h, w) if channels is None else (h, w, channels)
+        return self.buffers.get((self.key, name), shape)
+
+    def window(self, x, y, w, h):
+        """取出帧内 (x, y, w, h) 区域的 BGR 像素，不转换整帧"""
+        if self._bgr is not None:
+            return self._bgr[y:y + h, x:x + w]
+        return self.image[y:y + h, x:x + w, :3]
+
+    @property
+    def shape(self):
+        image = self.image if self.image is not None else self._bgr
+        return image.shape
+
+    @property
+    def unchanged(self):
+        return self.dirty is not None and not self.dirty.any()
+
+    def contains(self, x, y):
+        """虚拟屏幕坐标 (x, y) 是否落在该帧内"""
+        h, w = self.shape[:2]
+        ox, oy = self.offset
+        return ox <= x < ox + w and oy <= y < oy + h
+
+
+def select_monitors(monitors, include=None, exclude=None):
+    """按配置筛选物理显示器，返回 [(编号, monitor), ...]
+
+    编号与 mss 一致，从 1 开始；include 为空表示全部显示器。
+    """
+    selected = []
+    for index, monitor in enumerate(monitors[1:], start=1):
+        if include and index not in include:
+            continue
+        if exclude and index in exclude:
+            continue
+        selected.append((index, monitor))
+    return selected
+
+
+def expand_monitor(monitor, others, overlap):
+    """把显示器区域向相邻（共用一条边）的显示器延伸 overlap，返回新的区域
+
+    相邻显示器的截图因此互相重叠，跨越两个显示器边界的模板能完整落在其中一帧内。
+    中间有空隙或只有角相接的显示器不延伸。
+    """
+    left, top = monitor["left"], monitor["top"]
+    right, bottom = left + monitor["width"], top + monitor["height"]
+    new_left, new_top, new_right, new_bottom = left, top, right, bottom
+    for other in others:
+        o_left, o_top = other["left"], other["top"]
+        o_right, o_bottom = o_left + other["width"], o_top + other["height"]
+        rows = top < o_bottom and o_top < bottom  # 纵向有重合，左右相邻
+        cols = left < o_right and o_left < right  # 横向有重合，上下相邻
+        if rows and o_left == right:
+            new_right = max(new_right, right + min(overlap, other["width"]))
+        if rows and o_right == left:
+            new_left = min(new_left, left - min(overlap, other["width"]))
+        if cols and o_top == bottom:
+            new_bottom = max(new_bottom, bottom + min(overlap, other["height"]))
+        if cols and o_bottom == top:
+            new_top = min(new_top, top - min(overlap, other["height"]))
+    return {
+        "left": new_left,
+        "top": new_top,
+        "width": new_right - new_left,
+        "height": new_bottom - new_top,
+    }
+
+
+def monitor_offset(monitor, virtual, image_width):
+    """计算显示器截图在虚拟屏幕截图中的像素偏移
+
+    mss 在 macOS 上返回逻辑坐标而截图是物理像素，用截图宽度换算缩放比例。
+    """
+    scale = image_width / monitor["width"]
+    return (
+        round((monitor["left"] - virtual["left"]) * scale),
+        round((monitor["top"] - virtual["top"]) * scale),
+    )
+
+
+class CaptureBackend(ABC):
+    """截图后端接口
+
+    monitors 与 mss 的格式一致：monitors[0] 为整个虚拟屏幕，
+    之后依次为各个物理显示器，每项包含 left/top/width/height。
+    """
+
+    @property
+    @abstractmethod
+    def monitors(self):
+        """显示器列表"""
+
+    @abstractmethod
+    def grab(self, monitor):
+        """截取指定区域，返回 BGRA 格式的 numpy 数组"""
+
+    def close(self):
+        """释放资源"""
+
+    def grab_frames(self, capture_config, overlap=0):
+        """按截图配置截取一帧或多帧
+
+        分显示器截图时，相邻显示器的截图互相重叠 overlap（通常为最大的模板尺寸），
+        使跨越显示器边界的模板也能被找到。
+        """
+        monitors = self.monitors
+        virtual = monitors[0]
+        if capture_config.per_monitor:
+            selected = select_monitors(
+                monitors, capture_config.monitors, capture_config.exclude_monitors
+            )
+            # 所有显示器都被排除时退回整个虚拟屏幕
+            if selected:
+                frames = []
+                for index, monitor in selected:
+                    if overlap > 0:
+                        others = [m for i, m in selected if i != index]
+                        monitor = expand_monitor(monitor, others, overlap)
+                    image = self.grab(monitor)
+                    offset = monitor_offset(monitor, virtual, image.shape[1])
+                    frames.append(Frame(index, image, offset))
+                return frames
+
+        return [Frame(0, self.grab(virtual))]
+
+
+class MssCapture(CaptureBackend):
+    """基于 mss 的真实屏幕截图"""
+
+    def __init__(self, sct=None):
+        if sct is None:
+            from mss import mss
+            sct = mss()
+        self.sct = sct
+
+    @property
+    def monitors(self):
+        return self.sct.monitors
+
+    def grab(self, monitor):
+        # 直接把 mss 的原始 BGRA 缓冲区包装成数组，不再复制一份
+        shot = self.sct.grab(monitor)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        self.sct.close()
+
+
+def synthetic_screen(width, height, seed=0, block=8):
+    """生成块状随机纹理的 BGRA 屏幕，纹理经得起降采样，接近真实界面"""
+    rng = np.random.default_rng(seed)
+    rows, cols = -(-height // block), -(-width // block)
+    noise = rng.integers(0, 256, (rows, cols, 4), dtype=np.uint8)
+    noise[..., 3] = 255
+    screen = np.repeat(np.repeat(noise, block, axis=0), block, axis=1)
+    return np.ascontiguousarray(screen[:height, :width])
+
+
+class FakeCapture(CaptureBackend):
+    """合成截图后端，用于测试和基准
+
+    每次截图返回 desktop 的对应区域，测试可以直接修改 desktop，
+    或者传入 generator(index) 按帧号生成整个桌面。
+    """
+
+    def __init__(self, desktop=None, monitors=None, generator=None, width=1920, height=1080):
+        if desktop is None:
+            desktop = generator(0) if generator else synthetic_screen(width, height)
+        self.desktop = desktop
+        self.generator = generator
+        self.frame_index = 0  # 已截取的次数
+        h, w = desktop.shape[:2]
+        virtual = {"left": 0, "top": 0, "width": w, "height": h}
+        self._monitors = [virtual] + list(monitors or [dict(virtual)])
+
+    @property
+    def monitors(self):
+        return self._monitors
+
+    def grab_frames(self, capture_config, overlap=0):
+        if self.generator is not None:
+            self.desktop = self.generator(self.frame_index)
+        self.frame_index += 1
+        return super().grab_frames(capture_config, overlap)
+
+    def grab(self, monitor):
+        left = monitor["left"] - self._monitors[0]["left"]
+        top = monitor["top"] - self._monitors[0]["top"]
+        return self.desktop[top:top + monitor["height"], left:left + monitor["width"]]
+
+    def place(self, image, x, y):
+        """把 BGR 或 BGRA 图像贴到桌面的 (x, y) 位置"""
+        h, w = image.shape[:2]
+        self.desktop[y:y + h, x:x + w, :image.shape[2]] = image
+
+
+class ReplayCapture(CaptureBackend):
+    """从图片文件回放截图，按顺序循环"""
+
+    def __init__(self, path, loop=True):
+        path = Path(path)
+        if path.is_dir():
+            files = sorted(
+                p for p in path.iterdir() if p.suffix.lower() in (".png", ".jpg", ".jpeg")
+            )
+        else:
+            files = [path]
+        self.images = [self.load(p) for p in files]
+        self.images = [image for image in self.images if image is not None]
+        if not self.images:
+            raise FileNotFoundError(f"没有可回放的截图: {path}")
+        self.loop = loop
+        self.index = 0  # 下一帧的序号
+        self._current = self.images[0]  # grab() 截取的图片，grab_frames() 之前为第一张
+        h, w = self.images[0].shape[:2]
+        self._monitors = [{"left": 0, "top": 0, "width": w, "height": h}] * 2
+
+    @staticmethod
+    def load(path):
+        image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            logger.warning(f"无法加载回放截图: {path}")
+            return None
+        if image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGRA)
+        if image.shape[2] == 3:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+        return image
+
+    @property
+    def monitors(self):
+        return self._monitors
+
+    def grab_frames(self, capture_config, overlap=0):
+        image = self.images[self.index]
+        if self.index + 1 < len(self.images):
+            self.index += 1
+        elif self.loop:
+            self.index = 0
+        self._current = image
+        return super().grab_frames(capture_config, overlap)
+
+    def grab(self, monitor):
+        left, top = monitor["left"], monitor["top"]
+        return self._current[top:top + monitor["height"], left:left + monitor["width"]]
+
+
+def create_capture_backend(capture_config):
+    """根据配置创建截图后端"""
+    if capture_config.backend == "replay":
+        return ReplayCapture(capture_config.replay_path)
+    if capture_config.backend == "fake":
+        return FakeCapture()
+    return MssCapture()
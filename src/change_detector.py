@@ -0,0 +1,95 @@
+"""屏幕变化检测
+
+把每帧截图切成粗粒度的方块，为每个方块计算校验和并与上一帧比较。
+画面没有变化时匹配循环可以直接复用上一次的匹配结果。
+"""
+import numpy as np
+
+
+class FrameChangeDetector:
+    """基于方块校验和的帧变化检测器"""
+
+    def __init__(self, tile_size: int = 64):
+        self.tile_size = tile_size
+        self.hits = 0  # 画面未变化、复用上次结果的帧数
+        self.misses = 0  # 画面有变化、需要重新匹配的帧数
+        self._checksums = None
+        self._col_weights = None  # 每列的伪随机权重，宽度变化时重建
+
+    def reset(self):
+        """丢弃上一帧的校验和，下一帧视为全部变化"""
+        self._checksums = None
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        """返回缓存命中统计"""
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+    def checksums(self, frame: np.ndarray) -> np.ndarray:
+        """计算每个方块的校验和，返回形状为 (rows, cols, 3) 的数组
+
+        第一个分量是方块内所有像素值之和，第二个分量按行号加权，
+        用来区分行之间的移动；第三个分量按每列的伪随机权重加权，
+        用来区分同一行内的左右移动。
+        """
+        h, w = frame.shape[:2]
+        if frame.ndim == 3 and frame.shape[2] == 4 and frame.flags.c_contiguous:
+            # BGRA 每个像素正好是一个 uint32，按像素求和
+            words = frame.view(np.uint32).reshape(h, w)
+            col_step = self.tile_size
+        else:
+            words = np.ascontiguousarray(frame).reshape(h, -1)
+            col_step = self.tile_size * (words.shape[1] // w)
+
+        col_starts = np.arange(0, words.shape[1], col_step)
+        row_starts = np.arange(0, h, self.tile_size)
+
+        # 先按列方块求每行的和，再按行方块汇总；
+        # 校验和允许按 uint32 回绕，这样不需要把整帧转换成 uint64
+        row_sums = np.add.reduceat(
+            words, col_starts, axis=1, dtype=np.uint32
+        ).astype(np.uint64)
+        weights = np.arange(1, h + 1, dtype=np.uint64)[:, None]
+        plain = np.add.reduceat(row_sums, row_starts, axis=0)
+        weighted = np.add.reduceat(row_sums * weights, row_starts, axis=0)
+        # 再按行方块求每列的和，乘以列权重后按列方块汇总；
+        # 沿第 0 轴 reduceat 很慢，完整的行方块改为 reshape 后求和
+        tile = self.tile_size
+        full = h // tile * tile
+        col_sums = [words[:full].reshape(-1, tile, words.shape[1]).sum(axis=1, dtype=np.uint32)]
+        if full < h:
+            col_sums.append(words[full:].sum(axis=0, dtype=np.uint32, keepdims=True))
+        col_sums = np.concatenate(col_sums)
+        col_weighted = np.add.reduceat(
+            col_sums * self.column_weights(words.shape[1]), col_starts, axis=1, dtype=np.uint32
+        ).astype(np.uint64)
+        return np.stack([plain, weighted, col_weighted], axis=-1)
+
+    def column_weights(self, width):
+        """每列固定的伪随机权重，相乘时按 uint32 回绕"""
+        if self._col_weights is None or len(self._col_weights) != width:
+            rng = np.random.default_rng(width)
+            self._col_weights = rng.integers(1, 2**32, width, dtype=np.uint32)
+        return self._col_weights
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        """与上一帧比较，返回变化方块的布尔掩码 (rows, cols)
+
+        首帧或尺寸变化时所有方块都视为已变化。
+        """
+        checksums = self.checksums(frame)
+        if self._checksums is None or self._checksums.shape != checksums.shape:
+            dirty = np.ones(checksums.shape[:2], dtype=bool)
+        else:
+            dirty = np.any(self._checksums != checksums, axis=-1)
+        self._checksums = checksums
+
+        if dirty.any():
+            self.misses += 1
+        else:
+            self.hits += 1
+        return dirty
@@ -0,0 +1,216 @@
+"""无界面命令行
+
+watchcat watch 在没有 Qt 的情况下运行截图、匹配和提醒流程，
+匹配事件输出到标准输出（文本或 JSON Lines），并可以在出现 / 消失时执行钩子命令。
+适合在 Xvfb 等无人值守的环境中运行。
+
+用法:
+    watchcat watch [模板图片 ...] [--json] [--on-match 命令] [--on-lost 命令]
+    python -m src.cli watch ...
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from src.capture import create_capture_backend
+from src.config import Config
+from src.engine import MatchEngine
+from src.journal import create_journal
+from src.log import logger
+
+
+class Watcher:
+    """驱动 MatchEngine 并把匹配状态变化转换为事件"""
+
+    def __init__(self, engine, json_output=False, on_match=None, on_lost=None, sound=False):
+        self.engine = engine
+        self.json_output = json_output
+        self.on_match = on_match  # 目标出现时执行的 shell 命令
+        self.on_lost = on_lost  # 目标消失时执行的 shell 命令
+        self.sound = sound  # 目标出现时是否播放提示音
+        self.matched = {}  # 每个目标的匹配状态 {name: bool}
+        self.out = sys.stdout
+
+    def step(self):
+        """执行一轮匹配，返回本轮产生的事件"""
+        events = []
+        for result in self.engine.step():
+            name = result.target.name
+            matched = result.rect is not None
+            if matched == self.matched.get(name, False):
+                continue
+            self.matched[name] = matched
+            event = {
+                "time": time.time(),
+                "event": "matched" if matched else "lost",
+                "target": name,
+                "score": round(result.score, 4),
+            }
+            if matched:
+                event["rect"] = list(result.rect)
+            events.append(event)
+        for event in events:
+            self.emit(event)
+        return events
+
+    def emit(self, event):
+        """输出事件并执行钩子"""
+        if self.json_output:
+            print(json.dumps(event, ensure_ascii=False), file=self.out, flush=True)
+        else:
+            stamp = time.strftime("%H:%M:%S", time.localtime(event["time"]))
+            if event["event"] == "matched":
+                x, y, w, h = event["rect"]
+                text = f"出现 位置({x}, {y}) 大小({w}x{h})"
+            else:
+                text = "消失"
+            print(
+                f"{stamp} [{event['target']}] {text} 匹配度 {event['score']*100:.1f}%",
+                file=self.out,
+                flush=True,
+            )
+
+        command = self.on_match if event["event"] == "matched" else self.on_lost
+        if command:
+            self.run_hook(command, event)
+        if self.sound and event["event"] == "matched":
+            self.play_sound()
+
+    @staticmethod
+    def run_hook(command, event):
+        """在后台执行钩子命令，事件通过环境变量和标准输入传入"""
+        env = dict(os.environ)
+        env["WATCHCAT_EVENT"] = event["event"]
+        env["WATCHCAT_TARGET"] = event["target"]
+        env["WATCHCAT_SCORE"] = str(event["score"])
+        if "rect" in event:
+            env["WATCHCAT_RECT"] = ",".join(str(v) for v in event["rect"])
+        try:
+            process = subprocess.Popen(command, shell=True, env=env, stdin=subprocess.PIPE)
+            process.stdin.write(json.dumps(event).encode() + b"\n")
+            process.stdin.close()
+        except OSError as e:
+            logger.warning(f"钩子命令执行失败: {e}")
+
+    def play_sound(self):
+        try:
+            from src.sounds import SoundPlayer, SoundType
+            config = self.engine.config.data
+            SoundPlayer.play_sound(SoundType[config.sound_type], config)
+        except Exception as e:  # 没有音频设备时只记录一次警告
+            logger.warning(f"播放提示音失败，已关闭声音: {e}")
+            self.sound = False
+
+    def run(self, max_cycles=None, once=False):
+        """循环匹配直到被中断；once 为 True 时在首次匹配后退出
+
+        Returns:
+            是否有目标出现过
+        """
+        cycles = 0
+        seen = False
+        while max_cycles is None or cycles < max_cycles:
+            events = self.step()
+            cycles += 1
+            if any(event["event"] == "matched" for event in events):
+                seen = True
+                if once:
+                    break
+            time.sleep(self.engine.sleep_ms / 1000)
+        return seen
+
+
+def load_targets(engine, templates, config):
+    """加载命令行指定的模板；未指定时使用配置中的上次图片和监视列表"""
+    loaded = 0
+    if templates:
+        for path in templates:
+            image, key = engine.load_template(path)
+            if image is None:
+                logger.error(f"无法加载模板: {path}")
+                continue
+            engine.add_target(Path(path).name, image, key=key)
+            loaded += 1
+        return loaded
+
+    if config.data.last_image:
+        image, key = engine.load_template(config.data.last_image)
+        if image is not None:
+            engine.set_target(image, key)
+            loaded += 1
+    for item in config.data.watch_list:
+        image, key = engine.load_template(item.path)
+        if image is None:
+            logger.error(f"无法加载监视目标: {item.path}")
+            continue
+        name = item.name or Path(item.path).name
+        engine.add_target(name, image, item.threshold, item.grayscale, key)
+        loaded += 1
+    return loaded
+
+
+def watch(args):
+    config = Config()
+    # 命令行参数只覆盖本次运行的配置，不写回磁盘
+    if args.threshold is not None:
+        config.data.match.threshold = args.threshold
+    if args.backend:
+        config.data.capture.backend = args.backend
+    if args.replay:
+        config.data.capture.backend = "replay"
+        config.data.capture.replay_path = args.replay
+    if args.no_journal:
+        config.data.journal.enabled = False
+
+    capture = create_capture_backend(config.data.capture)
+    engine = MatchEngine(capture, config)
+    engine.journal = create_journal(config.data.journal)
+    try:
+        if not load_targets(engine, args.templates, config):
+            logger.error("没有可监视的模板")
+            return 2
+        watcher = Watcher(engine, args.json, args.on_match, args.on_lost, args.sound)
+        seen = watcher.run(args.max_cycles, args.once)
+        return 0 if seen or not args.once else 1
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        engine.close()
+        capture.close()
+        config.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="watchcat", description="屏幕模板监视工具")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_watch = commands.add_parser("watch", help="无界面监视屏幕，输出匹配事件")
+    parser_watch.add_argument("templates", nargs="*", help="模板图片，默认使用配置中的上次图片和监视列表")
+    parser_watch.add_argument("--json", action="store_true", help="以 JSON Lines 输出事件")
+    parser_watch.add_argument("--threshold", type=float, help="匹配度阈值")
+    parser_watch.add_argument("--backend", choices=["mss", "replay", "fake"], help="截图后端")
+    parser_watch.add_argument("--replay", help="回放的截图文件或目录（使用 replay 后端）")
+    parser_watch.add_argument("--on-match", help="目标出现时执行的 shell 命令")
+    parser_watch.add_argument("--on-lost", help="目标消失时执行的 shell 命令")
+    parser_watch.add_argument("--sound", action="store_true", help="目标出现时播放提示音")
+    parser_watch.add_argument("--once", action="store_true", help="首次匹配后退出，未匹配时退出码为 1")
+    parser_watch.add_argument("--max-cycles", type=int, help="最多匹配的轮数")
+    parser_watch.add_argument("--no-journal", action="store_true", help="不写匹配事件日志")
+    parser_watch.set_defaults(func=watch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    # 打包后的应用中 parallel 匹配模式的子进程需要它
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,8 +1,14 @@
+import atexit
 import json
 import os
+from contextlib import contextmanager
 from pathlib import Path
 import sys
-from typing import Optional
+import tempfile
+import threading
+import time
+import weakref
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -33,6 +39,65 @@ class CustomSound(BaseModel):
     start: float = Field(default=0, description="开始时间（秒）")
     duration: float = Field(default=3, description="持续时间（秒）")
 
+class MatchConfig(BaseModel):
+    threshold: float = Field(default=0.8, description="匹配度阈值")
+    mode: str = Field(default="full", description="匹配模式：full（全屏）、pyramid（金字塔由粗到精）或 parallel（多进程分块）")
+    pyramid_levels: int = Field(default=2, description="金字塔层数，每层边长缩小一半")
+    pyramid_candidates: int = Field(default=3, description="金字塔模式下在全分辨率确认的候选数量")
+    grayscale: bool = Field(default=False, description="在灰度图上匹配，计算量约为彩色的三分之一")
+    color_check: bool = Field(default=True, description="灰度匹配成功后在匹配位置上校验颜色")
+    scales: List[float] = Field(default_factory=lambda: [1.0], description="模板缩放比例，例如 [1.0, 2.0, 0.5]")
+    dpi_scales: bool = Field(default=False, description="自动加入主屏幕 devicePixelRatio 及其倒数作为缩放比例")
+    parallel_scales: bool = Field(default=True, description="并行搜索多个缩放比例")
+    workers: int = Field(default=4, description="parallel 模式下的匹配进程数")
+    tracking: bool = Field(default=True, description="是否优先在上次匹配位置附近搜索")
+    track_padding: int = Field(default=32, description="跟踪搜索窗口向四周扩展的像素数")
+    full_search_interval: int = Field(default=25, description="跟踪模式下每隔多少帧强制全屏搜索一次")
+    skip_unchanged: bool = Field(default=True, description="画面未变化时复用上次匹配结果")
+    change_tile_size: int = Field(default=64, description="变化检测的方块边长（像素）")
+    incremental: bool = Field(default=True, description="全屏模式下只重算变化区域的匹配结果（需开启 skip_unchanged）")
+
+class PollingConfig(BaseModel):
+    adaptive: bool = Field(default=True, description="是否根据画面变化自适应调整轮询间隔")
+    interval_ms: int = Field(default=200, description="关闭自适应时的固定轮询间隔（毫秒）")
+    min_interval_ms: int = Field(default=200, gt=0, description="画面变化或匹配度接近阈值时的轮询间隔（毫秒）")
+    max_interval_ms: int = Field(default=2000, description="画面静止时退避到的最大轮询间隔（毫秒）")
+    backoff: float = Field(default=1.5, gt=1, description="画面静止时每轮间隔的增长倍数")
+    near_margin: float = Field(default=0.1, description="匹配度与阈值相差多少以内视为接近阈值")
+
+class CaptureConfig(BaseModel):
+    backend: str = Field(default="mss", description="截图后端：mss（真实屏幕）、replay（图片回放）或 fake（合成画面）")
+    replay_path: Optional[str] = Field(default=None, description="replay 后端回放的图片文件或目录")
+    per_monitor: bool = Field(default=False, description="分别截取每个显示器，而不是整个虚拟屏幕；相邻显示器的截图互相重叠最大的模板尺寸，跨越边界的模板也能找到，但不相邻（有空隙）的显示器之间不重叠")
+    monitors: List[int] = Field(default_factory=list, description="要截取的显示器编号（从 1 开始），为空表示全部")
+    exclude_monitors: List[int] = Field(default_factory=list, description="不截取的显示器编号")
+    parallel: bool = Field(default=False, description="分显示器截图时并行匹配各显示器")
+
+class TemplateStoreConfig(BaseModel):
+    enabled: bool = Field(default=True, description="缓存解码后的模板及其灰度图、金字塔和缩放模板")
+    path: Optional[str] = Field(default=None, description="模板库目录，默认 ~/.watchcat/templates")
+    max_mb: int = Field(default=512, description="模板库占用的磁盘上限（MB），超出时淘汰最久未使用的模板")
+
+class JournalConfig(BaseModel):
+    enabled: bool = Field(default=True, description="记录匹配状态变化和定期摘要")
+    path: Optional[str] = Field(default=None, description="事件日志文件，默认 ~/.watchcat/journal.jsonl")
+    max_mb: int = Field(default=10, description="单个日志文件的大小上限（MB），超出时轮转")
+    backups: int = Field(default=3, description="保留的轮转文件数")
+    summary_interval: float = Field(default=60, description="写入摘要的间隔（秒）")
+    min_interval: float = Field(default=1.0, description="同一目标两次状态变化记录的最小间隔（秒）")
+
+class AlertConfig(BaseModel):
+    queue_size: int = Field(default=32, description="提醒队列长度，队列满时丢弃新的提醒")
+    coalesce_ms: int = Field(default=200, description="在此时间内到达的多个提醒合并为一个（毫秒）")
+    notification_interval: float = Field(default=3.0, description="两次系统通知的最小间隔（秒），期间的提醒合并后发送")
+    sound_interval: float = Field(default=1.0, description="两次提示音的最小间隔（秒）")
+
+class WatchItem(BaseModel):
+    path: str = Field(description="模板图片路径")
+    name: Optional[str] = Field(default=None, description="目标名称，默认使用文件名")
+    threshold: Optional[float] = Field(default=None, description="匹配度阈值，默认使用 match.threshold")
+    grayscale: Optional[bool] = Field(default=None, description="是否在灰度图上匹配，默认使用 match.grayscale")
+
 class AppConfig(BaseModel):
     position: Position = Field(default_factory=Position, description="窗口位置")
     size: Size = Field(default_factory=Size, description="窗口大小")
@@ -44,11 +109,164 @@ class AppConfig(BaseModel):
     enable_notification: bool = Field(default=True, description="是否启用通知")
     enable_sound: bool = Field(default=True, description="是否启用声音")
     custom_sound: CustomSound = Field(default_factory=CustomSound, description="自定义音乐设置")
+    match: MatchConfig = Field(default_factory=MatchConfig, description="匹配设置")
+    polling: PollingConfig = Field(default_factory=PollingConfig, description="轮询设置")
+    capture: CaptureConfig = Field(default_factory=CaptureConfig, description="截图设置")
+    template_store: TemplateStoreConfig = Field(default_factory=TemplateStoreConfig, description="模板库设置")
+    journal: JournalConfig = Field(default_factory=JournalConfig, description="匹配事件日志设置")
+    alerts: AlertConfig = Field(default_factory=AlertConfig, description="提醒分发设置")
+    watch_list: List[WatchItem] = Field(default_factory=list, description="与主目标一同监视的其他模板")
+
+def diff_config(old, new, prefix=""):
+    """比较两份配置，返回取值不同的字段路径集合，例如 {"match.threshold", "watch_list"}
+
+    嵌套的设置逐字段比较，列表整体比较。
+    """
+    old = old.model_dump() if isinstance(old, BaseModel) else old
+    new = new.model_dump() if isinstance(new, BaseModel) else new
+    changed = set()
+    for key in old.keys() | new.keys():
+        before, after = old.get(key), new.get(key)
+        if isinstance(before, dict) and isinstance(after, dict):
+            changed |= diff_config(before, after, f"{prefix}{key}.")
+        elif before != after:
+            changed.add(f"{prefix}{key}")
+    return changed
+
+
+def touched(changes, *fields):
+    """changes 中是否包含 fields 中的任一字段或其子字段；changes 为 None 表示未知，视为全部变化"""
+    if changes is None:
+        return True
+    return any(
+        change == field or change.startswith(field + ".") for change in changes for field in fields
+    )
+
+
+class ConfigWriter:
+    """在后台线程中写入配置文件
+
+    连续的保存请求在 delay 秒内没有新的请求后才写一次；
+    先写入同目录下的临时文件再重命名，写到一半退出也不会留下损坏的配置。
+    每次请求带递增的序号，后台线程和 flush() 并发写入时不会用旧的配置覆盖新的。
+    """
+
+    RETRY_DELAY = 5.0  # 写入失败后重试的间隔（秒）
+
+    def __init__(self, path, delay=0.5):
+        self.path = Path(path)
+        self.delay = delay
+        self.writes = 0  # 实际写入磁盘的次数
+        self.written = None  # 最近一次写入磁盘的配置（dict）
+        self._sequence = 0  # 最近一次请求的序号
+        self._written_sequence = 0  # 最近一次写入的序号
+        self._pending = None  # 等待写入的配置 (序号, AppConfig)
+        self._deadline = 0.0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._closed = False  # close() 之后不再启动后台线程，只能 flush()
+
+    def schedule(self, data: AppConfig):
+        """安排写入，delay 秒内的多次请求只写最后一次"""
+        with self._cond:
+            self._sequence += 1
+            self._pending = (self._sequence, data)
+            self._deadline = time.monotonic() + self.delay
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="config-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    @property
+    def pending(self):
+        """是否有尚未写入的配置"""
+        return self._pending is not None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                pending, self._pending = self._pending, None
+            try:
+                self._write(*pending)
+            except Exception as e:
+                from src.log import logger
+                logger.warning(f"写入配置文件失败，{self.RETRY_DELAY:g} 秒后重试: {e}")
+                with self._cond:
+                    # 期间没有新的请求时稍后重试这份配置
+                    if self._pending is None:
+                        self._pending = pending
+                        self._deadline = time.monotonic() + self.RETRY_DELAY
+
+    def flush(self):
+        """立即写入尚未写入的配置"""
+        with self._cond:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            self._write(*pending)
+
+    def close(self):
+        """结束后台线程并写入尚未写入的配置"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def _write(self, sequence, data: AppConfig):
+        """写入一份配置，比已写入的更旧时跳过，返回是否写入"""
+        snapshot = data.model_dump()
+        text = json.dumps(snapshot, indent=2)
+        with self._write_lock:
+            if sequence <= self._written_sequence:
+                return False
+            fd, tmp = tempfile.mkstemp(prefix=self.path.name, suffix=".tmp", dir=self.path.parent)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+            self._written_sequence = sequence
+            self.written = snapshot
+            self.writes += 1
+        return True
+
+
+# 尚未关闭的配置对象，退出时写入它们尚未写入的修改
+_open_configs = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_configs():
+    for config in list(_open_configs):
+        config.flush()
+
 
 class Config:
-    def __init__(self):
+    def __init__(self, save_delay=0.5):
         self.config_path = Path.home() / ".autogui.json"
         self.data = self.load()
+        self.writer = ConfigWriter(self.config_path, save_delay)
+        self.writer.written = self.data.model_dump()  # 文件中已有的内容视为已写入
+        self.subscribers = []  # 配置变化时的回调 callback(changes)
+        self.watcher = None  # 配置文件监视器（FileWatcher），watch() 后设置
+        self._batch = None  # batch() 中累积的修改
+        _open_configs.add(self)
 
     def load(self) -> AppConfig:
         """Load config, use defaults if file doesn't exist"""
@@ -67,9 +285,117 @@ class Config:
                 return AppConfig()
 
     def save(self):
-        """Save config to file"""
-        with open(self.config_path, "w") as f:
-            json.dump(self.data.model_dump(), f, indent=2)
+        """安排保存配置，用于直接修改 self.data 之后；写入在后台线程中去抖执行"""
+        self.writer.schedule(self.data)
+        self.notify(None)
+
+    def flush(self):
+        """立即把尚未写入的配置写到磁盘，退出前调用"""
+        self.writer.flush()
+
+    def reload(self):
+        """重新读取配置文件，返回变化的字段集合；文件无效时保留当前配置
+
+        有尚未写入的修改时不重新加载：文件中还是旧的内容，写入后会再次触发。
+        文件与最近一次写入的内容相同时（自己的写入，或写入线程正在写新的内容）也不重新加载。
+        """
+        if self.writer.pending:
+            return set()
+        try:
+            with open(self.config_path) as f:
+                data = AppConfig.model_validate(json.load(f))
+        except (OSError, ValueError) as e:  # ValidationError 是 ValueError 的子类
+            from src.log import logger
+            logger.warning(f"配置文件无效，保留当前配置: {e}")
+            return set()
+        if data.model_dump() == self.writer.written:
+            return set()
+        changes = diff_config(self.data, data)
+        if changes:
+            self.data = data
+            from src.log import logger
+            logger.info(f"配置文件已变化: {', '.join(sorted(changes))}")
+            self.notify(changes)
+        return changes
+
+    def watch(self, **kwargs):
+        """开始监视配置文件，在应用外的修改会自动重新加载"""
+        if self.watcher is None:
+            from src.config_watcher import FileWatcher
+            self.watcher = FileWatcher(self.config_path, self.reload, **kwargs).start()
+        return self.watcher
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def close(self):
+        """停止监视，写入尚未写入的修改并结束写入线程，退出时不再处理这个配置对象"""
+        self.stop_watching()
+        self.writer.close()
+        _open_configs.discard(self)
+
+    def subscribe(self, callback):
+        """订阅配置变化
+
+        callback(changes) 中 changes 为变化的字段路径集合（例如 {"match.threshold"}），
+        直接修改 data 后调用 save() 时无法得知变化的字段，changes 为 None。
+        回调在修改配置的线程中执行（界面线程或配置文件监视线程），应尽快返回。
+        """
+        self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def notify(self, keys):
+        for callback in list(self.subscribers):
+            try:
+                callback(keys)
+            except Exception as e:
+                from src.log import logger
+                logger.warning(f"配置订阅回调出错: {e}")
+
+    @contextmanager
+    def batch(self):
+        """把多次修改合并为一次校验、一次通知和一次写入
+
+        with config.batch():
+            config["position"] = {...}
+            config["size"] = {...}
+        """
+        if self._batch is not None:  # 嵌套时并入外层
+            yield self
+            return
+        self._batch = {}
+        try:
+            yield self
+        except BaseException:
+            self._batch = None
+            raise
+        changes, self._batch = self._batch, None
+        if changes:
+            self.update(changes)
+
+    def update(self, changes=None, **kwargs):
+        """修改一个或多个字段，只校验修改的字段；任一字段无效时整体不生效"""
+        changes = {**(changes or {}), **kwargs}
+        if self._batch is not None:
+            self._batch.update(changes)
+            return
+        old, data = self.data, self.data.model_copy()
+        for key, value in changes.items():
+            if key not in AppConfig.model_fields:
+                raise KeyError(key)
+            AppConfig.__pydantic_validator__.validate_assignment(data, key, value)
+        self.data = data
+        self.writer.schedule(data)
+        fields = set(changes)
+        changed = diff_config(old.model_dump(include=fields), data.model_dump(include=fields))
+        if changed:
+            self.notify(changed)
 
     def __getitem__(self, key):
         """支持字典式访问，同时进行类型检查"""
@@ -77,8 +403,4 @@ class Config:
 
     def __setitem__(self, key, value):
         """支持字典式赋值，同时进行类型检查"""
-        # 让 pydantic 进行类型验证
-        updated_data = self.data.model_dump()
-        updated_data[key] = value
-        self.data = AppConfig.model_validate(updated_data)
-        self.save()
+        self.update({key: value})
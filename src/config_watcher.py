@@ -0,0 +1,136 @@
+"""配置文件监视
+
+Linux 上通过 inotify 监视配置文件所在的目录（编辑器和 ConfigWriter 都是先写临时文件
+再重命名，直接监视文件会在替换后失效）；其他平台或 inotify 不可用时定期比较文件状态。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+from src.log import logger
+
+# inotify 事件掩码，见 <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class FileWatcher:
+    """在后台线程中监视一个文件，文件内容变化后调用 callback()
+
+    同一次保存产生的多个事件在 settle 秒内合并为一次回调。
+    """
+
+    def __init__(self, path, callback, interval=1.0, settle=0.1, use_inotify=True):
+        self.path = Path(path)
+        self.callback = callback
+        self.interval = interval  # 轮询间隔（秒），仅在没有 inotify 时使用
+        self.settle = settle
+        self.backend = None  # "inotify" 或 "polling"，启动后设置
+        self.changes = 0  # 触发回调的次数
+        self._use_inotify = use_inotify and sys.platform.startswith("linux")
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = None
+
+    def start(self):
+        fd = self._open_inotify() if self._use_inotify else None
+        self.backend = "inotify" if fd is not None else "polling"
+        target = self._run_inotify if fd is not None else self._run_polling
+        self._thread = threading.Thread(
+            target=target, args=(fd,) if fd is not None else (), name="config-watcher", daemon=True
+        )
+        self._thread.start()
+        logger.debug(f"监视配置文件 {self.path}（{self.backend}）")
+        return self
+
+    def _open_inotify(self):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1")
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+            if libc.inotify_add_watch(fd, os.fsencode(self.path.parent), mask) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch")
+            return fd
+        except (OSError, AttributeError) as e:
+            logger.debug(f"inotify 不可用，改为轮询: {e}")
+            return None
+
+    def _run_inotify(self, fd):
+        name = os.fsencode(self.path.name)
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd, self._wake_r], [], [])
+                if fd not in ready:
+                    continue
+                if name in self._read_names(fd):
+                    # 等待同一次保存的后续事件，然后只回调一次
+                    time.sleep(self.settle)
+                    self._read_names(fd)
+                    self._notify()
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _read_names(fd):
+        """读出所有待处理的事件，返回涉及的文件名"""
+        names = set()
+        while True:
+            try:
+                data = os.read(fd, 4096)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                names.add(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+
+    def _signature(self):
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _run_polling(self):
+        last = self._signature()
+        while not self._stop.wait(self.interval):
+            signature = self._signature()
+            if signature != last:
+                last = signature
+                self._notify()
+
+    def _notify(self):
+        if self._stop.is_set() or not self.path.exists():
+            return
+        self.changes += 1
+        try:
+            self.callback()
+        except Exception as e:
+            logger.warning(f"处理配置文件变化时出错: {e}")
+
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        os.write(self._wake_w, b"\0")
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
@@ -0,0 +1,441 @@
+"""匹配引擎
+
+截图、变化检测、模板匹配和轮询调度的完整流程，不依赖 Qt。
+ImageMatchThread 在 QThread 中驱动它；测试和基准可以配合
+FakeCapture / ReplayCapture 在没有显示器的环境下直接驱动。
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+
+from src.buffers import BufferPool
+from src.change_detector import FrameChangeDetector
+from src.config import touched
+from src.journal import create_journal
+from src.log import logger
+from src.parallel_matcher import TiledMatchPool
+from src.scheduler import AdaptiveScheduler
+from src.template_store import TemplateStore
+from src.timings import StageTimings
+from src.watch_target import WatchTarget
+
+
+class MatchResult(NamedTuple):
+    """一个目标在一轮匹配中的结果"""
+    target: WatchTarget
+    score: float  # 匹配度
+    rect: Optional[Tuple[int, int, int, int]]  # 匹配位置 (x, y, w, h)，未匹配时为 None
+    became_matched: bool  # 是否从未匹配状态转变为匹配状态
+
+
+class MatchEngine:
+    """多目标匹配引擎"""
+
+    MAIN_TARGET = "main"  # 主目标（托盘中选择的图片）的名称
+
+    def __init__(self, capture, config):
+        self.capture = capture  # 截图后端
+        self.config = config
+        self.target = None  # 主目标
+        self.watch_targets = {}  # 监视列表中的其他目标 {name: WatchTarget}
+        self.target_specs = {}  # 重建目标所需的参数 {name: (grayscale, key)}
+        self.watch_items = {}  # 由 sync_watch_list 加载的监视列表项 {name: WatchItem}
+        self.change_detectors = {}  # 每个显示器各自的变化检测器 {frame.key: FrameChangeDetector}
+        self.match_pool = None  # parallel 模式的进程池，按需创建
+        self.capture_executor = None  # 并行匹配多个显示器的线程池，按需创建
+        self.scale_executor = None  # 并行搜索多个缩放比例的线程池，按需创建
+        self.device_pixel_ratio = 1.0  # 主屏幕的 devicePixelRatio，由界面设置
+        self.scheduler = AdaptiveScheduler(config)
+        self.buffers = BufferPool()  # 每个显示器复用的颜色转换缓冲区
+        self.template_store = None  # 模板库，按需创建
+        self.timings = StageTimings()  # 各阶段耗时的滚动直方图
+        self.journal = None  # 匹配事件日志（MatchJournal），由创建者设置，可选
+        self.cycle_time = 0.0  # 上一轮耗时（秒）
+        self.sleep_ms = 0  # 下一轮之前应休眠的毫秒数
+        self.paused = False  # 暂停时驱动循环在 idle() 中休眠，直到 resume()
+        self._config_changes = []  # 尚未应用的配置变化，由 config_changed 在任意线程中加入
+        self._pending_target = None  # swap_target 准备好的主目标 (WatchTarget, key)
+        self._wakeup = threading.Event()  # 提前唤醒 idle() 中休眠的驱动循环
+        self._lock = threading.Lock()
+
+    def has_targets(self):
+        """是否有监视目标，包括等待换上的主目标"""
+        return bool(self.target is not None or self.watch_targets or self._pending_target)
+
+    def targets(self):
+        """返回当前所有监视目标，主目标在前"""
+        targets = list(self.watch_targets.values())
+        if self.target is not None:
+            targets.insert(0, self.target)
+        return targets
+
+    def get_template_store(self):
+        """返回模板库，未启用时返回 None"""
+        store_config = self.config.data.template_store
+        if not store_config.enabled:
+            return None
+        if self.template_store is None:
+            root = store_config.path or Path.home() / ".watchcat" / "templates"
+            self.template_store = TemplateStore(root, store_config.max_mb * 1024 * 1024)
+        self.template_store.max_bytes = store_config.max_mb * 1024 * 1024
+        return self.template_store
+
+    def load_template(self, path):
+        """加载模板图片，返回 (image, key)，无法加载时 image 为 None
+
+        启用模板库时 key 为内容哈希，同一图片再次加载时直接映射缓存；
+        未启用时 key 为 None。
+        """
+        store = self.get_template_store()
+        if store is None:
+            return cv2.imread(str(path)), None
+        return store.load(path)
+
+    def create_target(self, name, image, threshold=None, grayscale=None, key=None):
+        match_config = self.config.data.match
+        store = self.get_template_store() if key is not None else None
+        return WatchTarget(
+            name,
+            image,
+            threshold,
+            tile_size=match_config.change_tile_size,
+            pyramid_levels=match_config.pyramid_levels,
+            grayscale=match_config.grayscale if grayscale is None else grayscale,
+            cache=store.view(key) if store is not None else None,
+        )
+
+    def set_target(self, image, key=None):
+        """设置主目标图片，key 为 load_template 返回的模板库键"""
+        h, w = image.shape[:2]
+        logger.info(f"设置目标图片: {w}x{h}")
+        self.target = self.create_target(self.MAIN_TARGET, image, key=key)
+        self.target_specs[self.MAIN_TARGET] = (None, key)
+        self.reset_cache()
+
+    def swap_target(self, image, key=None):
+        """在调用方线程中准备新的主目标，下一轮开始之前原子地换上
+
+        正在进行的一轮不受影响，其他目标、变化检测器和缓冲区保持不变；
+        休眠中的驱动循环会被立即唤醒，不必等到下一个轮询间隔。
+        """
+        h, w = image.shape[:2]
+        logger.info(f"切换目标图片: {w}x{h}")
+        target = self.create_target(self.MAIN_TARGET, image, key=key)
+        with self._lock:
+            self._pending_target = (target, key)
+        self.wake()
+
+    def apply_pending_target(self):
+        """换上 swap_target 准备好的主目标"""
+        with self._lock:
+            pending, self._pending_target = self._pending_target, None
+        if pending is not None:
+            self.target, key = pending
+            self.target_specs[self.MAIN_TARGET] = (None, key)
+            # 新目标从最小间隔开始轮询，尽快给出第一个结果
+            self.scheduler.interval_ms = self.config.data.polling.min_interval_ms
+
+    def pause(self):
+        """暂停匹配，正在进行的一轮完成后驱动循环在 idle() 中休眠，线程和缓存保持"""
+        self.paused = True
+
+    def resume(self):
+        """恢复匹配，立即唤醒驱动循环"""
+        self.paused = False
+        self.wake()
+
+    def wake(self):
+        """唤醒在 idle() 中休眠的驱动循环"""
+        self._wakeup.set()
+
+    def idle(self, timeout):
+        """两轮之间的休眠：最多 timeout 秒，暂停时一直休眠到恢复；wake() 会提前结束休眠"""
+        self._wakeup.wait(None if self.paused else timeout)
+        self._wakeup.clear()
+
+    def add_target(self, name, image, threshold=None, grayscale=None, key=None):
+        """向监视列表添加目标，同名目标会被替换"""
+        h, w = image.shape[:2]
+        logger.info(f"添加监视目标 {name}: {w}x{h}")
+        # 新目标没有缓存的结果，第一轮会全量匹配，其他目标的缓存不受影响
+        self.watch_targets[name] = self.create_target(name, image, threshold, grayscale, key)
+        self.target_specs[name] = (grayscale, key)
+
+    def remove_target(self, name):
+        """从监视列表移除目标"""
+        self.target_specs.pop(name, None)
+        self.watch_items.pop(name, None)
+        if self.watch_targets.pop(name, None) is not None:
+            logger.info(f"移除监视目标 {name}")
+
+    def sync_watch_list(self):
+        """按配置的监视列表添加、替换或移除目标，未变化的目标保持不变，返回新加载的目标数"""
+        wanted = {item.name or Path(item.path).name: item for item in self.config.data.watch_list}
+        for name in [name for name in self.watch_items if name not in wanted]:
+            self.remove_target(name)
+        loaded = 0
+        for name, item in wanted.items():
+            if self.watch_items.get(name) == item and name in self.watch_targets:
+                continue
+            image, key = self.load_template(item.path)
+            if image is None:
+                logger.error(f"无法加载监视目标: {item.path}")
+                continue
+            self.add_target(name, image, item.threshold, item.grayscale, key)
+            self.watch_items[name] = item
+            loaded += 1
+        return loaded
+
+    def rebuild_targets(self):
+        """按新的匹配设置重建所有目标，派生数据从模板库读取，保留匹配状态避免重复提醒"""
+        for target in self.targets():
+            grayscale, key = self.target_specs.get(target.name, (None, None))
+            rebuilt = self.create_target(target.name, target.image, target.threshold, grayscale, key)
+            rebuilt.matched = target.matched
+            rebuilt.last_match = target.last_match
+            if target is self.target:
+                self.target = rebuilt
+            else:
+                self.watch_targets[target.name] = rebuilt
+
+    def config_changed(self, changes):
+        """配置变化回调，可在任意线程中调用；变化在下一轮开始之前应用"""
+        with self._lock:
+            self._config_changes.append(changes)
+
+    def apply_config_changes(self):
+        """在两轮之间应用累积的配置变化，只重建受影响的部分，返回变化的字段集合
+
+        阈值、匹配模式、缩放比例和轮询参数每轮都从配置中读取，无需处理；
+        截图后端由创建者持有，修改后需要重启。
+        """
+        with self._lock:
+            pending, self._config_changes = self._config_changes, []
+        if not pending:
+            return set()
+        changes = None if None in pending else set().union(*pending)
+
+        if touched(changes, "template_store.enabled", "template_store.path"):
+            self.template_store = None
+        if touched(changes, "match.grayscale", "match.pyramid_levels", "match.change_tile_size"):
+            self.rebuild_targets()
+        if touched(changes, "match.change_tile_size"):
+            self.change_detectors.clear()
+        if touched(changes, "polling"):
+            # 不等退避结束，下一轮就按新设置轮询
+            self.scheduler.interval_ms = self.config.data.polling.min_interval_ms
+        if touched(changes, "journal"):
+            if self.journal is not None:
+                self.journal.close()
+            self.journal = create_journal(self.config.data.journal)
+        if touched(changes, "watch_list"):
+            self.sync_watch_list()
+        if changes is not None and touched(changes, "capture.backend", "capture.replay_path"):
+            logger.warning("截图后端的修改需要重启后生效")
+        return changes
+
+    def reset_cache(self):
+        """目标变化后丢弃所有缓存的匹配结果"""
+        for detector in self.change_detectors.values():
+            detector.reset()
+        for target in self.targets():
+            target.reset()
+
+    def get_match_pool(self):
+        """parallel 模式下返回进程池，进程数变化时重建"""
+        match_config = self.config.data.match
+        if match_config.mode != "parallel":
+            return None
+        if self.match_pool is not None and self.match_pool.workers != match_config.workers:
+            self.match_pool.shutdown()
+            self.match_pool = None
+        if self.match_pool is None:
+            self.match_pool = TiledMatchPool(match_config.workers)
+        return self.match_pool
+
+    def get_change_detector(self, key):
+        if key not in self.change_detectors:
+            self.change_detectors[key] = FrameChangeDetector(
+                self.config.data.match.change_tile_size
+            )
+        return self.change_detectors[key]
+
+    def get_capture_executor(self):
+        """分显示器并行匹配时返回线程池（OpenCV 匹配期间会释放 GIL）"""
+        capture_config = self.config.data.capture
+        if not (capture_config.per_monitor and capture_config.parallel):
+            return None
+        if self.capture_executor is None:
+            self.capture_executor = ThreadPoolExecutor(thread_name_prefix="monitor-match")
+        return self.capture_executor
+
+    def scale_set(self):
+        """返回要搜索的模板缩放比例，保持配置中的顺序并去重"""
+        match_config = self.config.data.match
+        scales = list(match_config.scales) or [1.0]
+        ratio = self.device_pixel_ratio
+        if match_config.dpi_scales and ratio != 1.0:
+            scales += [ratio, 1 / ratio]
+        return list(dict.fromkeys(round(scale, 4) for scale in scales))
+
+    def monitor_overlap(self, scales):
+        """分显示器截图时相邻显示器截图的重叠像素数：所有目标在各缩放比例下的最大边长"""
+        if not self.config.data.capture.per_monitor:
+            return 0
+        return max(
+            (
+                math.ceil(max(target.image.shape[:2]) * scale)
+                for target in self.targets()
+                for scale in scales
+            ),
+            default=0,
+        )
+
+    def get_scale_executor(self, scales):
+        """多个缩放比例并行搜索时返回线程池"""
+        if len(scales) < 2 or not self.config.data.match.parallel_scales:
+            return None
+        if self.scale_executor is None:
+            self.scale_executor = ThreadPoolExecutor(thread_name_prefix="scale-match")
+        return self.scale_executor
+
+    def scheduler_stats(self):
+        """返回轮询调度状态（当前间隔、休眠时间、耗时和延迟）"""
+        return self.scheduler.stats()
+
+    def memory_stats(self):
+        """返回常驻缓冲区占用的字节数"""
+        targets = self.targets()
+        return {
+            "frame_buffers": self.buffers.nbytes,
+            "result_buffers": sum(t.buffers.nbytes for t in targets),
+            "incremental_maps": sum(
+                m.result.nbytes
+                for t in targets
+                for m in t.incrementals.values()
+                if m.result is not None
+            ),
+        }
+
+    def cache_stats(self):
+        """返回未变化帧缓存的命中统计（所有显示器合计）"""
+        hits = sum(d.hits for d in self.change_detectors.values())
+        misses = sum(d.misses for d in self.change_detectors.values())
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+    def timing_stats(self):
+        """返回各阶段耗时的 p50/p95/p99（毫秒）"""
+        return self.timings.summary()
+
+    def step(self):
+        """执行一轮截图和匹配，返回每个目标的 MatchResult 列表
+
+        执行后 sleep_ms 为调度器决定的下一轮之前的休眠时间。
+        """
+        self.apply_pending_target()
+        self.apply_config_changes()
+        s_time = time.monotonic()
+        match_config = self.config.data.match
+        scales = self.scale_set()
+        # 获取屏幕截图，所有目标共享同一帧
+        frames = self.capture.grab_frames(
+            self.config.data.capture, self.monitor_overlap(scales)
+        )
+        for frame in frames:
+            frame.buffers = self.buffers
+        now = time.monotonic()
+        self.timings.record("capture", now - s_time)
+
+        # 变化检测既用于复用匹配结果，也用于自适应调度判断画面是否静止
+        if match_config.skip_unchanged or self.config.data.polling.adaptive:
+            for frame in frames:
+                frame.dirty = self.get_change_detector(frame.key).update(frame.image)
+            self.timings.record("detect", time.monotonic() - now)
+        static = all(frame.unchanged for frame in frames)
+        unchanged = match_config.skip_unchanged and static
+
+        targets = self.targets()
+        pending = [t for t in targets if not unchanged or t.last_result is None]
+        if pending:
+            # 先统一转换颜色，单独计时
+            now = time.monotonic()
+            for frame in frames:
+                for grayscale in {t.grayscale for t in pending}:
+                    frame.converted(grayscale)
+            self.timings.record("convert", time.monotonic() - now)
+
+        pool = self.get_match_pool()
+        if pool is not None:
+            # 本轮中所有目标共用复制到共享内存的同一份截图
+            pool.begin_cycle()
+        executor = self.get_capture_executor()
+        scale_executor = self.get_scale_executor(scales)
+        near_threshold = False
+        results = []
+        now = time.monotonic()
+        peak_clock = self.timings.peak_clock
+        peak_clock.take()
+        for target in targets:
+            if unchanged and target.last_result is not None:
+                # 画面未变化，直接复用上次结果
+                max_val, max_loc = target.last_result
+            else:
+                # 模板匹配
+                max_val, max_loc = target.match_frames(
+                    frames, match_config, pool, executor, scales, scale_executor, peak_clock
+                )
+                target.last_result = (max_val, max_loc)
+
+            threshold = target.get_threshold(match_config)
+            results.append(self.update_target(target, max_val, max_loc, threshold))
+            if abs(max_val - threshold) <= self.config.data.polling.near_margin:
+                near_threshold = True
+        if pending:
+            # 峰值搜索在匹配函数内部完成，从匹配耗时中扣除
+            peak = peak_clock.take()
+            self.timings.record("match", max(time.monotonic() - now - peak, 0.0))
+            self.timings.record("peak", peak)
+
+        # 根据画面变化和匹配度决定下一轮的休眠时间
+        self.cycle_time = time.monotonic() - s_time
+        self.timings.record("cycle", self.cycle_time)
+        self.sleep_ms = self.scheduler.update(not static, near_threshold, self.cycle_time)
+        if self.journal is not None:
+            self.journal.record(results, self.cycle_time)
+        return results
+
+    def update_target(self, target, max_val, max_loc, threshold):
+        """根据匹配度更新目标的匹配状态"""
+        if max_val > threshold:  # 匹配度阈值
+            w, h = target.size
+            x, y = max_loc
+            # 保存位置，供下一帧跟踪搜索
+            target.last_match = (x, y)
+            became_matched = not target.matched
+            target.matched = True
+            return MatchResult(target, max_val, (x, y, w, h), became_matched)
+
+        target.last_match = None
+        target.matched = False
+        return MatchResult(target, max_val, None, False)
+
+    def close(self):
+        """释放进程池等资源并写完事件日志，截图后端由创建者关闭"""
+        if self.match_pool is not None:
+            self.match_pool.shutdown()
+            self.match_pool = None
+        if self.capture_executor is not None:
+            self.capture_executor.shutdown()
+            self.capture_executor = None
+        if self.scale_executor is not None:
+            self.scale_executor.shutdown()
+            self.scale_executor = None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
@@ -28,5 +28,7 @@ class GeometryManager:
     def save_geometry(self):
         """保存窗口位置和大小到配置"""
         geometry = self.widget.geometry()
-        self.config["position"] = {"x": geometry.x(), "y": geometry.y()}
-        self.config["size"] = {"width": geometry.width(), "height": geometry.height()}
+        self.config.update(
+            position={"x": geometry.x(), "y": geometry.y()},
+            size={"width": geometry.width(), "height": geometry.height()},
+        )
@@ -1,7 +1,6 @@
 from pathlib import Path
 
-import cv2
-
+from .config import touched
 from .log import logger
 
 
@@ -10,6 +9,7 @@ class ImageManager:
         self.config = config
         self.match_thread = match_thread
         self.target_image = None
+        self.image_path = None  # 当前目标图片的路径
         self.tray_manager = None
 
     def set_tray_manager(self, tray_manager):
@@ -20,29 +20,29 @@ class ImageManager:
         """加载图片并开始匹配"""
         logger.info(f"开始加载图片: {file_path}")
 
-        # 先停止当前的匹配线程
-        if self.target_image is not None:
-            logger.info("停止当前匹配线程")
-            self.match_thread.stop()
-
-        # 加载新图片
-        self.target_image = cv2.imread(file_path)
+        # 加载新图片，期间匹配线程继续监视旧目标，模板库中已有时直接映射缓存
+        self.target_image, key = self.match_thread.load_template(file_path)
         if self.target_image is not None:
             h, w = self.target_image.shape[:2]
             logger.info(f"成功加载图片: {w}x{h}")
 
-            # 更新配置
-            self.config["last_image"] = file_path
-            self.config.save()
+            # 先记录路径，配置变化回调据此判断目标已是这张图片
+            self.image_path = file_path
+            # 更新配置，从配置文件重新加载的路径不必再写回
+            if self.config.data.last_image != file_path:
+                self.config["last_image"] = file_path
 
             # 更新托盘状态
             if self.tray_manager:
                 self.tray_manager.update_status(Path(file_path).name)
 
-            # 启动新的匹配线程
-            logger.info("启动新的匹配线程")
-            self.match_thread.set_target(self.target_image)
-            self.match_thread.start()
+            if self.match_thread.isRunning():
+                # 线程运行中时在两轮之间换上新目标，不停止线程
+                self.match_thread.swap_target(self.target_image, key)
+            else:
+                logger.info("启动匹配线程")
+                self.match_thread.set_target(self.target_image, key)
+                self.match_thread.start()
 
             return True
         else:
@@ -61,12 +61,36 @@ class ImageManager:
         else:
             logger.warning(f"上次使用的图片不存在: {last_image_path}")
             self.config["last_image"] = None
-            self.config.save()
             return False
 
+    def config_changed(self, changes):
+        """在界面线程中处理配置变化：目标图片被改为其他图片时换上新目标，
+        监视列表从空变为非空且匹配线程未运行时启动线程（运行中的线程自己同步监视列表）"""
+        last_image = self.config.data.last_image
+        if touched(changes, "last_image") and last_image and last_image != self.image_path:
+            logger.info(f"配置中的目标图片已修改: {last_image}")
+            self.load_file(last_image)
+        if (
+            touched(changes, "watch_list")
+            and self.config.data.watch_list
+            and not self.match_thread.isRunning()
+        ):
+            self.load_watch_list()
+
+    def load_watch_list(self):
+        """加载配置中的监视列表，所有目标共享同一个匹配线程"""
+        loaded = self.match_thread.sync_watch_list()
+
+        if loaded and not self.match_thread.isRunning():
+            logger.info("启动匹配线程")
+            self.match_thread.start()
+        return loaded
+
     def cleanup(self):
         """清理资源"""
         if self.match_thread and self.match_thread.isRunning():
             logger.info("停止匹配线程")
             self.match_thread.stop()
             self.match_thread.wait()
+        if self.match_thread:
+            self.match_thread.close()
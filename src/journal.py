@@ -0,0 +1,209 @@
+"""匹配事件日志
+
+只记录匹配状态的变化（出现 / 消失）和定期摘要，不再每帧写一行日志。
+事件先放进队列，由后台线程批量写入按大小轮转的 JSON Lines 文件，
+匹配线程不做任何文件 I/O。之后可以查询某个目标最近一次出现的时间。
+"""
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+
+from src.log import logger
+
+
+class TargetStats:
+    """一个目标在当前摘要周期内的统计"""
+
+    def __init__(self):
+        self.frames = 0  # 匹配的轮数
+        self.matched_frames = 0  # 匹配成功的轮数
+        self.best_score = None  # 最高匹配度
+        self.suppressed = 0  # 因限流没有记录的状态变化次数
+
+
+class MatchJournal:
+    """限流的异步匹配事件日志"""
+
+    def __init__(
+        self,
+        path,
+        max_bytes=10 * 1024 * 1024,
+        backups=3,
+        summary_interval=60.0,
+        min_interval=1.0,
+        flush_interval=1.0,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups  # 保留的轮转文件数
+        self.summary_interval = summary_interval  # 摘要间隔（秒）
+        self.min_interval = min_interval  # 同一目标两次状态变化记录的最小间隔（秒）
+        self.flush_interval = flush_interval  # 后台线程批量写入的间隔（秒）
+        self.states = {}  # 每个目标最近一次记录的状态 {name: (matched, monotonic)}
+        self.stats = {}  # 当前摘要周期内的统计 {name: TargetStats}
+        self.last_seen = {}  # 本次运行中每个目标最近一次出现的事件 {name: event}
+        self.last_summary = time.monotonic()
+        self._queue = queue.Queue(maxsize=10000)
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="match-journal", daemon=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer.start()
+
+    def record(self, results, cycle_time=None):
+        """记录一轮的匹配结果，只在状态变化和到达摘要间隔时产生事件"""
+        now = time.monotonic()
+        for result in results:
+            name = result.target.name
+            stats = self.stats.setdefault(name, TargetStats())
+            stats.frames += 1
+            if result.rect is not None:
+                stats.matched_frames += 1
+            if stats.best_score is None or result.score > stats.best_score:
+                stats.best_score = result.score
+
+            matched = result.rect is not None
+            state = self.states.get(name)
+            if state is None and not matched:
+                # 首次匹配失败不算状态变化
+                self.states[name] = (False, now)
+                continue
+            if state is not None and state[0] == matched:
+                continue
+            if state is not None and now - state[1] < self.min_interval:
+                # 状态来回跳变时限流，等下一次允许记录时再比较
+                stats.suppressed += 1
+                continue
+            self.states[name] = (matched, now)
+            event = {
+                "event": "matched" if matched else "lost",
+                "target": name,
+                "score": round(result.score, 4),
+            }
+            if matched:
+                event["rect"] = list(result.rect)
+            self.emit(event)
+
+        if now - self.last_summary >= self.summary_interval:
+            self.emit_summary(cycle_time)
+            self.last_summary = now
+
+    def emit_summary(self, cycle_time=None):
+        """写入当前摘要周期内每个目标的统计并开始新的周期"""
+        targets = {
+            name: {
+                "frames": stats.frames,
+                "matched_frames": stats.matched_frames,
+                "best_score": round(stats.best_score, 4) if stats.best_score is not None else None,
+                "suppressed": stats.suppressed,
+            }
+            for name, stats in self.stats.items()
+        }
+        event = {"event": "summary", "targets": targets}
+        if cycle_time is not None:
+            event["cycle_ms"] = round(cycle_time * 1000, 1)
+        self.emit(event)
+        self.stats = {}
+
+    def emit(self, event):
+        """加上时间戳后放进写入队列，队列满时丢弃并记录警告"""
+        event = {"time": time.time(), **event}
+        if event["event"] == "matched":
+            self.last_seen[event["target"]] = event
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            logger.warning("匹配事件队列已满，丢弃事件")
+
+    def _run(self):
+        """后台线程：批量写入队列中的事件"""
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval)
+            self._drain()
+        self._drain()
+
+    def _drain(self):
+        with self._write_lock:
+            self._write_batch()
+
+    def _write_batch(self):
+        lines = []
+        while True:
+            try:
+                lines.append(json.dumps(self._queue.get_nowait(), ensure_ascii=False))
+            except queue.Empty:
+                break
+        if not lines:
+            return
+        try:
+            self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning(f"写入匹配事件日志失败: {e}")
+
+    def _rotate(self):
+        """文件超过上限时轮转：journal.jsonl -> journal.jsonl.1 -> ..."""
+        if not self.path.exists() or self.path.stat().st_size < self.max_bytes:
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = self.rotated(index)
+            if older.exists():
+                older.replace(self.rotated(index + 1))
+        if self.backups > 0:
+            self.path.replace(self.rotated(1))
+        else:
+            self.path.unlink()
+
+    def rotated(self, index):
+        return self.path.with_name(f"{self.path.name}.{index}")
+
+    def files(self):
+        """返回现有的日志文件，从新到旧"""
+        files = [self.path] + [self.rotated(i) for i in range(1, self.backups + 1)]
+        return [f for f in files if f.exists()]
+
+    def events(self):
+        """从新到旧遍历日志中的所有事件（只包含已写入磁盘的事件）"""
+        for file in self.files():
+            with open(file, encoding="utf-8") as f:
+                lines = f.readlines()
+            for line in reversed(lines):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def last_appeared(self, name):
+        """返回目标最近一次出现的事件，从未出现时返回 None"""
+        if name in self.last_seen:
+            return self.last_seen[name]
+        for event in self.events():
+            if event.get("event") == "matched" and event.get("target") == name:
+                return event
+        return None
+
+    def flush(self):
+        """立即写入队列中的事件"""
+        self._drain()
+
+    def close(self):
+        """写入剩余事件并停止后台线程"""
+        self._stop.set()
+        self._writer.join()
+
+
+def create_journal(journal_config):
+    """根据配置创建匹配事件日志，未启用时返回 None"""
+    if not journal_config.enabled:
+        return None
+    path = journal_config.path or Path.home() / ".watchcat" / "journal.jsonl"
+    return MatchJournal(
+        path,
+        max_bytes=journal_config.max_mb * 1024 * 1024,
+        backups=journal_config.backups,
+        summary_interval=journal_config.summary_interval,
+        min_interval=journal_config.min_interval,
+    )
@@ -1,3 +1,16 @@
+"""日志
+
+默认只输出 INFO 及以上级别，匹配循环中的 debug 日志不会被格式化。
+调试时设置环境变量 WATCHCAT_LOG_LEVEL=DEBUG。
+"""
+import os
+import sys
+
 from loguru import logger as loguru_logger
 
+LOG_LEVEL = os.environ.get("WATCHCAT_LOG_LEVEL", "INFO").upper()
+
+loguru_logger.remove()
+loguru_logger.add(sys.stderr, level=LOG_LEVEL)
+
 logger = loguru_logger
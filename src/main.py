@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 
 from loguru import logger
@@ -52,4 +53,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的应用中 parallel 匹配模式的子进程需要它
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,208 @@
+"""模板匹配算法
+
+与 Qt 无关的纯 numpy/cv2 实现，供 ImageMatchThread 在匹配循环中调用。
+所有函数返回 (max_val, (x, y))，坐标为全分辨率屏幕坐标。
+"""
+import time
+
+import cv2
+
+MATCH_METHOD = cv2.TM_CCOEFF_NORMED
+
+# 金字塔最顶层模板的最小边长，再小就没有可区分的特征了
+MIN_PYRAMID_TEMPLATE_SIZE = 8
+
+
+def result_shape(screen, template):
+    """匹配结果图的形状"""
+    th, tw = template.shape[:2]
+    sh, sw = screen.shape[:2]
+    return sh - th + 1, sw - tw + 1
+
+
+def find_peak(result, clock=None):
+    """返回结果图中的最大值及其位置 (max_val, (x, y))，耗时计入 clock（PeakClock，可选）"""
+    start = time.monotonic()
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    if clock is not None:
+        clock.add(time.monotonic() - start)
+    return max_val, max_loc
+
+
+def match_full(screen, template, result=None, clock=None):
+    """在整个屏幕上做一次模板匹配
+
+    result 为可复用的结果图缓冲区（float32，形状见 result_shape），
+    clock 为记录峰值搜索耗时的 PeakClock（可选），下同。
+    """
+    result = cv2.matchTemplate(screen, template, MATCH_METHOD, result=result)
+    return find_peak(result, clock)
+
+
+def match_region(screen, template, x0, y0, x1, y1, clock=None):
+    """只在左上角落在 [x0, x1] x [y0, y1] 范围内的位置做匹配
+
+    Returns:
+        (max_val, (x, y))，区域无效时 max_val 为 -1
+    """
+    th, tw = template.shape[:2]
+    sh, sw = screen.shape[:2]
+    x0, y0 = max(x0, 0), max(y0, 0)
+    x1, y1 = min(x1, sw - tw), min(y1, sh - th)
+    if x1 < x0 or y1 < y0:
+        return -1.0, (0, 0)
+
+    window = screen[y0:y1 + th, x0:x1 + tw]
+    max_val, (x, y) = match_full(window, template, clock=clock)
+    return max_val, (x + x0, y + y0)
+
+
+def pyramid_depth(template, levels):
+    """根据模板尺寸限制可用的金字塔层数"""
+    th, tw = template.shape[:2]
+    depth = 0
+    while depth < levels and min(th, tw) >> (depth + 1) >= MIN_PYRAMID_TEMPLATE_SIZE:
+        depth += 1
+    return depth
+
+
+def build_pyramid(image, depth):
+    """构建图像金字塔，返回 [原图, 1/2, 1/4, ...]"""
+    levels = [image]
+    for _ in range(depth):
+        levels.append(cv2.pyrDown(levels[-1]))
+    return levels
+
+
+def top_candidates(result, count, suppress_w, suppress_h, clock=None):
+    """从匹配结果图中取出前 count 个互不重叠的峰值位置"""
+    result = result.copy()
+    h, w = result.shape[:2]
+    candidates = []
+    for _ in range(count):
+        max_val, (x, y) = find_peak(result, clock)
+        if max_val <= -1:
+            break
+        candidates.append((max_val, (x, y)))
+        # 抑制该峰值附近的区域，避免重复选中同一目标
+        result[
+            max(y - suppress_h, 0):min(y + suppress_h + 1, h),
+            max(x - suppress_w, 0):min(x + suppress_w + 1, w),
+        ] = -1
+    return candidates
+
+
+def match_pyramid(screen, template, levels=2, candidates=3, template_pyramid=None, clock=None):
+    """由粗到精的金字塔匹配
+
+    先在缩小后的屏幕上用缩小后的模板搜索，再在全分辨率下
+    只对最好的几个候选位置附近的小窗口做确认匹配。
+
+    Args:
+        screen: 全分辨率屏幕图像
+        template: 全分辨率模板
+        levels: 金字塔层数，每层边长缩小一半
+        candidates: 需要在全分辨率下确认的候选数量
+        template_pyramid: 预先构建好的模板金字塔（可选）
+        clock: 记录峰值搜索耗时的 PeakClock（可选）
+
+    Returns:
+        (max_val, (x, y))
+    """
+    depth = pyramid_depth(template, levels)
+    if depth == 0:
+        return match_full(screen, template, clock=clock)
+
+    if template_pyramid is None or len(template_pyramid) <= depth:
+        template_pyramid = build_pyramid(template, depth)
+    coarse_template = template_pyramid[depth]
+    coarse_screen = build_pyramid(screen, depth)[depth]
+
+    ch, cw = coarse_template.shape[:2]
+    if coarse_screen.shape[0] < ch or coarse_screen.shape[1] < cw:
+        return match_full(screen, template, clock=clock)
+
+    result = cv2.matchTemplate(coarse_screen, coarse_template, MATCH_METHOD)
+    scale = 1 << depth
+
+    best_val, best_loc = -1.0, (0, 0)
+    for _, (cx, cy) in top_candidates(result, max(candidates, 1), cw // 2, ch // 2, clock):
+        # 粗层一个像素对应全分辨率 scale 个像素，窗口两侧各留一层的误差
+        x, y = cx * scale, cy * scale
+        max_val, loc = match_region(
+            screen, template, x - scale, y - scale, x + scale, y + scale, clock
+        )
+        if max_val > best_val:
+            best_val, best_loc = max_val, loc
+    return best_val, best_loc
+
+
+class IncrementalMatcher:
+    """增量匹配
+
+    保留上一次的匹配结果图，只在变化方块（向外扩展模板大小）内重新计算相关度，
+    然后在整张结果图上重新找全局最大值，结果与全量重算一致。
+    """
+
+    # 变化面积超过该比例时直接全量重算，分块计算反而更慢
+    FULL_RECOMPUTE_RATIO = 0.5
+
+    def __init__(self, tile_size: int = 64):
+        self.tile_size = tile_size
+        self.result = None  # 上一次的匹配结果图
+        self.pending = None  # 自上次计算以来累计的变化方块掩码
+
+    def reset(self):
+        """丢弃结果图，下一次匹配全量计算"""
+        self.result = None
+        self.pending = None
+
+    def mark_dirty(self, dirty):
+        """累计变化方块，跟踪模式下可能隔若干帧才做一次全屏搜索"""
+        if self.pending is None or self.pending.shape != dirty.shape:
+            self.pending = dirty.copy()
+        else:
+            self.pending |= dirty
+
+    def dirty_rects(self, dirty):
+        """把变化方块掩码合并成像素矩形列表 [(x, y, w, h), ...]"""
+        count, _, stats, _ = cv2.connectedComponentsWithStats(
+            dirty.astype("uint8"), connectivity=8
+        )
+        t = self.tile_size
+        # 第 0 个连通域是背景
+        return [
+            (x * t, y * t, w * t, h * t)
+            for x, y, w, h, _ in stats[1:count]
+        ]
+
+    def match(self, screen, template, clock=None):
+        """返回 (max_val, (x, y))，峰值搜索耗时计入 clock（可选）"""
+        th, tw = template.shape[:2]
+        shape = result_shape(screen, template)
+
+        if self.result is not None and self.result.shape != shape:
+            self.result = None
+        if (
+            self.result is None
+            or self.pending is None
+            or self.pending.mean() > self.FULL_RECOMPUTE_RATIO
+        ):
+            # 尺寸不变时直接写入原有结果图
+            self.result = cv2.matchTemplate(
+                screen, template, MATCH_METHOD, result=self.result
+            )
+        else:
+            for x, y, w, h in self.dirty_rects(self.pending):
+                # 结果图中左上角在 [x - tw + 1, x + w - 1] 范围内的位置会受影响
+                x0, y0 = max(x - tw + 1, 0), max(y - th + 1, 0)
+                x1, y1 = min(x + w - 1, shape[1] - 1), min(y + h - 1, shape[0] - 1)
+                if x1 < x0 or y1 < y0:
+                    continue
+                self.result[y0:y1 + 1, x0:x1 + 1] = cv2.matchTemplate(
+                    screen[y0:y1 + th, x0:x1 + tw], template, MATCH_METHOD
+                )
+
+        if self.pending is not None:
+            self.pending[:] = False
+        return find_peak(self.result, clock)
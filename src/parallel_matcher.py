@@ -0,0 +1,220 @@
+"""多进程分块匹配
+
+把屏幕按行切成相互重叠（重叠模板高度）的条带，在进程池中分别匹配，
+再合并为全局最大值。截图和模板通过共享内存传给子进程，不经过 pickle；
+同一轮中多个目标共用同一份截图副本，模板在目标的整个生命周期内只复制一次。
+"""
+import multiprocessing
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from src import matcher
+from src.log import logger
+
+MATCH_METHOD = cv2.TM_CCOEFF_NORMED
+
+# 每个条带至少包含的结果行数，太小的条带调度开销大于收益
+MIN_BAND_ROWS = 64
+
+# 子进程中已挂载的共享内存 {name: SharedMemory}，只保留最近几个（每个模板各占一块）
+_attached = OrderedDict()
+MAX_ATTACHED = 32
+
+# 共享内存中每个数组的起始位置按缓存行对齐
+ALIGNMENT = 64
+
+
+def _init_worker():
+    """子进程初始化：避免 OpenCV 内部线程与进程池争抢 CPU"""
+    cv2.setNumThreads(1)
+
+
+def _attach(name):
+    shm = _attached.get(name)
+    if shm is None:
+        shm = _attached[name] = shared_memory.SharedMemory(name=name)
+        # 主进程重新分配后旧的挂载不再需要
+        while len(_attached) > MAX_ATTACHED:
+            _attached.popitem(last=False)[1].close()
+    else:
+        _attached.move_to_end(name)
+    return shm
+
+
+def _view(ref):
+    """把 (共享内存名, 偏移, 形状) 还原为数组"""
+    name, offset, shape = ref
+    return np.ndarray(shape, dtype=np.uint8, buffer=_attach(name).buf, offset=offset)
+
+
+def _match_band(screen_ref, template_ref, r0, r1):
+    """在子进程中匹配结果行 [r0, r1) 对应的屏幕条带
+
+    Returns:
+        (max_val, (x, y), 峰值搜索耗时)
+    """
+    screen = _view(screen_ref)
+    template = _view(template_ref)
+    th = template.shape[0]
+    band = screen[r0:r1 + th - 1]
+    result = cv2.matchTemplate(band, template, MATCH_METHOD)
+    start = time.monotonic()
+    _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+    return max_val, (x, y + r0), time.monotonic() - start
+
+
+def split_bands(rows, count):
+    """把 rows 行结果均分为最多 count 个条带，返回 [(r0, r1), ...]"""
+    count = max(1, min(count, rows // MIN_BAND_ROWS))
+    step = -(-rows // count)
+    return [(r0, min(r0 + step, rows)) for r0 in range(0, rows, step)]
+
+
+class TiledMatchPool:
+    """进程池分块匹配引擎
+
+    每一轮开始时调用 begin_cycle()：本轮中同一张截图只复制到共享内存一次，多个目标共用。
+    没有调用 begin_cycle() 时每次匹配都重新复制截图。
+    模板不会改变，各自复制到一块长期保留的共享内存，模板数组被回收时才释放。
+    """
+
+    def __init__(self, workers: int = 4):
+        self.workers = max(1, workers)
+        self.copies = 0  # 复制到共享内存的数组数
+        self._executor = None
+        self._segments = []  # 本轮使用的共享内存，放不下时追加新的一块
+        self._used = 0  # 最后一块已使用的字节数
+        self._published = {}  # 本轮已复制的数组 {id(array): (array, ref)}
+        self._templates = {}  # 已复制的模板 {id(template): (weakref, SharedMemory, ref, finalizer)}
+        self._in_cycle = False
+        # 模板被回收时的清理可能在持有锁的线程中由垃圾回收触发
+        self._lock = threading.RLock()
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            logger.info(f"启动匹配进程池: {self.workers} 个进程")
+            # 界面进程中已有多个后台线程，fork 出的子进程可能继承被其他线程持有的锁
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def begin_cycle(self):
+        """开始新的一轮：之前复制的数组作废，上一轮用了多块共享内存时合并为一块"""
+        with self._lock:
+            self._in_cycle = True
+            self._reset()
+
+    def _reset(self):
+        self._published.clear()
+        self._used = 0
+        if len(self._segments) > 1:
+            total = sum(shm.size for shm in self._segments)
+            self._release_buffer()
+            self._segments.append(shared_memory.SharedMemory(create=True, size=total))
+
+    def _alloc(self, nbytes):
+        """在共享内存中分配 nbytes，返回 (共享内存名, 偏移)"""
+        offset = -(-self._used // ALIGNMENT) * ALIGNMENT
+        if not self._segments or offset + nbytes > self._segments[-1].size:
+            # 本轮已发布的数组仍在旧的共享内存中，追加新的一块而不是重新分配
+            size = max(nbytes, 2 * self._segments[-1].size if self._segments else 0)
+            self._segments.append(shared_memory.SharedMemory(create=True, size=size))
+            offset = 0
+        self._used = offset + nbytes
+        return self._segments[-1].name, offset
+
+    def publish(self, array):
+        """把数组复制到共享内存，本轮中已复制过时直接返回，返回 (共享内存名, 偏移, 形状)"""
+        with self._lock:
+            if not self._in_cycle:
+                self._reset()
+            published = self._published.get(id(array))
+            # 同时保存数组本身，避免 id 被回收后复用
+            if published is not None and published[0] is array:
+                return published[1]
+            name, offset = self._alloc(array.nbytes)
+            shm = self._segments[-1]
+            np.ndarray(array.shape, dtype=np.uint8, buffer=shm.buf, offset=offset)[:] = array
+            ref = (name, offset, array.shape)
+            self._published[id(array)] = (array, ref)
+            self.copies += 1
+            return ref
+
+    def publish_template(self, template):
+        """把模板复制到单独的共享内存，同一个模板数组只复制一次，返回 (共享内存名, 偏移, 形状)"""
+        with self._lock:
+            entry = self._templates.get(id(template))
+            if entry is not None and entry[0]() is template:
+                return entry[2]
+            shm = shared_memory.SharedMemory(create=True, size=max(template.nbytes, 1))
+            np.ndarray(template.shape, dtype=np.uint8, buffer=shm.buf)[:] = template
+            ref = (shm.name, 0, template.shape)
+            finalizer = weakref.finalize(template, self._release_template, id(template), shm)
+            self._templates[id(template)] = (weakref.ref(template), shm, ref, finalizer)
+            self.copies += 1
+            return ref
+
+    def _release_template(self, key, shm):
+        """模板数组被回收后释放它的共享内存"""
+        with self._lock:
+            entry = self._templates.get(key)
+            if entry is not None and entry[1] is shm:
+                del self._templates[key]
+        shm.close()
+        shm.unlink()
+
+    def _release_buffer(self):
+        for shm in self._segments:
+            shm.close()
+            shm.unlink()
+        self._segments = []
+        self._used = 0
+
+    def match(self, screen, template, clock=None):
+        """返回 (max_val, (x, y))，与单次 matchTemplate 结果一致
+
+        子进程中的峰值搜索耗时计入 clock（可选）。各条带并行搜索，只计入其中最长的一次。
+        """
+        th, tw = template.shape[:2]
+        sh, sw = screen.shape[:2]
+        rows = sh - th + 1
+        bands = split_bands(rows, self.workers)
+        if len(bands) == 1:
+            return matcher.match_full(screen, template, clock=clock)
+
+        screen_ref = self.publish(screen)
+        template_ref = self.publish_template(template)
+        executor = self._ensure_executor()
+        futures = [
+            executor.submit(_match_band, screen_ref, template_ref, r0, r1)
+            for r0, r1 in bands
+        ]
+        results = [f.result() for f in futures]
+        if clock is not None:
+            clock.add(max(peak for _, _, peak in results))
+        max_val, max_loc, _ = max(results, key=lambda r: r[0])
+        return max_val, max_loc
+
+    def shutdown(self):
+        """关闭进程池并释放共享内存"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        with self._lock:
+            self._published.clear()
+            self._release_buffer()
+            for _, shm, _, finalizer in self._templates.values():
+                finalizer.detach()
+                shm.close()
+                shm.unlink()
+            self._templates.clear()
@@ -0,0 +1,54 @@
+"""自适应轮询调度
+
+画面静止且没有接近阈值的匹配时按指数退避拉长轮询间隔；
+画面变化或匹配度接近阈值时立即恢复到最小间隔。
+间隔表示目标周期，实际休眠时间会扣除本轮匹配耗时。
+"""
+
+
+class AdaptiveScheduler:
+    """根据画面变化和匹配度决定下一轮的休眠时间"""
+
+    def __init__(self, config):
+        self.config = config
+        self.interval_ms = config.data.polling.min_interval_ms  # 当前目标周期
+        self.sleep_ms = 0  # 上一次决定的休眠时间
+        self.cycle_ms = 0.0  # 上一轮匹配耗时
+        self.lag_ms = 0.0  # 上一轮超出目标周期的时间
+        self.reason = "init"  # 上一次决定的原因
+
+    def update(self, changed: bool, near_threshold: bool, cycle_seconds: float) -> int:
+        """记录本轮结果，返回下一轮之前应休眠的毫秒数
+
+        Args:
+            changed: 本轮画面是否有变化
+            near_threshold: 是否有目标的匹配度接近阈值
+            cycle_seconds: 本轮截图和匹配耗时（秒）
+        """
+        config = self.config.data.polling
+        if not config.adaptive:
+            self.interval_ms = config.interval_ms
+            self.reason = "fixed"
+        elif changed or near_threshold:
+            self.interval_ms = config.min_interval_ms
+            self.reason = "changed" if changed else "near_threshold"
+        else:
+            # 每轮至少增加 1 毫秒，否则间隔小或倍数接近 1 时增量被取整截掉，永远退避不上去
+            grown = max(int(self.interval_ms * config.backoff), self.interval_ms + 1)
+            self.interval_ms = min(grown, config.max_interval_ms)
+            self.reason = "quiet"
+
+        self.cycle_ms = cycle_seconds * 1000
+        self.lag_ms = max(self.cycle_ms - self.interval_ms, 0.0)
+        self.sleep_ms = max(int(self.interval_ms - self.cycle_ms), 0)
+        return self.sleep_ms
+
+    def stats(self) -> dict:
+        """返回调度状态，便于观察"""
+        return {
+            "interval_ms": self.interval_ms,
+            "sleep_ms": self.sleep_ms,
+            "cycle_ms": round(self.cycle_ms, 1),
+            "lag_ms": round(self.lag_ms, 1),
+            "reason": self.reason,
+        }
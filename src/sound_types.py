@@ -0,0 +1,15 @@
+"""提示音类型
+
+单独放在一个模块里，托盘菜单可以在不导入 numpy / sounddevice / pydub 的情况下列出提示音。
+"""
+import enum
+
+
+class SoundType(enum.Enum):
+    """提示音类型"""
+    NONE = "无提示音"
+    BEEP = "简单提示音"
+    SUCCESS = "成功提示音"
+    ERROR = "错误提示音"
+    MARIO = "马里奥音效"
+    CUSTOM = "自定义音乐"
@@ -1,28 +1,135 @@
 """声音管理模块"""
-import enum
-import numpy as np
-import sounddevice as sd
-from pydub import AudioSegment
+import atexit
 import os
-import time
+import threading
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+from src.sound_types import SoundType
+
+SAMPLE_RATE = 44100  # 内置提示音和混音输出的采样率
+
+
+class AudioMixer:
+    """常驻的音频输出流
+
+    只打开一次 PortAudio 输出流，由回调函数把正在播放的所有声音相加后输出，
+    重叠的提醒不会互相打断。没有音频设备（例如无界面的 Linux）时只记录一次警告，
+    之后的播放请求直接忽略。
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, blocksize=256):
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize  # 每次回调的帧数，越小延迟越低
+        self.voices = []  # 正在播放的声音 [[samples, position], ...]
+        self.available = None  # None 表示尚未尝试打开输出流
+        self.stream = None
+        self._lock = threading.Lock()
+
+    def ensure_stream(self):
+        """按需打开输出流，返回是否可以播放"""
+        if self.available is not None:
+            return self.available
+        try:
+            import sounddevice as sd
+            self.stream = sd.OutputStream(
+                samplerate=self.sample_rate,
+                blocksize=self.blocksize,
+                channels=1,
+                dtype="float32",
+                latency="low",
+                callback=self._callback,
+            )
+            self.stream.start()
+            self.available = True
+            atexit.register(self.close)
+        except Exception as e:  # 没有 PortAudio 或音频设备
+            from src.log import logger
+            logger.warning(f"没有可用的音频输出设备，已关闭提示音: {e}")
+            self.stream = None
+            self.available = False
+        return self.available
+
+    def convert(self, samples, sample_rate=SAMPLE_RATE):
+        """转为输出流的格式（float32 单声道、输出采样率），已经符合时原样返回"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        if sample_rate != self.sample_rate and len(samples):
+            count = int(len(samples) * self.sample_rate / sample_rate)
+            positions = np.linspace(0, len(samples) - 1, count)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        return samples
 
+    def add(self, samples, sample_rate=SAMPLE_RATE):
+        """加入一个要播放的声音，采样率不同时先重采样"""
+        samples = self.convert(samples, sample_rate)
+        with self._lock:
+            self.voices.append([samples, 0])
 
-class SoundType(enum.Enum):
-    """提示音类型"""
-    NONE = "无提示音"
-    BEEP = "简单提示音"
-    SUCCESS = "成功提示音"
-    ERROR = "错误提示音"
-    MARIO = "马里奥音效"
-    CUSTOM = "自定义音乐"
+    def play(self, samples, sample_rate=SAMPLE_RATE):
+        """播放声音，与正在播放的声音混合"""
+        if self.ensure_stream():
+            self.add(samples, sample_rate)
+
+    def mix(self, frames, out=None):
+        """取出接下来 frames 帧的混音结果，限制在 [-1, 1]"""
+        if out is None:
+            out = np.zeros(frames, dtype=np.float32)
+        else:
+            out[:] = 0
+        with self._lock:
+            active = []
+            for voice in self.voices:
+                samples, position = voice
+                chunk = samples[position:position + frames]
+                out[:len(chunk)] += chunk
+                voice[1] = position + len(chunk)
+                if voice[1] < len(samples):
+                    active.append(voice)
+            self.voices = active
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
+
+    def _callback(self, outdata, frames, time, status):
+        self.mix(frames, outdata[:, 0])
+
+    @property
+    def busy(self):
+        """是否有声音正在播放"""
+        return bool(self.voices)
+
+    def stats(self):
+        """返回输出流状态，latency 为 PortAudio 报告的输出延迟（秒）"""
+        return {
+            "available": self.available,
+            "voices": len(self.voices),
+            "latency": self.stream.latency if self.stream is not None else None,
+        }
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.available = None
 
 
 class SoundPlayer:
-    """声音播放器类"""
-    _custom_sound_cache = None  # 缓存加载的自定义音频
+    """声音播放器类
+
+    内置提示音只合成一次，之后直接播放缓存的 float32 缓冲区；
+    自定义音乐只解码配置的区间，重采样到输出采样率后按 (路径, 修改时间, 开始, 时长) 缓存。
+    """
+    _rendered = {}  # 合成好的内置提示音 {SoundType: np.ndarray}
+    _custom_cache = OrderedDict()  # 解码好的自定义音乐 {(path, mtime, start, duration, rate): (samples, rate)}
+    CUSTOM_CACHE_SIZE = 4  # 最多缓存的自定义音乐片段数
+    mixer = AudioMixer()  # 所有提示音共用的输出流
 
     @staticmethod
-    def generate_sine_wave(frequency: float, duration: float, sample_rate: int = 44100) -> np.ndarray:
+    def generate_sine_wave(frequency: float, duration: float, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
         """生成正弦波
 
         Args:
@@ -38,14 +145,53 @@ class SoundPlayer:
         return note.astype(np.float32)
 
     @classmethod
-    def _play_buffer(cls, audio_data, sample_rate=44100):
-        """安全地播放音频缓冲区"""
+    def _play_buffer(cls, audio_data, sample_rate=SAMPLE_RATE):
+        """安全地播放音频缓冲区，与正在播放的提示音混合"""
         try:
-            sd.play(audio_data, sample_rate, blocking=False)
+            cls.mixer.play(audio_data, sample_rate)
         except Exception as e:
             from src.log import logger
             logger.warning(f"播放音频失败: {e}")
 
+    @classmethod
+    def render(cls, sound_type: SoundType) -> np.ndarray:
+        """返回内置提示音的音频数据，每种只合成一次"""
+        if sound_type not in cls._rendered:
+            cls._rendered[sound_type] = cls._synthesize(sound_type)
+        return cls._rendered[sound_type]
+
+    @classmethod
+    def _synthesize(cls, sound_type: SoundType) -> np.ndarray:
+        if sound_type == SoundType.BEEP:
+            # 标准 A 音
+            return cls.generate_sine_wave(440, 0.25)
+        if sound_type == SoundType.SUCCESS:
+            # 上升音 A4 -> C5
+            return np.concatenate([cls.generate_sine_wave(440, 0.1), cls.generate_sine_wave(523.25, 0.1)])
+        if sound_type == SoundType.ERROR:
+            # 下降音 A4 -> F4
+            return np.concatenate([cls.generate_sine_wave(440, 0.1), cls.generate_sine_wave(349.23, 0.1)])
+        if sound_type == SoundType.MARIO:
+            frequencies = [660, 660, 0, 660, 0, 520, 660, 0, 784]
+            durations = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.15]
+            audio_parts = []
+            for freq, dur in zip(frequencies, durations):
+                if freq == 0:  # 静音
+                    audio_parts.append(np.zeros(int(dur * SAMPLE_RATE), dtype=np.float32))
+                else:
+                    audio_parts.append(cls.generate_sine_wave(freq, dur))
+            return np.concatenate(audio_parts)
+        raise ValueError(f"不是内置提示音: {sound_type}")
+
+    @classmethod
+    def prepare(cls, sound_type: SoundType, config=None):
+        """预先合成或解码提示音，返回 (samples, sample_rate)，没有可播放的声音时返回 None"""
+        if sound_type == SoundType.NONE:
+            return None
+        if sound_type == SoundType.CUSTOM:
+            return cls.load_custom(*cls._custom_settings(config)) if config else None
+        return cls.render(sound_type), SAMPLE_RATE
+
     @classmethod
     def play_sound(cls, sound_type: SoundType, config=None) -> None:
         """根据类型播放提示音
@@ -54,18 +200,14 @@ class SoundPlayer:
             sound_type: 提示音类型
             config: 配置对象，用于自定义音乐设置
         """
-        if sound_type == SoundType.NONE:
+        try:
+            prepared = cls.prepare(sound_type, config)
+        except Exception as e:
+            from src.log import logger
+            logger.warning(f"加载提示音失败: {e}")
             return
-        elif sound_type == SoundType.BEEP:
-            cls.play_beep()
-        elif sound_type == SoundType.SUCCESS:
-            cls.play_success()
-        elif sound_type == SoundType.ERROR:
-            cls.play_error()
-        elif sound_type == SoundType.MARIO:
-            cls.play_mario()
-        elif sound_type == SoundType.CUSTOM and config:
-            cls.play_custom(config)
+        if prepared is not None:
+            cls._play_buffer(*prepared)
 
     @classmethod
     def play_beep(cls, frequency: float = 440, duration: float = 0.25) -> None:
@@ -75,82 +217,105 @@ class SoundPlayer:
             frequency: 频率 (Hz)，默认 440Hz (标准 A 音)
             duration: 持续时间 (秒)，默认 0.25 秒
         """
-        audio = cls.generate_sine_wave(frequency, duration)
-        cls._play_buffer(audio)
+        if (frequency, duration) == (440, 0.25):
+            cls._play_buffer(cls.render(SoundType.BEEP))
+        else:
+            cls._play_buffer(cls.generate_sine_wave(frequency, duration))
 
     @classmethod
     def play_success(cls) -> None:
         """播放成功提示音 (上升音)"""
-        audio1 = cls.generate_sine_wave(440, 0.1)  # A4
-        audio2 = cls.generate_sine_wave(523.25, 0.1)  # C5
-        audio = np.concatenate([audio1, audio2])
-        cls._play_buffer(audio)
+        cls._play_buffer(cls.render(SoundType.SUCCESS))
 
     @classmethod
     def play_error(cls) -> None:
         """播放错误提示音 (下降音)"""
-        audio1 = cls.generate_sine_wave(440, 0.1)  # A4
-        audio2 = cls.generate_sine_wave(349.23, 0.1)  # F4
-        audio = np.concatenate([audio1, audio2])
-        cls._play_buffer(audio)
+        cls._play_buffer(cls.render(SoundType.ERROR))
 
     @classmethod
     def play_mario(cls) -> None:
         """播放马里奥风格的提示音"""
-        frequencies = [660, 660, 0, 660, 0, 520, 660, 0, 784]
-        durations = [0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.15]
-        audio_parts = []
-        
-        for freq, dur in zip(frequencies, durations):
-            if freq == 0:  # 静音
-                audio_parts.append(np.zeros(int(dur * 44100), dtype=np.float32))
-            else:
-                audio_parts.append(cls.generate_sine_wave(freq, dur))
-        
-        audio = np.concatenate(audio_parts)
-        cls._play_buffer(audio)
+        cls._play_buffer(cls.render(SoundType.MARIO))
+
+    @staticmethod
+    def _custom_settings(config):
+        """从配置对象或字典中取出 (path, start, duration)"""
+        custom = config["custom_sound"] if isinstance(config, dict) else config.custom_sound
+        if isinstance(custom, dict):
+            return custom.get("path"), custom.get("start", 0), custom.get("duration", 3)
+        return custom.path, custom.start, custom.duration
+
+    @classmethod
+    def load_custom(cls, path, start, duration):
+        """解码自定义音乐的 [start, start + duration) 区间，返回 (samples, sample_rate)
+
+        结果已转为单声道、归一化并重采样到输出采样率，播放时不必再转换。
+        按 (路径, 修改时间, 开始, 时长) 缓存，文件被替换后会重新解码。文件不存在时返回 None。
+        """
+        if not path or not os.path.exists(path):
+            return None
+        key = (path, os.path.getmtime(path), float(start), float(duration), cls.mixer.sample_rate)
+        if key in cls._custom_cache:
+            cls._custom_cache.move_to_end(key)
+            return cls._custom_cache[key]
+
+        if path.lower().endswith(".wav"):
+            try:
+                samples, rate = cls._decode_wav_window(path, start, duration)
+            except wave.Error:
+                # 浮点、WAVE_FORMAT_EXTENSIBLE 等 wave 模块不支持的格式交给 ffmpeg
+                samples, rate = cls._decode_window(path, start, duration)
+        else:
+            samples, rate = cls._decode_window(path, start, duration)
+
+        # 确保音量适中
+        max_sample = np.max(np.abs(samples)) if samples.size else 0
+        if max_sample > 0:
+            samples = samples / max_sample
+        prepared = (cls.mixer.convert(samples, rate), cls.mixer.sample_rate)
+
+        cls._custom_cache[key] = prepared
+        while len(cls._custom_cache) > cls.CUSTOM_CACHE_SIZE:
+            cls._custom_cache.popitem(last=False)
+        return prepared
+
+    @staticmethod
+    def _decode_wav_window(path, start, duration):
+        """用 wave 模块只读取 WAV 文件中需要的帧"""
+        with wave.open(path, "rb") as f:
+            rate = f.getframerate()
+            channels = f.getnchannels()
+            width = f.getsampwidth()
+            first = min(int(start * rate), f.getnframes())
+            f.setpos(first)
+            data = f.readframes(int(duration * rate))
+
+        if width == 1:
+            # 8 位 WAV 为无符号整数
+            samples = np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128
+        elif width == 3:
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+            padded = np.zeros((len(raw), 4), dtype=np.uint8)
+            padded[:, 1:] = raw
+            samples = padded.view("<i4").reshape(-1).astype(np.float32)
+        else:
+            samples = np.frombuffer(data, dtype=f"<i{width}").astype(np.float32)
+        # 转换为单声道
+        return samples.reshape(-1, channels).mean(axis=1), rate
+
+    @staticmethod
+    def _decode_window(path, start, duration):
+        """用 pydub（ffmpeg）解码压缩格式，只解码需要的区间"""
+        from pydub import AudioSegment
+        segment = AudioSegment.from_file(path, start_second=start, duration=duration)
+        segment = segment.set_channels(1)  # 转换为单声道
+        return np.array(segment.get_array_of_samples(), dtype=np.float32), segment.frame_rate
 
     @classmethod
     def play_custom(cls, config) -> None:
         """播放自定义音乐
 
         Args:
-            config: 配置对象，包含自定义音乐设置
+            config: 配置对象或字典，包含自定义音乐设置
         """
-        custom_config = config["custom_sound"]
-        if not custom_config["path"] or not os.path.exists(custom_config["path"]):
-            return
-
-        try:
-            # 检查是否需要重新加载音频
-            if (cls._custom_sound_cache is None or 
-                cls._custom_sound_cache.get("path") != custom_config["path"]):
-                # 加载音频文件
-                audio = AudioSegment.from_file(custom_config["path"])
-                cls._custom_sound_cache = {
-                    "path": custom_config["path"],
-                    "audio": audio
-                }
-            else:
-                audio = cls._custom_sound_cache["audio"]
-
-            # 提取指定区间
-            start_ms = int(custom_config["start"] * 1000)  # 转换为毫秒
-            duration_ms = int(custom_config["duration"] * 1000)
-            segment = audio[start_ms:start_ms + duration_ms]
-
-            # 导出为临时文件并播放
-            segment = segment.set_channels(1)  # 转换为单声道
-            samples = np.array(segment.get_array_of_samples(), dtype=np.float32)
-            
-            # 确保音量适中
-            max_sample = np.max(np.abs(samples))
-            if max_sample > 0:
-                samples = samples / max_sample
-            
-            # 播放音频
-            cls._play_buffer(samples, segment.frame_rate)
-
-        except Exception as e:
-            from src.log import logger
-            logger.warning(f"播放自定义音乐失败: {e}")
+        cls.play_sound(SoundType.CUSTOM, config)
@@ -0,0 +1,150 @@
+"""模板库
+
+按图片文件内容的哈希保存解码后的像素以及灰度图、金字塔、缩放模板等派生数据，
+每项一个 .npy 文件，加载时内存映射，切换模板时无需重新解码和计算。
+每次写入后检查磁盘占用，超过上限时按最近使用时间淘汰，仍在使用的模板不会被淘汰。
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import weakref
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.log import logger
+
+
+class TemplateStore:
+    """基于内容哈希的模板缓存目录"""
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._views = weakref.WeakSet()  # 监视目标持有的 TemplateCache，其模板不会被淘汰
+
+    @staticmethod
+    def key_for(path):
+        """计算图片文件内容的哈希"""
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+    def entry(self, key):
+        return self.root / key
+
+    def touch(self, key):
+        """更新最近使用时间"""
+        try:
+            os.utime(self.entry(key))
+        except FileNotFoundError:
+            pass
+
+    def get(self, key, name):
+        """读取缓存的数组（只读内存映射），不存在时返回 None"""
+        file = self.entry(key) / f"{name}.npy"
+        try:
+            return np.load(file, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def put(self, key, name, array):
+        """保存数组，先写临时文件再改名，保证不会读到写了一半的文件"""
+        entry = self.entry(key)
+        entry.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=entry, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp, entry / f"{name}.npy")
+        except OSError as e:
+            logger.warning(f"写入模板缓存失败: {e}")
+            Path(tmp).unlink(missing_ok=True)
+            return array
+        self.prune(keep=key)
+        return self.get(key, name)
+
+    def cached(self, key, name, compute):
+        """读取缓存，没有时调用 compute() 计算并保存"""
+        array = self.get(key, name)
+        if array is None:
+            array = self.put(key, name, compute())
+        return array
+
+    def view(self, key):
+        """返回绑定到某个模板的 TemplateCache，持有期间该模板不会被淘汰"""
+        cache = TemplateCache(self, key)
+        self._views.add(cache)
+        return cache
+
+    def live_keys(self):
+        """仍被监视目标使用的模板"""
+        return {cache.key for cache in list(self._views)}
+
+    def load(self, path):
+        """加载模板图片，返回 (image, key)，无法加载时 image 为 None
+
+        同一内容的图片只解码一次，之后直接内存映射缓存的像素。
+        """
+        try:
+            key = self.key_for(path)
+        except OSError as e:
+            logger.error(f"无法读取图片: {path}: {e}")
+            return None, None
+
+        image = self.get(key, "image")
+        if image is None:
+            image = cv2.imread(str(path))
+            if image is None:
+                return None, key
+            image = self.put(key, "image", image)
+        self.touch(key)
+        return image, key
+
+    def usage(self):
+        """返回 [(最近使用时间, 字节数, key), ...]"""
+        entries = []
+        for entry in self.root.iterdir():
+            try:
+                if not entry.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+                entries.append((entry.stat().st_mtime, size, entry.name))
+            except FileNotFoundError:
+                # 其他进程正在写入或淘汰
+                continue
+        return entries
+
+    def prune(self, keep=None):
+        """磁盘占用超过上限时删除最久未使用的模板，keep 和仍在使用的模板除外"""
+        entries = sorted(self.usage())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        protected = self.live_keys() | {keep}
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key in protected:
+                continue
+            logger.info(f"淘汰模板缓存: {key}")
+            shutil.rmtree(self.entry(key), ignore_errors=True)
+            total -= size
+
+
+class TemplateCache:
+    """一个模板的派生数据缓存，缩放模板的数据用名称前缀区分"""
+
+    def __init__(self, store, key, prefix=""):
+        self.store = store
+        self.key = key
+        self.prefix = prefix
+
+    def cached(self, name, compute):
+        return self.store.cached(self.key, self.prefix + name, compute)
+
+    def scaled(self, scale):
+        """返回缩放比例为 scale 的模板使用的缓存"""
+        return TemplateCache(self.store, self.key, f"{self.prefix}x{scale:g}_")
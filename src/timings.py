@@ -0,0 +1,116 @@
+"""分阶段耗时统计
+
+匹配循环用单调时钟记录每个阶段的耗时，保存在滚动窗口中，
+可以随时读取 p50/p95/p99，不需要挂性能分析器就能看出每轮时间花在哪里。
+"""
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 阶段按匹配循环中的先后顺序排列
+STAGES = ("capture", "detect", "convert", "match", "peak", "emit", "alert", "cycle")
+PERCENTILES = (50, 95, 99)
+
+
+def nearest_rank(ordered, q):
+    """最近邻法取已排序样本的第 q 百分位数"""
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+class RollingHistogram:
+    """最近 window 个样本的耗时分布（秒）"""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, q):
+        """返回第 q 百分位数（秒），没有样本时返回 0"""
+        if not self.samples:
+            return 0.0
+        return nearest_rank(sorted(self.samples), q)
+
+    def summary(self):
+        """返回 {"p50": 毫秒, "p95": 毫秒, "p99": 毫秒, "count": 样本数}"""
+        if not self.samples:
+            return {f"p{q}": 0.0 for q in PERCENTILES} | {"count": 0}
+        ordered = sorted(self.samples)
+        result = {f"p{q}": round(nearest_rank(ordered, q) * 1000, 2) for q in PERCENTILES}
+        result["count"] = len(ordered)
+        return result
+
+
+class StageTimings:
+    """按阶段记录的滚动耗时直方图，可以在不同线程中记录和读取"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self.histograms = {}
+        self.peak_clock = PeakClock()  # 本轮峰值搜索的累计耗时，传给匹配函数
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = RollingHistogram(self.window)
+            self.histograms[stage].add(seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        """记录 with 块的耗时"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(stage, time.monotonic() - start)
+
+    def summary(self):
+        """返回 {阶段: {"p50", "p95", "p99", "count"}}，耗时单位为毫秒"""
+        with self._lock:
+            ordered = sorted(
+                self.histograms,
+                key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES),
+            )
+            return {stage: self.histograms[stage].summary() for stage in ordered}
+
+    def format(self, stages=("capture", "convert", "match", "cycle")):
+        """格式化为简短的一行文本，例如 "capture 3/5 | match 40/62 ms"（p50/p95）"""
+        summary = self.summary()
+        parts = [
+            f"{stage} {summary[stage]['p50']:.0f}/{summary[stage]['p95']:.0f}"
+            for stage in stages
+            if stage in summary
+        ]
+        return " | ".join(parts) + " ms" if parts else ""
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+
+class PeakClock:
+    """累计峰值搜索（minMaxLoc）的耗时
+
+    峰值搜索发生在 matcher 的各个函数内部，可能来自多个线程。
+    每个匹配引擎有自己的时钟（StageTimings.peak_clock），作为参数传给匹配函数，
+    由引擎在每轮结束时取走。
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.seconds += seconds
+
+    def take(self):
+        """返回并清零累计耗时"""
+        with self._lock:
+            seconds, self.seconds = self.seconds, 0.0
+        return seconds
+
@@ -5,8 +5,8 @@ from PyQt6.QtGui import QAction, QIcon, QPainter, QPixmap, QColor, QPen
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtWidgets import QMenu, QSystemTrayIcon, QFileDialog, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QDoubleSpinBox, QPushButton, QWidget
 
-from src.config import Config
-from src.sounds import SoundType, SoundPlayer
+from src.config import Config, touched
+from src.sound_types import SoundType
 
 if TYPE_CHECKING:
     from src.TransparentOverlay import TransparentOverlay
@@ -46,6 +46,11 @@ class TrayManager:
         self.status_action.setEnabled(False)
         menu.addAction(self.status_action)
 
+        # 匹配循环各阶段耗时 (p50/p95)
+        self.timings_action = QAction("耗时: -", menu)
+        self.timings_action.setEnabled(False)
+        menu.addAction(self.timings_action)
+
         menu.addSeparator()
 
         # 图片操作菜单
@@ -71,29 +76,31 @@ class TrayManager:
         
 
         # Add notification toggle
-        notification_action = QAction("系统通知", notification_menu)
-        notification_action.setCheckable(True)
-        notification_action.setChecked(self.config.data.enable_notification)
-        notification_action.triggered.connect(self.toggle_notification)
-        notification_menu.addAction(notification_action)
+        self.notification_action = QAction("系统通知", notification_menu)
+        self.notification_action.setCheckable(True)
+        self.notification_action.setChecked(self.config.data.enable_notification)
+        self.notification_action.triggered.connect(self.toggle_notification)
+        notification_menu.addAction(self.notification_action)
 
         # Add sound toggle
-        sound_action = QAction("声音提醒", notification_menu)
-        sound_action.setCheckable(True)
-        sound_action.setChecked(self.config.data.enable_sound)
-        sound_action.triggered.connect(self.toggle_sound)
-        notification_menu.addAction(sound_action)
+        self.sound_action = QAction("声音提醒", notification_menu)
+        self.sound_action.setCheckable(True)
+        self.sound_action.setChecked(self.config.data.enable_sound)
+        self.sound_action.triggered.connect(self.toggle_sound)
+        notification_menu.addAction(self.sound_action)
         
         # 添加声音设置子菜单
         sound_menu = QMenu("声音设置", notification_menu)
         
         # 创建声音选择动作组
+        self.sound_type_actions = {}  # {SoundType.name: QAction}
         for sound_type in SoundType:
             action = QAction(sound_type.value, sound_menu)
             action.setCheckable(True)
             action.setChecked(self.config.data.sound_type == sound_type.name)
             action.triggered.connect(lambda checked, st=sound_type: self.change_sound_type(st))
             sound_menu.addAction(action)
+            self.sound_type_actions[sound_type.name] = action
 
         # 添加自定义音乐设置选项
         sound_menu.addSeparator()
@@ -147,6 +154,10 @@ class TrayManager:
         else:
             self.status_action.setText("当前图片: 无")
 
+    def update_timings(self, text: str):
+        """显示匹配循环各阶段耗时 (p50/p95)"""
+        self.timings_action.setText(f"耗时: {text or '-'}")
+
     def update_status_text(self, target_image, last_match_info):
         """Update status text"""
         status_parts = []
@@ -176,29 +187,31 @@ class TrayManager:
 
     def change_sound_type(self, sound_type: SoundType):
         """更改提示音类型"""
-        self.config.data.sound_type = sound_type.name
-        self.config.save()  # 保存配置到磁盘
-        
-        # 更新菜单项选中状态
-        sound_menu = None
-        for action in self.tray.contextMenu().actions():
-            if action.text() == "声音设置":
-                sound_menu = action.menu()
-                break
-        
-        if sound_menu:
-            for action in sound_menu.actions():
-                action.setChecked(action.text() == sound_type.value)
+        self.config["sound_type"] = sound_type.name
+        # 取值未变时不会通知，这里直接更新菜单项选中状态
+        self.update_sound_type()
+
+    def update_sound_type(self):
+        """按配置更新提示音菜单项的选中状态"""
+        for name, action in self.sound_type_actions.items():
+            action.setChecked(name == self.config.data.sound_type)
+
+    def config_changed(self, changes):
+        """在界面线程中调用：配置重新加载后刷新菜单项的选中状态"""
+        if touched(changes, "enable_notification"):
+            self.notification_action.setChecked(self.config.data.enable_notification)
+        if touched(changes, "enable_sound"):
+            self.sound_action.setChecked(self.config.data.enable_sound)
+        if touched(changes, "sound_type"):
+            self.update_sound_type()
 
     def toggle_notification(self, checked):
         """Toggle notification setting"""
-        self.config.data.enable_notification = checked
-        self.config.save()
+        self.config["enable_notification"] = checked
 
     def toggle_sound(self, checked):
         """Toggle sound setting"""
-        self.config.data.enable_sound = checked
-        self.config.save()
+        self.config["enable_sound"] = checked
 
     def show_custom_sound_settings(self):
         """显示自定义音乐设置对话框"""
@@ -213,11 +226,12 @@ class TrayManager:
         
         # 显示对话框并处理结果
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            # 保存设置
-            self.config.data.custom_sound = dialog.get_settings()
-            # 如果当前选择的是自定义音乐，更新一下设置
-            if self.config.data.sound_type == SoundType.CUSTOM.name:
-                self.change_sound_type(SoundType.CUSTOM)
+            # 保存设置，与提示音类型的更新合并为一次写入
+            with self.config.batch():
+                self.config["custom_sound"] = dialog.get_settings()
+                # 如果当前选择的是自定义音乐，更新一下设置
+                if self.config.data.sound_type == SoundType.CUSTOM.name:
+                    self.change_sound_type(SoundType.CUSTOM)
 
     def show_about_dialog(self):
         """显示关于对话框"""
@@ -339,7 +353,8 @@ class CustomSoundDialog(QDialog):
                 "duration": self.duration_spin.value()
             }
         }
-        # 播放测试音效
+        # 播放测试音效，声音模块在首次使用时才导入
+        from src.sounds import SoundPlayer
         SoundPlayer.play_sound(SoundType.CUSTOM, temp_config)
 
     def get_settings(self):
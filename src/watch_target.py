@@ -0,0 +1,343 @@
+"""监视目标
+
+每个目标持有自己的模板、阈值和匹配状态，多个目标共享同一帧截图。
+"""
+import cv2
+import numpy as np
+
+from src import matcher
+from src.buffers import BufferPool
+from src.capture import Frame
+from src.log import logger
+
+
+class WatchTarget:
+    """一个监视目标及其匹配状态"""
+
+    def __init__(
+        self,
+        name,
+        image,
+        threshold=None,
+        tile_size=64,
+        pyramid_levels=2,
+        grayscale=False,
+        cache=None,
+    ):
+        self.name = name
+        self.image = image
+        self.threshold = threshold  # 为 None 时使用全局阈值
+        self.tile_size = tile_size
+        self.grayscale = grayscale  # 是否在灰度图上匹配
+        self.pyramid_levels = pyramid_levels
+        self.cache = cache  # 模板库中的派生数据缓存（TemplateCache），可选
+        # 模板只在设置时转换一次
+        if grayscale:
+            self.template = self.cached(
+                "gray", lambda: cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            )
+        else:
+            self.template = image
+        self.pyramid = self.build_pyramid()
+        # 颜色校验用的模板统计量：逐通道去均值后的模板及其范数
+        centered = image.astype(np.float32) - image.mean(axis=(0, 1), dtype=np.float32)
+        self.centered = centered
+        self.norm = float(np.sqrt((centered * centered).sum()))
+        self.incrementals = {}  # 每个显示器各自的增量匹配结果图 {frame.key: IncrementalMatcher}
+        self.buffers = BufferPool()  # 全量匹配复用的结果图
+        self.last_match = None  # 存储上次匹配位置
+        self.frames_since_full_search = 0  # 距离上次全屏搜索的帧数
+        self.last_result = None  # 上一次的匹配结果 (max_val, (x, y))
+        self.matched = False  # 跟踪上一次的匹配状态
+        self.scale = 1.0  # 上一次获胜的模板缩放比例
+        self.variants = {}  # 缩放后的模板，每个比例只准备一次 {scale: WatchTarget}
+
+    def cached(self, name, compute):
+        """有模板库时从库中读取派生数据，否则直接计算"""
+        if self.cache is None:
+            return compute()
+        return self.cache.cached(name, compute)
+
+    def build_pyramid(self):
+        """构建模板金字塔，每层都可以从模板库中读取"""
+        depth = matcher.pyramid_depth(self.template, self.pyramid_levels)
+        prefix = "gray_pyramid" if self.grayscale else "pyramid"
+        levels = [self.template]
+        for level in range(1, depth + 1):
+            previous = levels[-1]
+            levels.append(
+                self.cached(f"{prefix}{level}", lambda: cv2.pyrDown(previous))
+            )
+        return levels
+
+    @property
+    def size(self):
+        """当前缩放比例下的模板大小 (w, h)"""
+        image = self.variant(self.scale).image if self.scale != 1.0 else self.image
+        h, w = image.shape[:2]
+        return w, h
+
+    def variant(self, scale):
+        """返回按 scale 缩放的模板，模板过小时返回 None"""
+        if scale == 1.0:
+            return self
+        if scale not in self.variants:
+            h, w = self.image.shape[:2]
+            size = (round(w * scale), round(h * scale))
+            if min(size) < matcher.MIN_PYRAMID_TEMPLATE_SIZE:
+                self.variants[scale] = None
+            else:
+                interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+                cache = self.cache.scaled(scale) if self.cache is not None else None
+                image = self.cached(
+                    f"x{scale:g}",
+                    lambda: cv2.resize(self.image, size, interpolation=interpolation),
+                )
+                self.variants[scale] = WatchTarget(
+                    f"{self.name}@{scale:g}x",
+                    image,
+                    self.threshold,
+                    tile_size=self.tile_size,
+                    pyramid_levels=self.pyramid_levels,
+                    grayscale=self.grayscale,
+                    cache=cache,
+                )
+        return self.variants[scale]
+
+    def reset(self):
+        """清空匹配状态"""
+        self.last_match = None
+        self.frames_since_full_search = 0
+        self.last_result = None
+        self.matched = False
+        self.incrementals.clear()
+        for variant in self.variants.values():
+            if variant is not None:
+                variant.reset()
+
+    def get_incremental(self, key):
+        if key not in self.incrementals:
+            self.incrementals[key] = matcher.IncrementalMatcher(self.tile_size)
+        return self.incrementals[key]
+
+    def frame_image(self, frame):
+        """返回该目标匹配用的帧图像（灰度或 BGR）"""
+        return frame.converted(self.grayscale)
+
+    def color_score(self, frame, x, y):
+        """在匹配位置上用彩色模板计算 TM_CCOEFF_NORMED 匹配度
+
+        (x, y) 为帧内坐标，只读取模板大小的窗口。
+        """
+        h, w = self.image.shape[:2]
+        window = frame.window(x, y, w, h).astype(np.float32)
+        if window.shape[:2] != (h, w):
+            return -1.0
+        window -= window.mean(axis=(0, 1))
+        denominator = float(np.sqrt((window * window).sum())) * self.norm
+        if denominator == 0:
+            # 纯色模板或纯色区域，只能比较像素是否相同
+            return 1.0 if np.array_equal(frame.window(x, y, w, h), self.image) else 0.0
+        return float((window * self.centered).sum()) / denominator
+
+    def get_threshold(self, match_config):
+        """返回该目标生效的匹配度阈值"""
+        return self.threshold if self.threshold is not None else match_config.threshold
+
+    def match(self, screen_bgr, match_config, pool=None, clock=None):
+        """在单张截图中查找目标，返回 (max_val, (x, y))"""
+        return self.match_frames([Frame(0, bgr=screen_bgr)], match_config, pool, clock=clock)
+
+    def match_frames(
+        self,
+        frames,
+        match_config,
+        pool=None,
+        executor=None,
+        scales=None,
+        scale_executor=None,
+        clock=None,
+    ):
+        """在一帧或多帧截图中按多个缩放比例查找目标
+
+        先尝试上一次获胜的比例，匹配度超过阈值就不再尝试其他比例；
+        否则在 scale_executor 中并行搜索其余比例，取匹配度最高者。
+
+        Args:
+            frames: Frame 列表
+            match_config: 匹配设置
+            pool: parallel 模式使用的 TiledMatchPool
+            executor: 用于并行搜索多个显示器的线程池（可选）
+            scales: 模板缩放比例列表，为空时只匹配原始尺寸
+            scale_executor: 用于并行搜索多个比例的线程池（可选）
+            clock: 记录峰值搜索耗时的 PeakClock（可选）
+
+        Returns:
+            (max_val, (x, y))，坐标为虚拟屏幕截图坐标
+        """
+        variants = {}
+        for scale in scales or [1.0]:
+            variant = self.variant(scale)
+            if variant is not None:
+                variants[scale] = variant
+        if list(variants) == [1.0]:
+            self.scale = 1.0
+            return self.match_native(frames, match_config, pool, executor, clock=clock)
+
+        # 所有比例的增量结果图都要累计变化，即使本轮没有搜索
+        for variant in variants.values():
+            variant.mark_dirty(frames)
+
+        threshold = self.get_threshold(match_config)
+        first = self.scale if self.scale in variants else next(iter(variants))
+        variant = variants[first]
+        variant.last_match = self.last_match
+        max_val, max_loc = variant.match_native(
+            frames, match_config, pool, executor, False, clock
+        )
+        self.scale = first
+        if max_val > threshold:
+            return max_val, max_loc
+
+        others = [scale for scale in variants if scale != first]
+        # 先统一转换颜色，避免多个线程同时转换同一帧
+        for frame in frames:
+            self.frame_image(frame)
+
+        def search_scale(scale):
+            variant = variants[scale]
+            variant.last_match = None
+            return variant.match_native(frames, match_config, pool, executor, False, clock)
+
+        # parallel 模式的进程池共用一块共享内存，不能并发调用
+        if scale_executor is not None and match_config.mode != "parallel":
+            results = list(scale_executor.map(search_scale, others))
+        else:
+            results = [search_scale(scale) for scale in others]
+
+        for scale, (val, loc) in zip(others, results):
+            if val > max_val:
+                max_val, max_loc = val, loc
+                self.scale = scale
+        if self.scale != first:
+            logger.info(f"[{self.name}] 模板缩放比例切换为 {self.scale:g}x")
+        return max_val, max_loc
+
+    def mark_dirty(self, frames):
+        """把各帧的变化方块累计到对应的增量结果图"""
+        for frame in frames:
+            if frame.dirty is not None:
+                self.get_incremental(frame.key).mark_dirty(frame.dirty)
+
+    def match_native(
+        self, frames, match_config, pool=None, executor=None, mark_dirty=True, clock=None
+    ):
+        """在一帧或多帧（每个显示器一帧）截图中按原始尺寸查找目标
+
+        跟踪模式下先在上次匹配位置附近搜索，局部匹配度低于阈值
+        或到达强制全屏搜索间隔时才做全屏搜索。
+
+        Args:
+            frames: Frame 列表
+            match_config: 匹配设置
+            pool: parallel 模式使用的 TiledMatchPool
+            executor: 用于并行搜索多个显示器的线程池（可选）
+            clock: 记录峰值搜索耗时的 PeakClock（可选）
+
+        Returns:
+            (max_val, (x, y))，坐标为虚拟屏幕截图坐标
+        """
+        if mark_dirty:
+            self.mark_dirty(frames)
+
+        if (
+            match_config.tracking
+            and self.last_match is not None
+            and self.frames_since_full_search < match_config.full_search_interval
+        ):
+            x, y = self.last_match
+            frame = next((f for f in frames if f.contains(x, y)), None)
+            if frame is not None:
+                ox, oy = frame.offset
+                pad = match_config.track_padding
+                max_val, (lx, ly) = matcher.match_region(
+                    self.frame_image(frame), self.template,
+                    x - ox - pad, y - oy - pad, x - ox + pad, y - oy + pad, clock,
+                )
+                self.frames_since_full_search += 1
+                max_val, max_loc = self.verify_color(
+                    frames, max_val, (lx + ox, ly + oy), match_config
+                )
+                if max_val > self.get_threshold(match_config):
+                    return max_val, max_loc
+                logger.debug(
+                    f"[{self.name}] 局部匹配度 {max_val*100:.2f}% 低于阈值，回退到全屏搜索"
+                )
+
+        self.frames_since_full_search = 0
+
+        def search_frame(frame):
+            max_val, (lx, ly) = self.search(
+                self.frame_image(frame), match_config, pool, frame.key, clock
+            )
+            ox, oy = frame.offset
+            return max_val, (lx + ox, ly + oy)
+
+        # parallel 模式的进程池共用一块共享内存，不能并发调用
+        if executor is not None and len(frames) > 1 and match_config.mode != "parallel":
+            results = executor.map(search_frame, frames)
+        else:
+            results = map(search_frame, frames)
+        max_val, max_loc = max(results, key=lambda r: r[0])
+        return self.verify_color(frames, max_val, max_loc, match_config)
+
+    def verify_color(self, frames, max_val, max_loc, match_config):
+        """灰度匹配成功后，只在获胜位置上校验颜色
+
+        颜色不符时返回彩色匹配度，使其低于阈值。
+        """
+        if (
+            not self.grayscale
+            or not match_config.color_check
+            or max_val <= self.get_threshold(match_config)
+        ):
+            return max_val, max_loc
+        x, y = max_loc
+        frame = next((f for f in frames if f.contains(x, y)), None)
+        if frame is None:
+            return max_val, max_loc
+        ox, oy = frame.offset
+        score = self.color_score(frame, x - ox, y - oy)
+        if score <= self.get_threshold(match_config):
+            logger.debug(f"[{self.name}] 灰度匹配 {max_val*100:.2f}% 但颜色不符 {score*100:.2f}%")
+            return score, max_loc
+        return max_val, max_loc
+
+    def search(self, screen_bgr, match_config, pool=None, key=0, clock=None):
+        """按配置的匹配模式在整个截图中查找目标
+
+        screen_bgr 为与模板同类型的截图（灰度模式下为灰度图），
+        pool 为 parallel 模式使用的 TiledMatchPool，key 为截图所属的显示器编号，
+        clock 为记录峰值搜索耗时的 PeakClock（可选）。
+        """
+        th, tw = self.template.shape[:2]
+        if screen_bgr.shape[0] < th or screen_bgr.shape[1] < tw:
+            # 显示器比模板还小
+            return -1.0, (0, 0)
+        if match_config.mode == "pyramid":
+            return matcher.match_pyramid(
+                screen_bgr,
+                self.template,
+                match_config.pyramid_levels,
+                match_config.pyramid_candidates,
+                self.pyramid,
+                clock,
+            )
+        if match_config.mode == "parallel" and pool is not None:
+            return pool.match(screen_bgr, self.template, clock)
+        if match_config.incremental and match_config.skip_unchanged:
+            return self.get_incremental(key).match(screen_bgr, self.template, clock)
+        result = self.buffers.get(
+            key, matcher.result_shape(screen_bgr, self.template), np.float32
+        )
+        return matcher.match_full(screen_bgr, self.template, result, clock)
@@ -1,37 +1,49 @@
-from PyQt6.QtCore import QRect, Qt
+from PyQt6.QtCore import QMetaObject, Qt
 from PyQt6.QtGui import QColor, QPainter, QPen
-from src.log import logger
+
+from src.config import touched
+
 
 class WindowPainter:
     def __init__(self, widget, config):
         self.widget = widget
         self.config = config
+        self._pen = None  # 缓存的画笔，颜色或边框设置变化时重建
+        config.subscribe(self.config_changed)
+
+    def config_changed(self, changes):
+        """颜色或边框设置变化时丢弃缓存的画笔并重绘，可能在配置文件监视线程中调用"""
+        if touched(changes, "color", "border"):
+            self._pen = None
+            QMetaObject.invokeMethod(self.widget, "update", Qt.ConnectionType.QueuedConnection)
+
+    @property
+    def pen(self):
+        if self._pen is None:
+            pen = QPen(QColor(self.config.data.color))
+            pen.setWidth(self.border_width)
+            pen.setStyle(Qt.PenStyle.SolidLine)
+            pen.setCapStyle(Qt.PenCapStyle.SquareCap)
+            self._pen = pen
+        return self._pen
 
     def paint(self, event):
         """绘制边框"""
-        logger.debug(f"WindowPainter.paint 被调用: widget大小={self.widget.width()}x{self.widget.height()}")
         painter = QPainter(self.widget)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-
-        # 设置画笔
-        pen = QPen(QColor(self.config["color"]))
-        pen.setWidth(self.border_width)
-        pen.setStyle(Qt.PenStyle.SolidLine)
-        pen.setCapStyle(Qt.PenCapStyle.SquareCap)
-        painter.setPen(pen)
+        painter.setPen(self.pen)
 
         # 移除背景
         painter.setBrush(Qt.BrushStyle.NoBrush)
 
         # 绘制边框
-        rect = QRect(
-            self.border_width >> 1,
-            self.border_width >> 1,
-            self.widget.width() - self.border_width,
-            self.widget.height() - self.border_width,
+        width = self.border_width
+        painter.drawRect(
+            width >> 1,
+            width >> 1,
+            self.widget.width() - width,
+            self.widget.height() - width,
         )
-        painter.drawRect(rect)
-        logger.debug(f"绘制边框: rect={rect}, color={self.config.data.color}, width={self.border_width}")
 
     @property
     def border_width(self):
@@ -0,0 +1,116 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.alerts import Alert, AlertDispatcher, merge_alerts
+
+
+class Recorder:
+    """记录收到的提醒"""
+
+    def __init__(self):
+        self.alerts = []
+        self.received = threading.Event()
+
+    def __call__(self, alert):
+        self.alerts.append(alert)
+        self.received.set()
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待超时")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def make_dispatcher():
+    dispatchers = []
+
+    def make(*args, **kwargs):
+        dispatcher = AlertDispatcher(*args, **kwargs)
+        dispatchers.append(dispatcher)
+        return dispatcher
+
+    yield make
+    for dispatcher in dispatchers:
+        dispatcher.close()
+
+
+def test_merge_alerts():
+    """测试多个提醒合并为一个"""
+    alert = Alert("找到匹配", "匹配度: 90.0%", "a")
+    assert merge_alerts([alert]) is alert
+    merged = merge_alerts([alert, Alert("找到匹配: b", "匹配度: 85.0%", "b")])
+    assert merged.title == "找到 2 个匹配"
+    assert merged.target is None
+
+
+def test_burst_is_coalesced(make_dispatcher):
+    """测试合并窗口内的一串提醒只发送一次"""
+    sound = Recorder()
+    dispatcher = make_dispatcher({"sound": sound}, coalesce=0.2)
+    for index in range(5):
+        dispatcher.submit(Alert(f"t{index}", "m"))
+    wait_for(lambda: sound.alerts)
+    time.sleep(0.1)
+    assert len(sound.alerts) == 1
+    assert sound.alerts[0].title == "找到 5 个匹配"
+
+
+def test_per_channel_debounce(make_dispatcher):
+    """测试每个渠道各自限流，限流期间的提醒延迟到期后合并发送"""
+    notification, sound = Recorder(), Recorder()
+    dispatcher = make_dispatcher(
+        {"notification": notification, "sound": sound},
+        coalesce=0,
+        debounce={"notification": 0.5},
+    )
+    dispatcher.submit(Alert("a", "m"))
+    wait_for(lambda: notification.alerts and sound.alerts)
+    dispatcher.submit(Alert("b", "m"))
+    dispatcher.submit(Alert("c", "m"))
+
+    wait_for(lambda: len(sound.alerts) >= 2)
+    assert len(notification.alerts) == 1
+    wait_for(lambda: len(notification.alerts) == 2)
+    assert notification.alerts[1].title == "找到 2 个匹配"
+
+
+def test_submit_never_blocks(make_dispatcher):
+    """测试渠道阻塞时提交不阻塞，队列满后丢弃"""
+    release = threading.Event()
+    dispatcher = make_dispatcher({"sound": lambda alert: release.wait()}, maxsize=2, coalesce=0)
+    dispatcher.submit(Alert("first", "m"))
+    wait_for(lambda: dispatcher.stats()["queued"] == 0)
+
+    start = time.monotonic()
+    results = [dispatcher.submit(Alert(str(i), "m")) for i in range(5)]
+    assert time.monotonic() - start < 0.1
+    assert results == [True, True, False, False, False]
+    assert dispatcher.stats()["dropped"] == 3
+    release.set()
+
+
+def test_channel_error_does_not_stop_dispatch(make_dispatcher):
+    """测试某个渠道出错不影响之后的提醒"""
+    calls = []
+
+    def flaky(alert):
+        calls.append(alert)
+        if len(calls) == 1:
+            raise RuntimeError("通知后端不可用")
+
+    dispatcher = make_dispatcher({"notification": flaky}, coalesce=0)
+    dispatcher.submit(Alert("a", "m"))
+    wait_for(lambda: len(calls) == 1)
+    dispatcher.submit(Alert("b", "m"))
+    wait_for(lambda: len(calls) == 2)
@@ -0,0 +1,155 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.capture import (
+    CaptureBackend,
+    FakeCapture,
+    ReplayCapture,
+    monitor_offset,
+    select_monitors,
+    synthetic_screen,
+)
+from src.config import CaptureConfig, MatchConfig
+from src.watch_target import WatchTarget
+
+
+@pytest.fixture
+def capture():
+    """模拟两个左右排列、中间有空隙的显示器"""
+    return FakeCapture(
+        synthetic_screen(600, 240, seed=3, block=4),
+        monitors=[
+            {"left": 0, "top": 0, "width": 200, "height": 240},
+            {"left": 400, "top": 40, "width": 200, "height": 200},
+        ],
+    )
+
+
+def test_select_monitors(capture):
+    """测试包含和排除显示器"""
+    monitors = capture.monitors
+    assert [i for i, _ in select_monitors(monitors)] == [1, 2]
+    assert [i for i, _ in select_monitors(monitors, include=[2])] == [2]
+    assert [i for i, _ in select_monitors(monitors, exclude=[1])] == [2]
+
+
+def test_monitor_offset_scaled():
+    """测试高分屏下逻辑坐标到截图像素的换算"""
+    virtual = {"left": -100, "top": 0}
+    monitor = {"left": 100, "top": 50, "width": 200}
+    assert monitor_offset(monitor, virtual, image_width=400) == (400, 100)
+
+
+def test_grab_frames_per_monitor(capture):
+    """测试分显示器截图"""
+    frames = capture.grab_frames(CaptureConfig(per_monitor=True))
+    assert [f.key for f in frames] == [1, 2]
+    assert frames[1].offset == (400, 40)
+    assert frames[1].shape[:2] == (200, 200)
+
+    # 所有显示器都被排除时退回整个虚拟屏幕
+    frames = capture.grab_frames(CaptureConfig(per_monitor=True, exclude_monitors=[1, 2]))
+    assert [f.key for f in frames] == [0]
+    assert frames[0].shape[:2] == (240, 600)
+
+
+def test_grab_frames_overlap_adjacent():
+    """测试相邻显示器的截图互相重叠，有空隙的显示器不延伸"""
+    capture = FakeCapture(
+        synthetic_screen(600, 200, seed=3, block=4),
+        monitors=[
+            {"left": 0, "top": 0, "width": 200, "height": 200},
+            {"left": 200, "top": 0, "width": 200, "height": 200},
+            {"left": 450, "top": 0, "width": 150, "height": 200},
+        ],
+    )
+    frames = capture.grab_frames(CaptureConfig(per_monitor=True), overlap=30)
+    assert [f.offset for f in frames] == [(0, 0), (170, 0), (450, 0)]
+    assert [f.shape[1] for f in frames] == [230, 230, 150]
+
+
+@pytest.mark.parametrize("tracking", [False, True])
+def test_straddling_template_found(tracking):
+    """测试跨越两个显示器边界的模板在分显示器模式下也能找到"""
+    capture = FakeCapture(
+        synthetic_screen(400, 200, seed=3, block=4),
+        monitors=[
+            {"left": 0, "top": 0, "width": 200, "height": 200},
+            {"left": 200, "top": 0, "width": 200, "height": 200},
+        ],
+    )
+    target = WatchTarget("a", np.ascontiguousarray(capture.desktop[80:120, 170:230, :3]))
+    config = MatchConfig(tracking=tracking)
+    for _ in range(2):
+        frames = capture.grab_frames(CaptureConfig(per_monitor=True), overlap=60)
+        max_val, max_loc = target.match_frames(frames, config)
+        target.last_match = max_loc
+        assert max_val > 0.99
+        assert max_loc == (170, 80)
+
+
+@pytest.mark.parametrize("tracking", [False, True])
+def test_match_maps_to_virtual_coordinates(capture, tracking):
+    """测试各显示器的匹配坐标换算回虚拟屏幕坐标"""
+    target = WatchTarget("a", np.ascontiguousarray(capture.desktop[120:160, 480:540, :3]))
+    config = MatchConfig(tracking=tracking)
+    for _ in range(2):
+        frames = capture.grab_frames(CaptureConfig(per_monitor=True))
+        max_val, max_loc = target.match_frames(frames, config)
+        target.last_match = max_loc
+        assert max_val > 0.99
+        assert max_loc == (480, 120)
+
+
+def test_fake_capture_generator():
+    """测试按帧号生成画面"""
+    capture = FakeCapture(generator=lambda i: synthetic_screen(64, 32, seed=i))
+    first = capture.grab_frames(CaptureConfig())[0].image
+    second = capture.grab_frames(CaptureConfig())[0].image
+    assert first.shape == (32, 64, 4)
+    assert not np.array_equal(first, second)
+    assert capture.frame_index == 2
+
+
+def test_replay_capture(tmp_path):
+    """测试按顺序循环回放图片"""
+    for i in range(2):
+        cv2.imwrite(str(tmp_path / f"{i}.png"), synthetic_screen(40, 30, seed=i)[..., :3])
+    capture = ReplayCapture(tmp_path)
+    images = [capture.grab_frames(CaptureConfig())[0].image for _ in range(3)]
+    assert images[0].shape == (30, 40, 4)
+    assert not np.array_equal(images[0], images[1])
+    assert np.array_equal(images[0], images[2])
+
+
+def test_replay_grab_before_grab_frames(tmp_path):
+    """测试在 grab_frames() 之前直接 grab() 得到第一张图片"""
+    cv2.imwrite(str(tmp_path / "0.png"), synthetic_screen(40, 30, seed=0)[..., :3])
+    capture = ReplayCapture(tmp_path)
+    image = capture.grab(capture.monitors[1])
+    assert image.shape == (30, 40, 4)
+
+
+def test_backend_must_implement_grab():
+    """测试截图后端必须实现 monitors 和 grab"""
+
+    class Incomplete(CaptureBackend):
+        @property
+        def monitors(self):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_replay_capture_missing(tmp_path):
+    """测试没有可回放的图片"""
+    with pytest.raises(FileNotFoundError):
+        ReplayCapture(tmp_path)
@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.change_detector import FrameChangeDetector
+
+
+@pytest.fixture
+def frame():
+    """生成 BGRA 合成截图"""
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (200, 300, 4), dtype=np.uint8)
+
+
+def test_first_frame_is_dirty(frame):
+    """测试首帧全部视为变化"""
+    detector = FrameChangeDetector(tile_size=64)
+    dirty = detector.update(frame)
+    assert dirty.shape == (4, 5)
+    assert dirty.all()
+    assert detector.stats() == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+
+
+def test_unchanged_frame_hits(frame):
+    """测试画面未变化时命中缓存"""
+    detector = FrameChangeDetector(tile_size=64)
+    detector.update(frame)
+    dirty = detector.update(frame.copy())
+    assert not dirty.any()
+    assert detector.hits == 1
+
+
+def test_changed_tile(frame):
+    """测试只标记发生变化的方块"""
+    detector = FrameChangeDetector(tile_size=64)
+    detector.update(frame)
+    changed = frame.copy()
+    changed[130, 70] += 1
+    dirty = detector.update(changed)
+    assert dirty.sum() == 1
+    assert dirty[2, 1]
+
+
+def test_row_swap_is_detected(frame):
+    """测试方块内两行互换也能被检测到"""
+    detector = FrameChangeDetector(tile_size=64)
+    detector.update(frame)
+    changed = frame.copy()
+    changed[[10, 20]] = changed[[20, 10]]
+    assert detector.update(changed).any()
+
+
+def test_bgr_frame(frame):
+    """测试三通道图像"""
+    detector = FrameChangeDetector(tile_size=64)
+    bgr = np.ascontiguousarray(frame[..., :3])
+    detector.update(bgr)
+    changed = bgr.copy()
+    changed[5, 299, 2] ^= 0xFF
+    dirty = detector.update(changed)
+    assert dirty.sum() == 1
+    assert dirty[0, 4]
+
+
+@pytest.mark.parametrize("channels", [4, 3])
+def test_column_swap_is_detected(frame, channels):
+    """测试方块内两列互换（同一行内的左右移动）也能被检测到"""
+    frame = np.ascontiguousarray(frame[..., :channels])
+    detector = FrameChangeDetector(tile_size=64)
+    detector.update(frame)
+    changed = frame.copy()
+    changed[:, [10, 20]] = changed[:, [20, 10]]
+    dirty = detector.update(changed)
+    assert dirty[:, 0].all()
+    assert not dirty[:, 1:].any()
+
+    # 方块内的内容整体右移一个像素
+    shifted = changed.copy()
+    shifted[:, 65:128] = changed[:, 64:127]
+    shifted[:, 64] = changed[:, 127]
+    assert detector.update(shifted)[:, 1].all()
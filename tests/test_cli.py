@@ -0,0 +1,74 @@
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import cli
+from src.capture import synthetic_screen
+
+ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """一张回放截图和一个截图中的模板，配置目录指向临时目录"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    screen = synthetic_screen(320, 240, seed=3)
+    screen_path = tmp_path / "screen.png"
+    template_path = tmp_path / "button.png"
+    cv2.imwrite(str(screen_path), screen)
+    cv2.imwrite(str(template_path), np.ascontiguousarray(screen[50:90, 120:180, :3]))
+    return screen_path, template_path
+
+
+def test_no_qt_import():
+    """测试命令行模式不导入 Qt 和声音模块"""
+    code = "import sys, src.cli; print(sorted(m for m in sys.modules if m.startswith(('PyQt6', 'src.sounds'))))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_watch_json_events(files, capsys):
+    """测试以 JSON Lines 输出出现事件"""
+    screen_path, template_path = files
+    code = cli.main([
+        "watch", str(template_path), "--replay", str(screen_path),
+        "--json", "--once", "--max-cycles", "3",
+    ])
+    assert code == 0
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(events) == 1
+    assert events[0]["event"] == "matched"
+    assert events[0]["target"] == "button.png"
+    assert events[0]["rect"] == [120, 50, 60, 40]
+
+
+def test_watch_hook(files, tmp_path):
+    """测试目标出现时执行钩子命令"""
+    screen_path, template_path = files
+    marker = tmp_path / "hook.txt"
+    cli.main([
+        "watch", str(template_path), "--replay", str(screen_path), "--once",
+        "--on-match", f'echo "$WATCHCAT_TARGET $WATCHCAT_RECT" > {marker}',
+    ])
+    for _ in range(50):
+        if marker.exists() and marker.read_text():
+            break
+        time.sleep(0.05)
+    assert marker.read_text().strip() == "button.png 120,50,60,40"
+
+
+def test_watch_without_templates(files):
+    """测试没有模板时返回错误码"""
+    screen_path, _ = files
+    assert cli.main(["watch", "--replay", str(screen_path), "--max-cycles", "1"]) == 2
@@ -0,0 +1,230 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import AppConfig, Config, diff_config, touched
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """配置文件写到临时的 HOME 目录"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    config = Config(save_delay=0.1)
+    yield config
+    config.close()
+
+
+def read_file(config):
+    with open(config.config_path) as f:
+        return json.load(f)
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待超时")
+        time.sleep(0.01)
+
+
+def test_writes_are_debounced(config):
+    """测试连续修改只在安静期后写入一次，且不阻塞调用方"""
+    for x in range(10):
+        config["position"] = {"x": x, "y": 0}
+    assert not config.config_path.exists()
+    wait_for(lambda: config.writer.writes == 1)
+    assert read_file(config)["position"] == {"x": 9, "y": 0}
+    time.sleep(0.2)
+    assert config.writer.writes == 1
+
+
+def test_batch_validates_and_notifies_once(config):
+    """测试 batch() 中的多次修改合并为一次通知"""
+    notified = []
+    config.subscribe(notified.append)
+    with config.batch():
+        config["position"] = {"x": 1, "y": 2}
+        config["size"] = {"width": 30, "height": 40}
+        assert config.data.position.x == 100  # 退出 batch 后才生效
+    assert notified == [{"position.x", "position.y", "size.width", "size.height"}]
+    assert config.data.size.width == 30
+
+    config.update(opacity=0.5, color="#00FF00", enable_sound=True)
+    assert notified[-1] == {"opacity", "color"}  # 取值未变的字段不通知
+    config.flush()
+    assert read_file(config)["color"] == "#00FF00"
+    assert config.writer.writes == 1
+
+
+def test_invalid_update_is_atomic(config):
+    """测试任一字段无效时整体不生效，也不写入"""
+    with pytest.raises(ValidationError):
+        config.update(opacity=0.5, position={"x": "left"})
+    assert config.data.opacity == 1.0
+    with pytest.raises(KeyError):
+        config["missing"] = 1
+    with pytest.raises(ValidationError):
+        with config.batch():
+            config["size"] = {"width": "wide"}
+    assert not config.writer.pending
+
+
+def test_flush_writes_atomically(config):
+    """测试 flush 立即写入，且不留下临时文件"""
+    config["last_image"] = "/tmp/target.png"
+    config.flush()
+    assert read_file(config)["last_image"] == "/tmp/target.png"
+    assert [p.name for p in config.config_path.parent.iterdir()] == [".autogui.json"]
+    other = Config()
+    assert other.data.last_image == "/tmp/target.png"
+    other.close()
+
+
+def test_save_after_direct_mutation(config):
+    """测试直接修改 data 后调用 save() 同样去抖写入并通知"""
+    notified = []
+    config.subscribe(notified.append)
+    config.data.enable_sound = False
+    config.save()
+    assert notified == [None]
+    wait_for(lambda: config.writer.writes == 1)
+    assert read_file(config)["enable_sound"] is False
+
+
+def test_diff_config():
+    """测试逐字段比较配置，列表整体比较"""
+    old = AppConfig()
+    new = old.model_copy(deep=True)
+    new.match.threshold = 0.9
+    new.match.scales = [1.0, 2.0]
+    new.sound_type = "BEEP"
+    changes = diff_config(old, new)
+    assert changes == {"match.threshold", "match.scales", "sound_type"}
+    assert touched(changes, "match")
+    assert touched(changes, "polling", "sound_type")
+    assert not touched(changes, "match.grayscale", "polling")
+    assert touched(None, "polling")
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_external_edit_is_reloaded(config, use_inotify):
+    """测试在应用外修改配置文件后自动重新加载，只通知变化的字段"""
+    config["color"] = "#00FF00"
+    config.flush()
+    notified = []
+    config.subscribe(notified.append)
+    watcher = config.watch(use_inotify=use_inotify, interval=0.05)
+    try:
+        data = read_file(config)
+        data["match"]["threshold"] = 0.9
+        data["polling"]["interval_ms"] = 500
+        config.config_path.write_text(json.dumps(data))
+        wait_for(lambda: notified)
+        assert notified == [{"match.threshold", "polling.interval_ms"}]
+        assert config.data.match.threshold == 0.9
+        assert config.data.color == "#00FF00"
+
+        # 应用自己写入的文件读回来没有差异，不再通知
+        config["opacity"] = 0.5
+        config.flush()
+        wait_for(lambda: watcher.changes >= 2)
+        assert notified[1:] == [{"opacity"}]
+    finally:
+        config.stop_watching()
+
+
+def test_invalid_file_keeps_config(config):
+    """测试配置文件无效时保留当前配置"""
+    config.config_path.write_text('{"opacity": "half"')
+    assert config.reload() == set()
+    config.config_path.write_text('{"opacity": "half"}')
+    assert config.reload() == set()
+    assert config.data.opacity == 1.0
+
+
+def test_writer_survives_write_error(config, monkeypatch):
+    """测试写入失败时记录警告并重试，之后的修改照常写入"""
+    import os
+
+    real_replace = os.replace
+    failures = []
+
+    def flaky_replace(src, dst):
+        if not failures:
+            failures.append(dst)
+            raise OSError(28, "No space left on device")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", flaky_replace)
+    monkeypatch.setattr(config.writer, "RETRY_DELAY", 0.05)
+    config["opacity"] = 0.5
+    wait_for(lambda: failures)
+    config["color"] = "#00FF00"
+    wait_for(lambda: config.writer.writes == 1)
+    assert read_file(config)["opacity"] == 0.5
+    assert read_file(config)["color"] == "#00FF00"
+    assert [p.name for p in config.config_path.parent.iterdir()] == [".autogui.json"]
+
+
+def test_older_snapshot_not_written_after_newer(config):
+    """测试后台线程取出的旧配置晚于 flush() 写入时被丢弃"""
+    writer = config.writer
+    config["opacity"] = 0.5
+    with writer._cond:
+        # 模拟后台线程已取出这份配置、尚未写入
+        stale, writer._pending = writer._pending, None
+    config["color"] = "#00FF00"
+    config.flush()
+    assert writer._write(*stale) is False
+    assert read_file(config)["color"] == "#00FF00"
+    assert writer.writes == 1
+
+
+def test_reload_does_not_revert_pending_changes(config):
+    """测试自己的写入触发重新加载时，尚未写入或正在写入的修改不会被文件中的旧内容覆盖"""
+    notified = []
+    config["opacity"] = 0.5
+    config.flush()
+    config.subscribe(notified.append)
+
+    config["color"] = "#00FF00"  # 尚未写入
+    assert config.reload() == set()
+    config["border"] = {"width": 7}
+    config.flush()
+    assert read_file(config)["color"] == "#00FF00"
+    assert read_file(config)["border"] == {"width": 7}
+
+    # 写入线程已取出新的配置、尚未写入时，文件仍是上一次写入的内容
+    config["color"] = "#0000FF"
+    with config.writer._cond:
+        config.writer._pending = None
+    assert config.reload() == set()
+    assert config.data.color == "#0000FF"
+    assert notified == [{"color"}, {"border.width"}, {"color"}]
+
+
+def test_closed_config_is_released(config):
+    """测试关闭后配置对象和写入线程都可以被回收，不在退出时残留"""
+    import gc
+    import weakref
+
+    from src import config as config_module
+
+    other = Config()
+    other["opacity"] = 0.5
+    thread = other.writer._thread
+    ref = weakref.ref(other)
+    other.close()
+    assert not thread.is_alive()
+    assert read_file(config)["opacity"] == 0.5
+    del other
+    gc.collect()
+    assert ref() is None
+    assert config in config_module._open_configs
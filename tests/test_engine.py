@@ -0,0 +1,225 @@
+import sys
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.capture import FakeCapture, synthetic_screen
+from src.config import AppConfig
+from src.engine import MatchEngine
+
+
+@pytest.fixture
+def config():
+    """不读写磁盘的配置"""
+    return SimpleNamespace(data=AppConfig())
+
+
+@pytest.fixture
+def capture():
+    return FakeCapture(synthetic_screen(640, 360, seed=4))
+
+
+def test_step_reports_transitions(config, capture):
+    """测试匹配状态的变化只在首次匹配时报告"""
+    engine = MatchEngine(capture, config)
+    engine.set_target(np.ascontiguousarray(capture.desktop[100:150, 200:280, :3]))
+
+    first = engine.step()[0]
+    assert first.rect == (200, 100, 80, 50)
+    assert first.became_matched
+
+    second = engine.step()[0]
+    assert second.rect == (200, 100, 80, 50)
+    assert not second.became_matched
+    assert engine.cache_stats()["hits"] == 1
+
+    # 目标消失
+    capture.desktop[100:150, 200:280] = 0
+    lost = engine.step()[0]
+    assert lost.rect is None
+    assert not engine.target.matched
+
+
+def test_per_monitor_overlap_finds_straddling_target(config):
+    """测试分显示器模式下按模板尺寸重叠相邻显示器，跨越边界的目标也能找到"""
+    capture = FakeCapture(
+        synthetic_screen(640, 360, seed=4),
+        monitors=[
+            {"left": 0, "top": 0, "width": 320, "height": 360},
+            {"left": 320, "top": 0, "width": 320, "height": 360},
+        ],
+    )
+    config.data.capture.per_monitor = True
+    engine = MatchEngine(capture, config)
+    engine.set_target(np.ascontiguousarray(capture.desktop[100:150, 280:360, :3]))
+    assert engine.monitor_overlap(engine.scale_set()) == 80
+    assert engine.step()[0].rect == (280, 100, 80, 50)
+
+
+def test_multiple_targets_share_frame(config, capture):
+    """测试多个目标共享同一帧截图，各自使用自己的阈值"""
+    engine = MatchEngine(capture, config)
+    engine.add_target("a", np.ascontiguousarray(capture.desktop[10:40, 10:60, :3]))
+    engine.add_target("b", synthetic_screen(20, 20, seed=42)[..., :3].copy(), threshold=0.99)
+
+    results = {r.target.name: r for r in engine.step()}
+    assert capture.frame_index == 1
+    assert results["a"].rect == (10, 10, 50, 30)
+    assert results["b"].rect is None
+
+
+def test_moving_target(config):
+    """测试目标在回放的多帧中移动"""
+    template = synthetic_screen(48, 32, seed=99)
+
+    def generator(i):
+        desktop = synthetic_screen(320, 240, seed=5)
+        desktop[20 + i * 30:52 + i * 30, 40 + i * 50:88 + i * 50] = template
+        return desktop
+
+    engine = MatchEngine(FakeCapture(generator=generator), config)
+    engine.set_target(np.ascontiguousarray(template[..., :3]))
+    positions = [engine.step()[0].rect[:2] for _ in range(4)]
+    assert positions == [(40, 20), (90, 50), (140, 80), (190, 110)]
+
+
+@pytest.mark.parametrize("skip_unchanged", [False, True])
+def test_steady_state_reuses_buffers(config, skip_unchanged):
+    """测试预热之后每轮不再分配整帧大小的内存"""
+    config.data.match.skip_unchanged = skip_unchanged
+    capture = FakeCapture(synthetic_screen(1280, 720, seed=6))
+    engine = MatchEngine(capture, config)
+    engine.set_target(np.ascontiguousarray(capture.desktop[300:340, 600:660, :3]))
+    engine.step()
+
+    frame_bytes = capture.desktop.nbytes
+    tracemalloc.start()
+    try:
+        for i in range(3):
+            # 每轮都改动画面，强制重新转换和匹配
+            capture.desktop[0, i] ^= 0xFF
+            engine.step()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < frame_bytes / 4
+    assert engine.memory_stats()["frame_buffers"] == 1280 * 720 * 3
+
+
+def test_scale_set(config, capture):
+    """测试缩放比例集合加入屏幕缩放比例并去重"""
+    engine = MatchEngine(capture, config)
+    config.data.match.scales = [1.0, 2.0]
+    engine.device_pixel_ratio = 2.0
+    assert engine.scale_set() == [1.0, 2.0]
+    config.data.match.dpi_scales = True
+    assert engine.scale_set() == [1.0, 2.0, 0.5]
+
+
+def test_config_changes_applied_between_cycles(config, capture):
+    """测试配置变化在两轮之间应用，只重建受影响的部分，匹配状态保持"""
+    engine = MatchEngine(capture, config)
+    engine.set_target(np.ascontiguousarray(capture.desktop[100:150, 200:280, :3]))
+    assert engine.step()[0].became_matched
+    detector = engine.get_change_detector(capture.grab_frames(config.data.capture)[0].key)
+    target = engine.target
+
+    # 阈值每轮读取，不重建目标
+    config.data.match.threshold = 1.0
+    engine.config_changed({"match.threshold"})
+    assert engine.step()[0].rect is None
+    assert engine.target is target
+
+    config.data.match.threshold = 0.8
+    config.data.match.grayscale = True
+    engine.config_changed({"match.threshold"})
+    engine.config_changed({"match.grayscale"})
+    result = engine.step()[0]
+    assert engine.target is not target and engine.target.grayscale
+    assert result.rect == (200, 100, 80, 50)
+    assert result.became_matched  # 阈值提高后曾经丢失
+    assert not engine.step()[0].became_matched
+    assert detector in engine.change_detectors.values()  # 变化检测器保持
+
+
+def test_watch_list_sync(config, capture, tmp_path):
+    """测试监视列表变化时只加载新增或修改的目标"""
+    import cv2
+    from src.config import WatchItem
+
+    config.data.template_store.path = str(tmp_path / "templates")
+    paths = []
+    for index, (y, x) in enumerate([(10, 10), (200, 300)]):
+        path = tmp_path / f"t{index}.png"
+        cv2.imwrite(str(path), capture.desktop[y:y + 30, x:x + 40, :3])
+        paths.append(str(path))
+
+    engine = MatchEngine(capture, config)
+    config.data.watch_list = [WatchItem(path=paths[0], name="a")]
+    assert engine.sync_watch_list() == 1
+    first = engine.watch_targets["a"]
+
+    config.data.watch_list = [WatchItem(path=paths[0], name="a"), WatchItem(path=paths[1])]
+    engine.config_changed({"watch_list"})
+    results = {r.target.name: r for r in engine.step()}
+    assert engine.watch_targets["a"] is first
+    assert results["t1.png"].rect == (300, 200, 40, 30)
+
+    config.data.watch_list = [WatchItem(path=paths[1])]
+    engine.config_changed({"watch_list"})
+    engine.step()
+    assert list(engine.watch_targets) == ["t1.png"]
+
+
+def test_swap_target_between_cycles(config, capture):
+    """测试切换主目标在下一轮开始之前生效，其他目标的状态保持"""
+    engine = MatchEngine(capture, config)
+    engine.set_target(np.ascontiguousarray(capture.desktop[100:150, 200:280, :3]))
+    engine.add_target("a", np.ascontiguousarray(capture.desktop[10:40, 10:60, :3]))
+    engine.step()
+    watched = engine.watch_targets["a"]
+
+    engine.swap_target(np.ascontiguousarray(capture.desktop[250:290, 400:460, :3]))
+    assert engine.target.size == (80, 50)  # 本轮之前不生效
+    results = {r.target.name: r for r in engine.step()}
+    assert results[MatchEngine.MAIN_TARGET].rect == (400, 250, 60, 40)
+    assert results[MatchEngine.MAIN_TARGET].became_matched
+    assert engine.watch_targets["a"] is watched
+    assert not results["a"].became_matched
+
+
+def test_idle_woken_early(config, capture):
+    """测试 idle() 可被 wake() / resume() 提前唤醒"""
+    import threading
+    import time
+
+    engine = MatchEngine(capture, config)
+    threading.Timer(0.05, engine.wake).start()
+    start = time.monotonic()
+    engine.idle(2.0)
+    assert time.monotonic() - start < 1.0
+
+    engine.pause()
+    threading.Timer(0.05, engine.resume).start()
+    engine.idle(0.01)  # 暂停时忽略超时，直到恢复
+    assert time.monotonic() - start >= 0.1 and not engine.paused
+
+
+def test_backoff_without_skip_unchanged(config, capture):
+    """测试关闭 skip_unchanged 时仍根据画面变化退避，但每轮都重新匹配"""
+    config.data.match.skip_unchanged = False
+    engine = MatchEngine(capture, config)
+    engine.set_target(np.ascontiguousarray(capture.desktop[100:150, 200:280, :3]))
+
+    engine.step()
+    assert engine.scheduler.reason == "changed"
+    engine.step()
+    assert engine.scheduler.reason == "quiet"
+    assert engine.timing_stats()["match"]["count"] == 2
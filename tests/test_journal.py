@@ -0,0 +1,81 @@
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.engine import MatchResult
+from src.journal import MatchJournal
+
+
+def result(name, rect, score=0.9):
+    return MatchResult(SimpleNamespace(name=name), score, rect, False)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = MatchJournal(tmp_path / "journal.jsonl", min_interval=0, summary_interval=3600)
+    yield journal
+    journal.close()
+
+
+def read_events(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_only_transitions_are_written(journal):
+    """测试只记录状态变化，不记录每一帧"""
+    for rect in [None, None, (1, 2, 3, 4), (1, 2, 3, 4), (1, 2, 3, 4), None, None]:
+        journal.record([result("a", rect)])
+    journal.flush()
+    events = [e["event"] for e in read_events(journal.path)]
+    assert events == ["matched", "lost"]
+
+
+def test_rate_limited_flapping(tmp_path):
+    """测试状态来回跳变时限流，并在摘要中计数"""
+    journal = MatchJournal(tmp_path / "journal.jsonl", min_interval=60, summary_interval=3600)
+    for rect in [(0, 0, 1, 1), None, (0, 0, 1, 1), None]:
+        journal.record([result("a", rect)])
+    journal.emit_summary()
+    journal.close()
+
+    events = read_events(journal.path)
+    assert [e["event"] for e in events] == ["matched", "summary"]
+    assert events[1]["targets"]["a"] == {
+        "frames": 4, "matched_frames": 2, "best_score": 0.9, "suppressed": 2
+    }
+
+
+def test_last_appeared_survives_restart(journal):
+    """测试可以从磁盘上的日志查询目标最近一次出现"""
+    journal.record([result("a", (1, 2, 3, 4)), result("b", None)])
+    journal.record([result("a", None)])
+    journal.record([result("a", (5, 6, 3, 4))])
+    journal.close()
+
+    reopened = MatchJournal(journal.path)
+    try:
+        assert reopened.last_appeared("a")["rect"] == [5, 6, 3, 4]
+        assert reopened.last_appeared("b") is None
+    finally:
+        reopened.close()
+
+
+def test_rotation(tmp_path):
+    """测试超过大小上限时轮转并只保留指定数量的文件"""
+    journal = MatchJournal(tmp_path / "journal.jsonl", max_bytes=1, backups=2, min_interval=0)
+    for index in range(4):
+        journal.record([result("a", (index, 0, 1, 1))])
+        journal.record([result("a", None)])
+        journal.flush()
+    journal.close()
+
+    assert [f.name for f in journal.files()] == [
+        "journal.jsonl", "journal.jsonl.1", "journal.jsonl.2"
+    ]
+    assert journal.last_appeared("a")["rect"] == [3, 0, 1, 1]
@@ -0,0 +1,159 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PyQt6.QtCore import Qt
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.capture import FakeCapture, synthetic_screen
+from src.config import Config
+from src.ImageMatchThread import ImageMatchThread
+from src.log import logger
+
+# 画面静止时的轮询间隔（毫秒），切换目标和恢复必须提前唤醒线程，不能等到下一轮
+IDLE_INTERVAL_MS = 5000
+# 切换目标到拿到第一个结果的耗时上限（秒）。实测 1080p 约 0.3–0.5 秒，
+# 上限放宽到轮询间隔的一半以免 CI 负载波动导致失败，仍能区分是否提前唤醒
+SWAP_LATENCY_BUDGET = IDLE_INTERVAL_MS / 1000 / 2
+
+
+class Matches:
+    """记录 target_match_found 信号，信号在匹配线程中直接调用"""
+
+    def __init__(self):
+        self.rects = []
+        self._cond = threading.Condition()
+
+    def __call__(self, name, rect):
+        with self._cond:
+            self.rects.append(rect)
+            self._cond.notify_all()
+
+    def wait_for(self, rect, timeout=3.0):
+        with self._cond:
+            if not self._cond.wait_for(lambda: rect in self.rects, timeout):
+                raise AssertionError(f"等待匹配 {rect} 超时")
+
+
+@pytest.fixture
+def capture():
+    return FakeCapture(synthetic_screen(640, 360, seed=4))
+
+
+@pytest.fixture
+def thread(tmp_path, monkeypatch, capture):
+    """使用合成画面的匹配线程，配置和事件日志写到临时目录"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    config = Config()
+    config.data.enable_sound = False
+    config.data.template_store.enabled = False
+    config.data.polling.min_interval_ms = IDLE_INTERVAL_MS
+    config.data.polling.max_interval_ms = IDLE_INTERVAL_MS
+    thread = ImageMatchThread(capture, config)
+    yield thread
+    if thread.isRunning():
+        thread.stop()
+    thread.close()
+    config.close()
+
+
+def crop(capture, x, y, w, h):
+    return np.ascontiguousarray(capture.desktop[y:y + h, x:x + w, :3])
+
+
+def test_swap_target_without_restart(thread, capture, record_property):
+    """测试运行中切换目标不停止线程，下一轮即给出新目标的结果"""
+    matches = Matches()
+    thread.target_match_found.connect(matches, Qt.ConnectionType.DirectConnection)
+    thread.set_target(crop(capture, 200, 100, 80, 50))
+    thread.start()
+    matches.wait_for((200, 100, 80, 50))
+    finished = threading.Event()
+    thread.finished.connect(finished.set, Qt.ConnectionType.DirectConnection)
+
+    start = time.monotonic()
+    thread.swap_target(crop(capture, 400, 250, 60, 40))
+    matches.wait_for((400, 250, 60, 40))
+    latency = time.monotonic() - start
+    record_property("swap_latency_ms", round(latency * 1000))
+    assert latency < SWAP_LATENCY_BUDGET
+    assert thread.isRunning() and not finished.is_set()
+
+
+def wait_for_frames(capture, count, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while capture.frame_index < count:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"等待第 {count} 帧超时")
+        time.sleep(0.005)
+
+
+def test_pause_and_resume(thread, capture, record_property):
+    """测试暂停期间不再截图，恢复后立即继续，线程不退出"""
+    # 不暂停时每 10 毫秒截一帧，暂停是否生效能从帧数看出来
+    thread.config.data.polling.min_interval_ms = 10
+    thread.config.data.polling.max_interval_ms = 10
+    thread.set_target(crop(capture, 200, 100, 80, 50))
+    thread.start()
+    wait_for_frames(capture, 5)
+
+    thread.pause()
+    time.sleep(0.1)  # 等待进行中的一轮结束
+    frames = capture.frame_index
+    time.sleep(0.3)
+    assert capture.frame_index == frames
+
+    # 恢复后改为长间隔，只有提前唤醒才能及时截到下一帧
+    thread.config.data.polling.min_interval_ms = IDLE_INTERVAL_MS
+    thread.config.data.polling.max_interval_ms = IDLE_INTERVAL_MS
+    start = time.monotonic()
+    thread.resume()
+    wait_for_frames(capture, frames + 1, timeout=SWAP_LATENCY_BUDGET)
+    record_property("resume_latency_ms", round((time.monotonic() - start) * 1000))
+    assert thread.isRunning()
+
+
+def test_stop_while_paused(thread, capture):
+    """测试暂停中的线程可以立即停止"""
+    thread.set_target(crop(capture, 200, 100, 80, 50))
+    thread.pause()
+    thread.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    thread.stop()
+    assert time.monotonic() - start < 0.5
+    assert not thread.isRunning()
+
+
+def test_signal_only_on_change(thread, capture):
+    """测试位置不变时只在出现时发送一次信号"""
+    thread.config.data.polling.min_interval_ms = 10
+    thread.config.data.polling.max_interval_ms = 10
+    rects = []
+    thread.match_found.connect(rects.append, Qt.ConnectionType.DirectConnection)
+    thread.set_target(crop(capture, 200, 100, 80, 50))
+    thread.start()
+    wait_for_frames(capture, 10)
+    assert rects == [(200, 100, 80, 50)]
+
+
+def test_no_per_frame_result_logs(thread, capture):
+    """测试目标位置不变时每帧的结果不输出日志，只记录出现"""
+    thread.config.data.polling.min_interval_ms = 10
+    thread.config.data.polling.max_interval_ms = 10
+    messages = []
+    sink = logger.add(
+        messages.append, level="DEBUG", filter=lambda r: r["function"] == "handle_result"
+    )
+    try:
+        thread.set_target(crop(capture, 200, 100, 80, 50))
+        thread.start()
+        wait_for_frames(capture, 10)
+    finally:
+        logger.remove(sink)
+    assert len(messages) == 1 and "出现" in messages[0]
@@ -0,0 +1,101 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import matcher
+
+
+@pytest.fixture
+def screen():
+    """生成带有平滑纹理的合成屏幕"""
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 256, (90, 160, 3), dtype=np.uint8)
+    # 放大噪声得到块状纹理，更接近真实界面且经得起降采样
+    return np.kron(noise, np.ones((6, 6, 1), dtype=np.uint8))
+
+
+@pytest.fixture
+def template(screen):
+    """从屏幕中截取模板"""
+    return screen[200:264, 300:396].copy()
+
+
+def test_match_full(screen, template):
+    """测试全屏匹配"""
+    max_val, max_loc = matcher.match_full(screen, template)
+    assert max_val > 0.99
+    assert max_loc == (300, 200)
+
+
+def test_match_region(screen, template):
+    """测试区域匹配只搜索给定范围"""
+    max_val, max_loc = matcher.match_region(screen, template, 290, 190, 310, 210)
+    assert max_val > 0.99
+    assert max_loc == (300, 200)
+
+    # 范围不包含目标
+    max_val, _ = matcher.match_region(screen, template, 0, 0, 20, 20)
+    assert max_val < 0.9
+
+
+def test_match_region_out_of_bounds(screen, template):
+    """测试区域完全越界"""
+    max_val, _ = matcher.match_region(screen, template, 5000, 5000, 5100, 5100)
+    assert max_val == -1
+
+
+@pytest.mark.parametrize("levels", [1, 2, 3])
+def test_match_pyramid(screen, template, levels):
+    """测试金字塔匹配与全屏匹配结果一致"""
+    max_val, max_loc = matcher.match_pyramid(screen, template, levels=levels)
+    assert max_val > 0.99
+    assert max_loc == (300, 200)
+
+
+def test_match_pyramid_small_template(screen):
+    """测试模板过小时退化为全屏匹配"""
+    template = screen[10:20, 10:20].copy()
+    assert matcher.pyramid_depth(template, 3) == 0
+    max_val, max_loc = matcher.match_pyramid(screen, template, levels=3)
+    assert max_loc == (10, 10)
+
+
+def test_incremental_matches_full_recompute(screen, template):
+    """测试增量匹配与全量重算结果一致"""
+    incremental = matcher.IncrementalMatcher(tile_size=64)
+    dirty = np.ones((8, 15), dtype=bool)
+    incremental.mark_dirty(dirty)
+    assert incremental.match(screen, template) == matcher.match_full(screen, template)
+
+    # 把目标移到新位置，只有相关方块发生变化
+    changed = screen.copy()
+    changed[200:264, 300:396] = 0
+    changed[400:464, 600:696] = template
+    dirty[:] = False
+    dirty[3:5, 4:7] = True
+    dirty[6:8, 9:11] = True
+    incremental.mark_dirty(dirty)
+
+    max_val, max_loc = incremental.match(changed, template)
+    full_val, full_loc = matcher.match_full(changed, template)
+    assert max_loc == full_loc == (600, 400)
+    assert max_val == pytest.approx(full_val, abs=1e-4)
+
+    # 结果图的每个位置都应与全量重算一致
+    expected = cv2.matchTemplate(changed, template, matcher.MATCH_METHOD)
+    np.testing.assert_allclose(incremental.result, expected, atol=1e-4)
+
+
+def test_dirty_rects():
+    """测试变化方块合并为矩形"""
+    incremental = matcher.IncrementalMatcher(tile_size=10)
+    dirty = np.zeros((4, 4), dtype=bool)
+    dirty[0, 0:2] = True
+    dirty[3, 3] = True
+    assert sorted(incremental.dirty_rects(dirty)) == [(0, 0, 20, 10), (30, 30, 10, 10)]
@@ -0,0 +1,155 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import cv2
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt6.QtWidgets import QApplication
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.capture import synthetic_screen
+from src.TransparentOverlay import TransparentOverlay
+
+
+@pytest.fixture
+def overlay(tmp_path, monkeypatch):
+    """配置写到临时目录的匹配框窗口"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    app = QApplication.instance() or QApplication([])
+    overlay = TransparentOverlay(app)
+    overlay.scale_factor = 1.0
+    calls = {"setGeometry": 0, "hide": 0}
+
+    def counted(name, method):
+        def wrapper(*args):
+            calls[name] += 1
+            return method(*args)
+        return wrapper
+
+    overlay.setGeometry = counted("setGeometry", overlay.setGeometry)
+    overlay.hide = counted("hide", overlay.hide)
+    overlay.calls = calls
+    yield overlay
+    overlay.cleanup()
+
+
+def test_match_updates_coalesced(overlay):
+    """测试积压的多个匹配结果只应用最后一个"""
+    for x in range(100, 150, 10):
+        overlay.on_match_found((x, 200, 80, 50))
+    QApplication.processEvents()
+    border = overlay.config.data.border.width
+    assert overlay.calls["setGeometry"] == 1
+    assert overlay.geometry().getRect() == (140 - border, 200 - border, 80 + border * 2, 50 + border * 2)
+
+
+def test_unchanged_geometry_not_touched(overlay):
+    """测试位置不变时不再设置几何属性，也不隐藏再显示"""
+    for _ in range(5):
+        overlay.on_match_found((300, 200, 80, 50))
+        QApplication.processEvents()
+    assert overlay.calls == {"setGeometry": 1, "hide": 0}
+    assert overlay.isVisible()
+
+
+def test_pen_cached_until_config_changes(overlay):
+    """测试画笔缓存到颜色或边框设置变化为止"""
+    painter = overlay.window_painter
+    pen = painter.pen
+    assert painter.pen is pen
+    overlay.config.update(opacity=0.5)
+    assert painter.pen is pen
+
+    overlay.config.update(color="#00FF00")
+    assert painter.pen is not pen
+    assert painter.pen.color().name() == "#00ff00"
+    overlay.config["border"] = {"width": 4}
+    assert painter.pen.width() == 4
+    assert not overlay.grab().isNull()  # 使用缓存的画笔绘制
+
+
+@pytest.fixture
+def reloading_overlay(tmp_path, monkeypatch):
+    """使用合成画面的匹配框窗口，用于测试在应用外修改配置文件"""
+    import src.TransparentOverlay as module
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    for name in ("_capture", "_ImageMatchThread", "_ImageManager"):
+        monkeypatch.setattr(module, name, None)
+    settings = {
+        "enable_sound": False,
+        "capture": {"backend": "fake"},
+        "template_store": {"enabled": False},
+        "journal": {"enabled": False},
+    }
+    (tmp_path / ".autogui.json").write_text(json.dumps(settings))
+    app = QApplication.instance() or QApplication([])
+    overlay = TransparentOverlay(app)
+    yield overlay
+    overlay.cleanup()
+
+
+def edit_config(overlay, **changes):
+    """模拟在应用外修改配置文件后重新加载"""
+    overlay.config.flush()
+    data = json.loads(overlay.config.config_path.read_text())
+    data.update(changes)
+    overlay.config.config_path.write_text(json.dumps(data))
+    return overlay.config.reload()
+
+
+def write_template(tmp_path, name, x, y):
+    path = tmp_path / name
+    cv2.imwrite(str(path), synthetic_screen(320, 240, seed=1)[y:y + 40, x:x + 60, :3])
+    return str(path)
+
+
+def test_reloaded_image_swaps_target(reloading_overlay, tmp_path):
+    """测试在应用外修改目标图片后换上新目标"""
+    overlay = reloading_overlay
+    first = write_template(tmp_path, "first.png", 10, 10)
+    assert edit_config(overlay, last_image=first) == {"last_image"}
+    assert overlay.image_manager.image_path == first
+    assert overlay.match_thread.isRunning()
+
+    second = write_template(tmp_path, "second.png", 100, 50)
+    edit_config(overlay, last_image=second)
+    assert overlay.image_manager.image_path == second
+    assert overlay.tray_manager.status_action.text() == "当前图片: second.png"
+
+
+def test_reloaded_watch_list_starts_thread(reloading_overlay, tmp_path):
+    """测试监视列表从空变为非空时启动匹配线程"""
+    overlay = reloading_overlay
+    path = write_template(tmp_path, "watched.png", 10, 10)
+    edit_config(overlay, watch_list=[{"path": path, "name": "watched"}])
+    assert overlay.match_thread.isRunning()
+    assert [t.name for t in overlay.match_thread.engine.targets()] == ["watched"]
+
+
+def test_reloaded_settings_refresh_tray(reloading_overlay):
+    """测试重新加载后托盘菜单项的选中状态与配置一致"""
+    tray = reloading_overlay.tray_manager
+    assert not tray.sound_action.isChecked()
+    edit_config(reloading_overlay, enable_sound=True, enable_notification=False, sound_type="MARIO")
+    assert tray.sound_action.isChecked()
+    assert not tray.notification_action.isChecked()
+    assert [name for name, action in tray.sound_type_actions.items() if action.isChecked()] == ["MARIO"]
+
+
+def test_hidden_overlay_pauses_watch_list(reloading_overlay, tmp_path):
+    """测试只有监视列表目标时隐藏匹配框同样暂停匹配"""
+    overlay = reloading_overlay
+    path = write_template(tmp_path, "watched.png", 10, 10)
+    edit_config(overlay, watch_list=[{"path": path}])
+    overlay.show()
+    overlay.toggle_visibility()
+    assert overlay.match_thread.paused
+    overlay.toggle_visibility()
+    assert not overlay.match_thread.paused
+    assert overlay.match_thread.isRunning()
@@ -0,0 +1,94 @@
+import gc
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import matcher
+from src.parallel_matcher import TiledMatchPool, split_bands
+from src.timings import PeakClock
+
+
+@pytest.fixture
+def pool():
+    """创建两个进程的匹配池"""
+    pool = TiledMatchPool(workers=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_split_bands():
+    """测试条带划分覆盖全部结果行且不重复"""
+    bands = split_bands(1000, 3)
+    assert bands == [(0, 334), (334, 668), (668, 1000)]
+    # 结果行太少时不拆分
+    assert split_bands(50, 8) == [(0, 50)]
+
+
+def test_match_across_band_boundary(pool):
+    """测试目标跨越条带边界时仍与单进程匹配一致"""
+    rng = np.random.default_rng(2)
+    noise = rng.integers(0, 256, (80, 120, 3), dtype=np.uint8)
+    screen = np.kron(noise, np.ones((4, 4, 1), dtype=np.uint8))
+    # 结果共 320 - 40 + 1 = 281 行，两个条带的分界在第 141 行附近
+    template = screen[130:170, 200:260].copy()
+
+    clock = PeakClock()
+    max_val, max_loc = pool.match(screen, template, clock)
+    full_val, full_loc = matcher.match_full(screen, template)
+    assert max_loc == full_loc == (200, 130)
+    assert max_val == pytest.approx(full_val, abs=1e-4)
+    # 子进程中的峰值搜索耗时带回主进程
+    assert clock.take() > 0
+
+
+def test_screen_published_once_per_cycle(pool):
+    """测试同一轮中多个目标共用一份截图副本，新的一轮重新复制"""
+    rng = np.random.default_rng(3)
+    screen = rng.integers(0, 256, (400, 300, 3), dtype=np.uint8)
+    templates = [screen[y:y + 30, x:x + 40].copy() for y, x in [(20, 30), (200, 150), (350, 250)]]
+
+    pool.begin_cycle()
+    locs = [pool.match(screen, template)[1] for template in templates]
+    assert locs == [(30, 20), (150, 200), (250, 350)]
+    assert pool.copies == 1 + len(templates)
+
+    # 缓冲区被原地复用，新的一轮必须看到新的内容
+    screen[:] = np.roll(screen, 10, axis=1)
+    pool.begin_cycle()
+    assert pool.match(screen, templates[0])[1] == (40, 20)
+    # 模板只在第一次匹配时复制
+    assert pool.copies == 2 + len(templates)
+
+
+def test_template_released_with_array(pool):
+    """测试模板数组被回收后释放它的共享内存"""
+    rng = np.random.default_rng(5)
+    screen = rng.integers(0, 256, (400, 300, 3), dtype=np.uint8)
+    template = screen[20:50, 30:70].copy()
+    pool.begin_cycle()
+    assert pool.match(screen, template)[1] == (30, 20)
+    assert len(pool._templates) == 1
+    del template
+    gc.collect()
+    assert not pool._templates
+
+
+def test_segments_grow_within_cycle(pool):
+    """测试本轮放不下时追加共享内存，已发布的数组保持有效，下一轮合并为一块"""
+    rng = np.random.default_rng(4)
+    small = rng.integers(0, 256, (200, 100, 3), dtype=np.uint8)
+    large = rng.integers(0, 256, (600, 400, 3), dtype=np.uint8)
+    pool.begin_cycle()
+    assert pool.match(small, small[50:80, 10:40].copy())[1] == (10, 50)
+    assert pool.match(large, large[300:340, 200:260].copy())[1] == (200, 300)
+    assert pool.match(small, small[120:150, 60:90].copy())[1] == (60, 120)
+    assert len(pool._segments) > 1
+
+    pool.begin_cycle()
+    assert len(pool._segments) == 1
+    assert pool.match(large, large[10:40, 10:50].copy())[1] == (10, 10)
@@ -0,0 +1,70 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import PollingConfig
+from src.scheduler import AdaptiveScheduler
+
+
+def make_scheduler(**kwargs):
+    config = SimpleNamespace(data=SimpleNamespace(polling=PollingConfig(**kwargs)))
+    return AdaptiveScheduler(config)
+
+
+def test_backoff_while_quiet():
+    """测试画面静止时指数退避直到最大间隔"""
+    scheduler = make_scheduler(min_interval_ms=100, max_interval_ms=400, backoff=2)
+    intervals = []
+    for _ in range(4):
+        scheduler.update(False, False, 0)
+        intervals.append(scheduler.interval_ms)
+    assert intervals == [200, 400, 400, 400]
+    assert scheduler.stats()["reason"] == "quiet"
+
+
+def test_backoff_always_grows():
+    """测试倍数接近 1 时间隔仍逐轮增长，不会因取整停在最小间隔"""
+    scheduler = make_scheduler(min_interval_ms=100, max_interval_ms=103, backoff=1.005)
+    intervals = []
+    for _ in range(4):
+        scheduler.update(False, False, 0)
+        intervals.append(scheduler.interval_ms)
+    assert intervals == [101, 102, 103, 103]
+
+
+@pytest.mark.parametrize("kwargs", [{"min_interval_ms": 0}, {"backoff": 1}, {"backoff": 0.5}])
+def test_invalid_polling_config(kwargs):
+    """测试最小间隔必须为正、退避倍数必须大于 1"""
+    with pytest.raises(ValidationError):
+        PollingConfig(**kwargs)
+
+
+def test_speed_up_on_change():
+    """测试画面变化或匹配度接近阈值时恢复最小间隔"""
+    scheduler = make_scheduler(min_interval_ms=100, max_interval_ms=400, backoff=2)
+    scheduler.update(False, False, 0)
+    assert scheduler.update(True, False, 0) == 100
+    scheduler.update(False, False, 0)
+    assert scheduler.update(False, True, 0) == 100
+    assert scheduler.stats()["reason"] == "near_threshold"
+
+
+def test_sleep_subtracts_cycle_time():
+    """测试休眠时间扣除匹配耗时，超时部分记为延迟"""
+    scheduler = make_scheduler(min_interval_ms=100)
+    assert scheduler.update(True, False, 0.03) == 70
+    assert scheduler.update(True, False, 0.25) == 0
+    assert scheduler.stats()["lag_ms"] == 150
+
+
+def test_fixed_interval():
+    """测试关闭自适应时使用固定间隔"""
+    scheduler = make_scheduler(adaptive=False, interval_ms=200)
+    assert scheduler.update(False, False, 0) == 200
+    assert scheduler.update(True, True, 0) == 200
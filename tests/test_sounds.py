@@ -0,0 +1,182 @@
+import os
+import shutil
+import struct
+import sys
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.config import AppConfig, CustomSound
+from src.sound_types import SoundType
+from src.sounds import SAMPLE_RATE, AudioMixer, SoundPlayer
+
+
+@pytest.fixture
+def mixer(monkeypatch):
+    """不打开输出流的混音器，播放请求直接进入混音队列"""
+    mixer = AudioMixer()
+    mixer.available = True
+    monkeypatch.setattr(SoundPlayer, "mixer", mixer)
+    return mixer
+
+
+@pytest.fixture
+def wav_file(tmp_path):
+    """10 秒的双声道 16 位 WAV，每秒的音量不同，便于确认读取的区间"""
+    rate = 8000
+    seconds = np.repeat(np.arange(1, 11, dtype=np.int16) * 1000, rate)
+    stereo = np.stack([seconds, seconds // 2], axis=1)
+    path = tmp_path / "alert.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(stereo.tobytes())
+    SoundPlayer._custom_cache.clear()
+    return path
+
+
+def test_builtin_sounds_rendered_once():
+    """测试内置提示音只合成一次"""
+    first = SoundPlayer.render(SoundType.SUCCESS)
+    assert first.dtype == np.float32
+    assert len(first) == int(0.1 * SAMPLE_RATE) * 2
+    assert SoundPlayer.render(SoundType.SUCCESS) is first
+    assert SoundPlayer.prepare(SoundType.NONE) is None
+
+
+def test_custom_window(wav_file):
+    """测试只解码配置的区间，转为单声道、归一化并重采样到输出采样率"""
+    samples, rate = SoundPlayer.load_custom(str(wav_file), 2, 1.5)
+    assert rate == SAMPLE_RATE
+    assert samples.dtype == np.float32
+    assert len(samples) == int(1.5 * SAMPLE_RATE)
+    # 区间覆盖第 3 秒（3000）和第 4 秒的前半（4000），按最大值归一化
+    assert samples[0] == pytest.approx(0.75)
+    assert samples[-1] == pytest.approx(1.0)
+
+
+@pytest.fixture
+def float_wav_file(tmp_path):
+    """2 秒的单声道 32 位浮点 WAV（格式 3），wave 模块无法读取"""
+    rate = 8000
+    samples = np.full(2 * rate, 0.25, dtype="<f4")
+    data = samples.tobytes()
+    fmt = struct.pack("<HHIIHH", 3, 1, rate, rate * 4, 4, 32)
+    path = tmp_path / "float.wav"
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + len(data)) + b"WAVE")
+        f.write(b"fmt " + struct.pack("<I", len(fmt)) + fmt)
+        f.write(b"data" + struct.pack("<I", len(data)) + data)
+    SoundPlayer._custom_cache.clear()
+    return path
+
+
+def test_unsupported_wav_falls_back(float_wav_file, monkeypatch):
+    """测试 wave 模块不支持的 WAV 格式改用 pydub 解码"""
+    calls = []
+
+    def decode_window(path, start, duration):
+        calls.append((path, start, duration))
+        return np.full(8000, 0.5, dtype=np.float32), 8000
+
+    monkeypatch.setattr(SoundPlayer, "_decode_window", staticmethod(decode_window))
+    samples, rate = SoundPlayer.load_custom(str(float_wav_file), 0, 1)
+    assert calls == [(str(float_wav_file), 0, 1)]
+    assert rate == SAMPLE_RATE
+    assert samples.max() == pytest.approx(1.0)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="需要 ffmpeg")
+def test_float_wav_decoded_with_ffmpeg(float_wav_file):
+    """测试 32 位浮点 WAV 可以正常解码"""
+    samples, rate = SoundPlayer.load_custom(str(float_wav_file), 0, 1)
+    assert rate == SAMPLE_RATE
+    assert len(samples) == pytest.approx(SAMPLE_RATE, abs=SAMPLE_RATE // 100)
+
+
+def test_custom_cache_key(wav_file):
+    """测试按 (路径, 修改时间, 开始, 时长) 缓存"""
+    first = SoundPlayer.load_custom(str(wav_file), 0, 1)
+    assert SoundPlayer.load_custom(str(wav_file), 0, 1) is first
+    assert SoundPlayer.load_custom(str(wav_file), 1, 1) is not first
+
+    stat = wav_file.stat()
+    os.utime(wav_file, (stat.st_atime, stat.st_mtime + 10))
+    assert SoundPlayer.load_custom(str(wav_file), 0, 1) is not first
+
+
+def test_custom_settings_from_config(wav_file):
+    """测试自定义音乐设置可以来自 AppConfig 或字典"""
+    config = AppConfig(custom_sound=CustomSound(path=str(wav_file), start=1, duration=2))
+    samples, _ = SoundPlayer.prepare(SoundType.CUSTOM, config)
+    assert len(samples) == 2 * SAMPLE_RATE
+
+    settings = {"custom_sound": {"path": str(wav_file), "start": 9, "duration": 5}}
+    samples, _ = SoundPlayer.prepare(SoundType.CUSTOM, settings)
+    assert len(samples) == SAMPLE_RATE  # 区间超出文件末尾时截断
+
+
+def test_missing_custom_file():
+    """测试自定义音乐不存在时不播放"""
+    assert SoundPlayer.load_custom("/nonexistent.mp3", 0, 1) is None
+
+
+def test_mixer_sums_overlapping_sounds():
+    """测试重叠的声音相加并限制在 [-1, 1]，不会互相打断"""
+    mixer = AudioMixer()
+    mixer.add(np.full(300, 0.6, dtype=np.float32))
+    mixer.add(np.full(100, 0.6, dtype=np.float32))
+    block = mixer.mix(256)
+    assert block[0] == pytest.approx(1.0)  # 0.6 + 0.6 被截断
+    assert block[200] == pytest.approx(0.6)
+    assert len(mixer.voices) == 1
+
+    block = mixer.mix(256)
+    assert block[:44] == pytest.approx(0.6)
+    assert block[44:].max() == 0
+    assert not mixer.busy
+
+
+def test_mixer_resamples():
+    """测试不同采样率的声音重采样到输出采样率"""
+    mixer = AudioMixer(sample_rate=8000)
+    mixer.add(np.ones(16000, dtype=np.float32), sample_rate=16000)
+    assert len(mixer.voices[0][0]) == 8000
+
+
+def test_custom_alert_plays_cached_buffer(wav_file, mixer, record_property):
+    """测试自定义音乐每次播放直接使用缓存的缓冲区，不再重采样"""
+    config = AppConfig(custom_sound=CustomSound(path=str(wav_file), start=0, duration=3))
+    SoundPlayer.play_custom(config)
+    cached, _ = SoundPlayer.prepare(SoundType.CUSTOM, config)
+    assert mixer.voices[0][0] is cached
+
+    # 从播放请求到第一个输出块包含声音的耗时（不含 PortAudio 的输出延迟）
+    start = time.perf_counter()
+    SoundPlayer.play_custom(config)
+    block = mixer.mix(mixer.blocksize)
+    latency = time.perf_counter() - start
+    record_property("custom_alert_ms", round(latency * 1000, 3))
+    assert mixer.voices[1][0] is cached
+    assert block.max() > 0
+    assert latency < 0.05
+
+
+def test_mixer_without_audio_device(monkeypatch):
+    """测试没有音频设备时只尝试一次，之后播放请求直接忽略"""
+    monkeypatch.setitem(sys.modules, "sounddevice", None)
+    mixer = AudioMixer()
+    mixer.play(np.ones(10, dtype=np.float32))
+    assert mixer.available is False
+    assert not mixer.voices
+
+    monkeypatch.setattr(SoundPlayer, "mixer", mixer)
+    SoundPlayer.play_sound(SoundType.BEEP)
+    assert mixer.stats() == {"available": False, "voices": 0, "latency": None}
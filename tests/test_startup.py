@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+ROOT = Path(__file__).parent.parent
+
+# 托盘显示之前不应导入的重量级模块
+HEAVY_MODULES = ("cv2", "numpy", "sounddevice", "pydub", "mss")
+
+# 导入 src.main 的累计耗时上限（秒），包含 PyQt6 和 pydantic
+IMPORT_BUDGET = 1.5
+
+
+def run_python(code, tmp_path, *flags):
+    env = dict(os.environ, HOME=str(tmp_path), QT_QPA_PLATFORM="offscreen")
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 的输出，返回 {模块名: 累计耗时（秒）}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative) / 1e6
+    return modules
+
+
+def test_import_report(tmp_path):
+    """测试 -X importtime 报告：启动入口不导入重量级模块，且在耗时预算内"""
+    modules = parse_importtime(run_python("import src.main", tmp_path, "-X", "importtime").stderr)
+    assert "src.main" in modules
+    assert not [m for m in HEAVY_MODULES if m in modules]
+    assert modules["src.main"] < IMPORT_BUDGET
+
+
+def test_tray_before_heavy_imports(tmp_path):
+    """测试创建窗口和托盘之后仍未导入 cv2 / numpy / 声音模块"""
+    code = (
+        "import sys\n"
+        "from PyQt6.QtWidgets import QApplication\n"
+        "from src.TransparentOverlay import TransparentOverlay\n"
+        "app = QApplication(sys.argv)\n"
+        "overlay = TransparentOverlay(app)\n"
+        "assert overlay.tray_manager.tray is not None\n"
+        f"print(sorted(m for m in {HEAVY_MODULES!r} + ('src.engine', 'src.sounds') if m in sys.modules))\n"
+    )
+    assert run_python(code, tmp_path).stdout.strip() == "[]"
+
+
+def test_headless_lighter_than_gui(tmp_path, record_property):
+    """测试命令行模式从启动到第一个匹配结果比图形界面更快、峰值内存更低"""
+    from benchmarks.bench_startup import measure, prepare
+
+    prepare(tmp_path)
+    results = measure(tmp_path, repeat=3)
+    for mode, result in results.items():
+        record_property(f"{mode}_startup_ms", round(result["seconds"] * 1000))
+        record_property(f"{mode}_max_rss_mb", result["max_rss_mb"])
+    assert results["headless"]["max_rss_mb"] < results["gui"]["max_rss_mb"]
+    assert results["headless"]["seconds"] < results["gui"]["seconds"]
@@ -0,0 +1,122 @@
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.capture import FakeCapture, synthetic_screen
+from src.config import AppConfig
+from src.engine import MatchEngine
+from src.template_store import TemplateStore
+from src.watch_target import WatchTarget
+
+
+@pytest.fixture
+def template_file(tmp_path):
+    path = tmp_path / "template.png"
+    cv2.imwrite(str(path), synthetic_screen(96, 64, seed=5)[..., :3])
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TemplateStore(tmp_path / "store")
+
+
+def test_load_decodes_once(store, template_file):
+    """测试同一图片第二次加载时直接映射缓存"""
+    image, key = store.load(template_file)
+    assert image.shape == (64, 96, 3)
+
+    # 解码后的像素按内容哈希保存
+    cached = store.get(key, "image")
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, cv2.imread(str(template_file)))
+
+    again, again_key = store.load(template_file)
+    assert again_key == key
+    assert isinstance(again, np.memmap)
+
+
+def test_load_missing_file(store, tmp_path):
+    """测试无法读取的文件返回 None"""
+    image, key = store.load(tmp_path / "missing.png")
+    assert image is None and key is None
+
+
+def test_watch_target_reads_derived_data(store, template_file):
+    """测试灰度图、金字塔和缩放模板保存到模板库并在下次直接读取"""
+    image, key = store.load(template_file)
+    target = WatchTarget("a", image, grayscale=True, cache=store.view(key))
+    target.variant(0.5)
+    names = {p.stem for p in store.entry(key).iterdir()}
+    assert {"image", "gray", "gray_pyramid1", "x0.5", "x0.5_gray"} <= names
+
+    reloaded = WatchTarget("a", image, grayscale=True, cache=store.view(key))
+    assert isinstance(reloaded.template, np.memmap)
+    assert isinstance(reloaded.pyramid[1], np.memmap)
+    np.testing.assert_array_equal(reloaded.template, target.template)
+    np.testing.assert_array_equal(
+        reloaded.variant(0.5).template, target.variant(0.5).template
+    )
+
+
+def test_prune_least_recently_used(tmp_path):
+    """测试超过磁盘上限时淘汰最久未使用的模板"""
+    store = TemplateStore(tmp_path / "store")
+    for index in range(3):
+        store.put(f"k{index}", "image", np.zeros((32, 32), np.uint8))
+        os.utime(store.entry(f"k{index}"), (index, index))
+    size = sum(size for _, size, _ in store.usage()) // 3
+
+    store.max_bytes = size * 2
+    store.touch("k0")
+    store.prune()
+    assert sorted(key for _, _, key in store.usage()) == ["k0", "k2"]
+
+
+def test_derived_data_enforces_limit(tmp_path):
+    """测试写入派生数据（灰度图、金字塔、缩放模板）后同样检查磁盘上限"""
+    store = TemplateStore(tmp_path / "store")
+    store.put("old", "image", np.zeros((64, 64), np.uint8))
+    os.utime(store.entry("old"), (0, 0))
+    store.put("new", "image", np.zeros((64, 64), np.uint8))
+    store.max_bytes = sum(size for _, size, _ in store.usage())
+
+    store.view("new").scaled(2).cached("gray", lambda: np.zeros((64, 64), np.uint8))
+    assert [key for _, _, key in store.usage()] == ["new"]
+
+
+def test_prune_keeps_live_targets(tmp_path):
+    """测试监视目标仍在使用的模板不会被淘汰，目标释放后才可淘汰"""
+    store = TemplateStore(tmp_path / "store")
+    for index in range(3):
+        store.put(f"k{index}", "image", np.zeros((32, 32), np.uint8))
+        os.utime(store.entry(f"k{index}"), (index, index))
+    live = store.view("k0")
+    store.max_bytes = 0
+    store.prune(keep="k2")
+    assert sorted(key for _, _, key in store.usage()) == ["k0", "k2"]
+
+    del live
+    store.prune()
+    assert store.usage() == []
+
+
+def test_engine_uses_store(tmp_path, template_file):
+    """测试引擎通过模板库加载的目标可以正常匹配"""
+    config = SimpleNamespace(data=AppConfig())
+    config.data.template_store.path = str(tmp_path / "store")
+    capture = FakeCapture(synthetic_screen(320, 240, seed=1))
+    engine = MatchEngine(capture, config)
+
+    image, key = engine.load_template(template_file)
+    capture.place(image, 40, 30)
+    engine.set_target(image, key)
+    assert engine.step()[0].rect == (40, 30, 96, 64)
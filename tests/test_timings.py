@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.capture import FakeCapture, synthetic_screen
+from src.config import AppConfig
+from src import matcher
+from src.engine import MatchEngine
+from src.timings import RollingHistogram, StageTimings
+
+
+def test_percentiles():
+    """测试最近邻百分位数"""
+    histogram = RollingHistogram(window=100)
+    for ms in range(1, 101):
+        histogram.add(ms / 1000)
+    assert histogram.summary() == {"p50": 50.0, "p95": 95.0, "p99": 99.0, "count": 100}
+
+
+def test_rolling_window():
+    """测试只保留最近的样本"""
+    histogram = RollingHistogram(window=3)
+    for seconds in (1.0, 1.0, 0.001, 0.001, 0.001):
+        histogram.add(seconds)
+    assert histogram.percentile(99) == 0.001
+
+
+def test_format_orders_stages():
+    """测试摘要按循环阶段排序"""
+    timings = StageTimings()
+    timings.record("match", 0.040)
+    timings.record("capture", 0.003)
+    assert list(timings.summary()) == ["capture", "match"]
+    assert timings.format() == "capture 3/3 | match 40/40 ms"
+
+
+def test_engine_records_stages():
+    """测试匹配引擎记录每个阶段，画面未变化时不记录匹配"""
+    capture = FakeCapture(synthetic_screen(320, 240, seed=2))
+    engine = MatchEngine(capture, SimpleNamespace(data=AppConfig()))
+    engine.set_target(np.ascontiguousarray(capture.desktop[20:60, 30:90, :3]))
+
+    engine.step()
+    engine.step()
+    stats = engine.timing_stats()
+    assert {"capture", "detect", "convert", "match", "peak", "cycle"} <= set(stats)
+    assert stats["cycle"]["count"] == 2
+    assert stats["match"]["count"] == 1
+
+
+def test_engines_keep_separate_peak_clocks():
+    """测试每个引擎只取走自己的峰值搜索耗时"""
+    capture = FakeCapture(synthetic_screen(320, 240, seed=2))
+    engines = [MatchEngine(capture, SimpleNamespace(data=AppConfig())) for _ in range(2)]
+    first, second = engines
+    assert first.timings.peak_clock is not second.timings.peak_clock
+    first.set_target(np.ascontiguousarray(capture.desktop[20:60, 30:90, :3]))
+
+    # 另一个引擎正在进行中的一轮
+    matcher.find_peak(np.ones((100, 100), np.float32), second.timings.peak_clock)
+    first.step()
+    assert first.timing_stats()["peak"]["count"] == 1
+    assert second.timings.peak_clock.take() > 0
@@ -0,0 +1,104 @@
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.capture import Frame
+from src.config import MatchConfig
+from src.watch_target import WatchTarget
+
+
+@pytest.fixture
+def screen():
+    """生成带有块状纹理的合成屏幕"""
+    rng = np.random.default_rng(1)
+    noise = rng.integers(0, 256, (90, 160, 3), dtype=np.uint8)
+    return np.kron(noise, np.ones((6, 6, 1), dtype=np.uint8))
+
+
+@pytest.mark.parametrize("mode", ["full", "pyramid"])
+def test_match(screen, mode):
+    """测试不同匹配模式都能找到目标"""
+    target = WatchTarget("a", screen[100:164, 200:296].copy())
+    max_val, max_loc = target.match(screen, MatchConfig(mode=mode))
+    assert max_val > 0.99
+    assert max_loc == (200, 100)
+
+
+def test_tracking_falls_back_to_full_search(screen):
+    """测试目标移出跟踪窗口后回退到全屏搜索"""
+    template = screen[100:164, 200:296].copy()
+    target = WatchTarget("a", template)
+    config = MatchConfig(track_padding=8)
+
+    target.last_match = (200, 100)
+    assert target.match(screen, config)[1] == (200, 100)
+    assert target.frames_since_full_search == 1
+
+    moved = np.roll(screen, (120, 240), axis=(0, 1))
+    max_val, max_loc = target.match(moved, config)
+    assert max_loc == (440, 220)
+    assert target.frames_since_full_search == 0
+
+
+def test_threshold_override():
+    """测试目标自己的阈值优先于全局阈值"""
+    image = np.zeros((16, 16, 3), dtype=np.uint8)
+    config = MatchConfig(threshold=0.8)
+    assert WatchTarget("a", image).get_threshold(config) == 0.8
+    assert WatchTarget("b", image, threshold=0.95).get_threshold(config) == 0.95
+
+
+def test_grayscale_match(screen):
+    """测试灰度匹配找到目标且颜色校验通过"""
+    target = WatchTarget("a", screen[100:164, 200:296].copy(), grayscale=True)
+    assert target.template.ndim == 2
+    max_val, max_loc = target.match(screen, MatchConfig())
+    assert max_val > 0.99
+    assert max_loc == (200, 100)
+
+
+def test_grayscale_color_check(screen):
+    """测试亮度相同但颜色不同的区域被颜色校验排除"""
+    template = screen[100:164, 200:296].copy()
+    # 灰度相同、颜色不同的冒充者
+    imposter = np.repeat(cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)[..., None], 3, axis=2)
+    screen = screen.copy()
+    screen[100:164, 200:296] = 0
+    screen[300:364, 400:496] = imposter
+
+    target = WatchTarget("a", template, grayscale=True)
+    max_val, max_loc = target.match(screen, MatchConfig(color_check=False))
+    assert max_val > 0.99
+    assert max_loc == (400, 300)
+
+    max_val, _ = target.match(screen, MatchConfig(color_check=True))
+    assert max_val < 0.8
+
+
+def test_multi_scale(screen):
+    """测试 1x 截取的模板在 2x 屏幕上按缩放比例匹配"""
+    template = screen[100:164, 200:296].copy()
+    screen_2x = cv2.resize(screen, None, fx=2, fy=2, interpolation=cv2.INTER_LINEAR)
+    target = WatchTarget("a", template)
+    config = MatchConfig()
+
+    assert target.match_frames([Frame(0, bgr=screen_2x)], config)[0] < 0.8
+
+    max_val, max_loc = target.match_frames([Frame(0, bgr=screen_2x)], config, scales=[1.0, 2.0])
+    assert max_val > 0.9
+    assert max_loc == (400, 200)
+    assert target.scale == 2.0
+    assert target.size == (192, 128)
+
+    # 缩放后的模板只准备一次，下一轮先尝试上次获胜的比例
+    variant = target.variants[2.0]
+    target.last_match = max_loc
+    target.match_frames([Frame(0, bgr=screen_2x)], config, scales=[1.0, 2.0])
+    assert target.variants[2.0] is variant
+    assert variant.frames_since_full_search == 1